@@ -0,0 +1,176 @@
+"""Background activity log pipeline.
+
+Request handlers hand rows to an ActivityLogger, which queues them and lets a
+worker thread write them to a sink in batches. Logins and period updates never
+wait on the Google Sheets API, and a slow or unreachable sheet only costs
+dropped log rows, never slow requests.
+"""
+import csv
+import os
+import queue
+import threading
+import time
+
+_FLUSH = object()
+_STOP = object()
+
+
+class GoogleSheetsSink:
+    """Append rows to a worksheet with one API call per batch"""
+
+    def __init__(self, registry, sheet_id, worksheet_name):
+        self.registry = registry
+        self.sheet_id = sheet_id
+        self.worksheet_name = worksheet_name
+
+    def write_rows(self, rows):
+        worksheet = self.registry.get_worksheet(self.sheet_id, self.worksheet_name)
+        if not worksheet:
+            return
+        try:
+            worksheet.append_rows(rows)
+        except Exception:
+            # The sheet may have been renamed or deleted; resolve it again next time
+            self.registry.invalidate(self.sheet_id, self.worksheet_name)
+            raise
+
+
+class CSVFileSink:
+    """Append rows to a local CSV file (handy for development and tests)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write_rows(self, rows):
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+
+class MemorySink:
+    """Keep rows in memory (used by tests and benchmarks)"""
+
+    def __init__(self):
+        self.rows = []
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+
+
+class ActivityLogger:
+    """Bounded queue plus a worker thread that flushes rows in batches"""
+
+    def __init__(self, sink, max_queue_size=1000, batch_size=50, flush_interval=5.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def log(self, row):
+        """Queue a row without blocking; returns False if it had to be dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(list(row))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Write everything queued so far and wait for the worker to finish it"""
+        if not self._is_running():
+            return
+        self._queue.put(_FLUSH, timeout=timeout)
+        self._queue.join()
+
+    def shutdown(self, timeout=10):
+        """Flush pending rows and stop the worker thread"""
+        if not self._is_running():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout)
+        self._worker = None
+
+    def stats(self):
+        """Counters for monitoring backpressure and sink health"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches
+            }
+
+    def _is_running(self):
+        return self._worker is not None and self._worker.is_alive() and self._pid == os.getpid()
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so a worker process starts its own
+        if self._is_running():
+            return
+        with self._lock:
+            if self._is_running():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='activity-log', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                batch, deadline = [], None
+                continue
+
+            if item is _FLUSH or item is _STOP:
+                self._write(batch)
+                batch, deadline = [], None
+                self._queue.task_done()
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink.write_rows(batch)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            print(f"Activity log sink error: {e}")
+            with self._lock:
+                self.failed += len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
@@ -1,183 +1,558 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, flash, session, jsonify, g, abort, send_file, Response, stream_with_context
+from sqlalchemy import select, update, insert, and_, or_, func, literal, create_engine
+from sqlalchemy.orm import aliased
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import wraps
 import os
+import re
 import json
-import gspread
-from google.oauth2.service_account import Credentials
-from google_sheets_config import *
+import mimetypes
+import atexit
+import shutil
+import tempfile
+import hashlib
+import hmac
+import time
+import click
+from sqlalchemy import event
+from google_sheets_config import (
+    SHEET_ID, LOGIN_SHEET_NAME, ACTIVITY_LOG_QUEUE_SIZE, ACTIVITY_LOG_BATCH_SIZE, ACTIVITY_LOG_FLUSH_INTERVAL
+)
+from activity_log import ActivityLogger, GoogleSheetsSink, CSVFileSink
+from sheets_client import registry as sheets_registry
+from cycle_stats import CycleAggregates, RunningStats
+from export_jobs import ExportJobRunner
+import data_export
+import cycle_prediction
+from cycle_cache import MemoryCycleCache, SQLiteCycleCache
+from health_content import HealthContent
+from request_metrics import RequestMetrics
+import template_cache
+import assets
+from compression import CompressionMiddleware
+import migrations
+import db_config
+from models import (
+    db, User, CycleSettings, PeriodLog, MoodTracker, FavoriteTip, CurrentPeriod, WaterTracker,
+    NutritionTracker, SelfCareActivity, CycleStatistics, CycleState,
+    CYCLE_STATE_FIELDS
+)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///period_tracker.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Every page and CLI command lives on this blueprint; create_app() registers it
+bp = Blueprint('main', __name__, cli_group=None)
 
-db = SQLAlchemy(app)
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
+
+# Per-request timings, exposed at /metrics (configured by create_app)
+request_metrics = RequestMetrics()
+
+# Static pages are rendered once per worker (see render_static_page)
+static_pages = template_cache.StaticPages()
 
 # Google Sheets setup
 def setup_google_sheets():
-    """Setup Google Sheets connection"""
+    """Get the shared, already-authorized Google Sheets client"""
     try:
-        if os.path.exists(CREDENTIALS_FILE):
-            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-            creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=scope)
-            client = gspread.authorize(creds)
-            return client
-        return None
+        return sheets_registry.get_client()
     except Exception as e:
         print(f"Google Sheets setup error: {e}")
         return None
 
+# Activity rows are written in batches by a background worker. Set
+# ACTIVITY_LOG_FILE to log to a local CSV file instead of Google Sheets.
+if os.environ.get('ACTIVITY_LOG_FILE'):
+    activity_sink = CSVFileSink(os.environ['ACTIVITY_LOG_FILE'])
+else:
+    activity_sink = GoogleSheetsSink(sheets_registry, SHEET_ID, LOGIN_SHEET_NAME)
+
+activity_logger = ActivityLogger(
+    activity_sink,
+    max_queue_size=ACTIVITY_LOG_QUEUE_SIZE,
+    batch_size=ACTIVITY_LOG_BATCH_SIZE,
+    flush_interval=ACTIVITY_LOG_FLUSH_INTERVAL
+)
+atexit.register(activity_logger.shutdown)
+
+# PDF exports are rendered in a process pool and cached on disk (configured by create_app)
+export_jobs = ExportJobRunner()
+atexit.register(export_jobs.shutdown)
+EXPORT_JOB_ID = re.compile(r'^\d+-[0-9a-f]+$')
+
+# Tips, quotes and condition advice, loaded once and shared read-only
+health_content = HealthContent.load()
+
+# Colours and fonts for the CDN Tailwind that base.html loads before `flask build-assets`
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), assets.SOURCE_DIR, 'tailwind.theme.json'),
+          encoding='utf-8') as f:
+    TAILWIND_THEME = json.load(f)
+
+def create_app(config=None):
+    """Build the app: settings from the environment, then `config` on top of them"""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
+    # DATABASE_URL picks the backend: a SQLite file by default, or PostgreSQL
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_config.database_url(
+        os.environ.get('DATABASE_URL', db_config.DEFAULT_DATABASE_URL)
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Engine profile (see db_config.py): WAL and pragmas for SQLite, pool sizes per backend
+    app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'production')
+    # Optional read replica for the read-only views (see read_from_replica)
+    app.config['DATABASE_REPLICA_URL'] = os.environ.get('DATABASE_REPLICA_URL')
+
+    # PDF exports are rendered in a process pool and cached on disk
+    app.config['EXPORT_CACHE_DIR'] = os.path.join(app.instance_path, 'exports')
+    app.config['EXPORT_CACHE_MAX_BYTES'] = 200 * 1024 * 1024
+    app.config['EXPORT_CACHE_MAX_AGE'] = 7 * 24 * 3600  # seconds
+    app.config['EXPORT_WORKERS'] = 2
+
+    # Compiled templates are kept on disk and {% cache %} fragments in memory (see
+    # template_cache.py). Static pages are rendered once per worker, and browsers
+    # may keep them for STATIC_PAGE_MAX_AGE.
+    app.config['TEMPLATE_CACHE_DIR'] = os.environ.get(
+        'TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'template_cache')
+    )
+    app.config['STATIC_PAGE_MAX_AGE'] = 24 * 3600  # seconds
+
+    # CSS and fonts built by `flask build-assets` (see assets.py). File names carry
+    # a hash of their content, so browsers keep them for STATIC_ASSET_MAX_AGE.
+    # Without a build, base.html falls back to the CDNs.
+    app.config['STATIC_ASSET_DIR'] = os.path.join(app.root_path, 'static', 'dist')
+    app.config['STATIC_ASSET_MAX_AGE'] = 365 * 24 * 3600  # seconds
+    app.config['TAILWIND_CLI'] = os.environ.get('TAILWIND_CLI', assets.TAILWIND_COMMAND)
+
+    # Responses are compressed with gzip or brotli (see compression.py), and
+    # rendered HTML is stripped of comments and indentation unless MINIFY_HTML=0.
+    app.config['COMPRESS_MIN_SIZE'] = 1024  # bytes
+    app.config['MINIFY_HTML'] = os.environ.get('MINIFY_HTML', '1') != '0'
+
+    # Requests slower than SLOW_REQUEST_MS are logged with their SQL to
+    # SLOW_REQUEST_LOG. Operator endpoints answer only requests with
+    # "Authorization: Bearer <OPS_TOKEN>", and nobody at all while OPS_TOKEN
+    # is unset.
+    app.config['OPS_TOKEN'] = os.environ.get('OPS_TOKEN')
+    app.config['SLOW_REQUEST_MS'] = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    app.config['SLOW_REQUEST_LOG'] = os.environ.get(
+        'SLOW_REQUEST_LOG', os.path.join(app.instance_path, 'slow_requests.jsonl')
+    )
+
+    # Derived cycle progress, cached per user and day. Set CYCLE_CACHE_FILE to
+    # share one cache file between worker processes on the same machine.
+    app.config['CYCLE_CACHE_FILE'] = os.environ.get('CYCLE_CACHE_FILE')
+    app.config['CYCLE_CACHE_SIZE'] = 10000
+    app.config['CYCLE_CACHE_TTL'] = 300  # seconds
+
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', db_config.engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config['DB_PROFILE']
+    ))
+    app.config.setdefault('SQLALCHEMY_BINDS', db_config.replica_binds(
+        app.config['DATABASE_REPLICA_URL'], app.config['DB_PROFILE']
+    ))
+
+    db.init_app(app)
+    app.after_request(db_config.remember_write)
+    app.jinja_options = dict(
+        app.jinja_options,
+        bytecode_cache=template_cache.bytecode_cache(app.config['TEMPLATE_CACHE_DIR']),
+        extensions=['template_cache.FragmentCacheExtension']
+    )
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app, min_size=app.config['COMPRESS_MIN_SIZE'], minify_html=app.config['MINIFY_HTML']
+    )
+
+    request_metrics.init_app(app, skip_endpoints=['main.metrics', 'main.cache_stats', 'main.static_asset'])
+    login_manager.init_app(app)
+    export_jobs.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            db_config.apply_profile(engine, app.config['DB_PROFILE'])
+            db_config.dispose_after_fork(engine)
+            request_metrics.watch_engine(engine)
+
+    if app.config['CYCLE_CACHE_FILE']:
+        cycle_cache = SQLiteCycleCache(
+            app.config['CYCLE_CACHE_FILE'],
+            maxsize=app.config['CYCLE_CACHE_SIZE'],
+            ttl=app.config['CYCLE_CACHE_TTL']
+        )
+    else:
+        cycle_cache = MemoryCycleCache(maxsize=app.config['CYCLE_CACHE_SIZE'], ttl=app.config['CYCLE_CACHE_TTL'])
+    app.extensions['cycle_cache'] = cycle_cache
+    app.extensions['asset_manifest'] = assets.load_manifest(app.config['STATIC_ASSET_DIR'])
+    app.extensions['code_version'] = get_code_version(app)
+
+    app.register_blueprint(bp)
+    return app
+
+def compile_templates(app):
+    """Load every template, compiling it or reading its bytecode cache; returns the count"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+def preload_worker_state(app):
+    """Build what each worker would otherwise build on its first request
+
+    serve.py calls this once before forking its workers, so the compiled
+    templates, the URL matcher and the Sheets libraries sit in memory pages
+    that every worker shares. Database connections and the Sheets session are
+    still opened by each worker after the fork. Returns the number of
+    templates compiled.
+    """
+    count = compile_templates(app)
+    app.url_map.update()
+    sheets_registry.preload_libraries()
+    return count
+
 def log_to_google_sheets(action, user_id, email, name, ip_address):
-    """Log user activity to Google Sheets"""
-    try:
-        client = setup_google_sheets()
-        if client:
-            sheet = client.open_by_key(SHEET_ID).worksheet(LOGIN_SHEET_NAME)
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            row = [timestamp, action, user_id, email, name, ip_address]
-            sheet.append_row(row)
-    except Exception as e:
-        print(f"Google Sheets logging error: {e}")
-
-# Database Models
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(200), nullable=False)
-    age = db.Column(db.Integer)
-    pcos = db.Column(db.Boolean, default=False)
-    thyroid = db.Column(db.Boolean, default=False)
-    anemia = db.Column(db.Boolean, default=False)
-    diabetes = db.Column(db.Boolean, default=False)
-    emergency_contact = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Relationships
-    cycle_settings = db.relationship('CycleSettings', backref='user', uselist=False)
-    period_logs = db.relationship('PeriodLog', backref='user', lazy=True)
-    mood_trackers = db.relationship('MoodTracker', backref='user', lazy=True)
-    favorite_tips = db.relationship('FavoriteTip', backref='user', lazy=True)
-    current_period = db.relationship('CurrentPeriod', backref='user', uselist=False)
-    water_trackers = db.relationship('WaterTracker', backref='user', lazy=True)
-    nutrition_trackers = db.relationship('NutritionTracker', backref='user', lazy=True)
-
-class CycleSettings(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    avg_cycle_length = db.Column(db.Integer, default=28)
-    avg_period_length = db.Column(db.Integer, default=5)
-    start_date = db.Column(db.Date, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class PeriodLog(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    expected_date = db.Column(db.Date, nullable=False)
-    actual_start_date = db.Column(db.Date)
-    delay_days = db.Column(db.Integer, default=0)
-    duration = db.Column(db.Integer)
-    notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class MoodTracker(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False)
-    mood = db.Column(db.String(50))
-    symptoms = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class FavoriteTip(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    tip_text = db.Column(db.Text, nullable=False)
-    tip_category = db.Column(db.String(50))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class CurrentPeriod(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    start_date = db.Column(db.Date, nullable=False)
-    expected_end_date = db.Column(db.Date, nullable=False)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class WaterTracker(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False)
-    drank_water = db.Column(db.Boolean, default=False)
-    water_amount = db.Column(db.Float, default=0.0)  # in liters
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class NutritionTracker(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False)
-    ate_iron_rich = db.Column(db.Boolean, default=False)
-    ate_healthy = db.Column(db.Boolean, default=False)
-    notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class SelfCareActivity(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False)
-    activity_type = db.Column(db.String(50))  # exercise, meditation, journaling, etc.
-    duration = db.Column(db.Integer)  # in minutes
-    notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class EducationalBlog(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50))  # myths, stories, awareness
-    image_url = db.Column(db.String(500))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    """Queue a user activity row for the Google Sheets log"""
+    with request_metrics.timer('google_sheets_log'):
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        activity_logger.log([timestamp, action, user_id, email, name, ip_address])
 
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))
 
 # Helper functions
+def load_cycle_state(user_id):
+    """Load a user's cycle settings, latest period log and active period in one query
+
+    The result is memoized for the rest of the request, so the cycle helpers
+    below can be called as often as a view likes without extra round-trips.
+    Returns None if the user has not set up their cycle yet.
+    """
+    memo = g.setdefault('cycle_state', {})
+    if user_id in memo:
+        return memo[user_id]
+    
+    last_by_start = select(PeriodLog.id).where(
+        PeriodLog.user_id == user_id
+    ).order_by(PeriodLog.actual_start_date.desc()).limit(1).scalar_subquery()
+    active_period = select(CurrentPeriod.id).where(
+        CurrentPeriod.user_id == user_id,
+        CurrentPeriod.is_active == True
+    ).limit(1).scalar_subquery()
+    
+    LastStarted = aliased(PeriodLog)
+    row = db.session.query(
+        CycleSettings, LastStarted, CurrentPeriod, CycleStatistics, CycleState
+    ).select_from(CycleSettings).outerjoin(
+        LastStarted, LastStarted.id == last_by_start
+    ).outerjoin(
+        CurrentPeriod, CurrentPeriod.id == active_period
+    ).outerjoin(
+        CycleStatistics, CycleStatistics.user_id == CycleSettings.user_id
+    ).outerjoin(
+        CycleState, CycleState.user_id == CycleSettings.user_id
+    ).filter(CycleSettings.user_id == user_id).first()
+    
+    state = None
+    if row:
+        state = {
+            'settings': row[0],
+            'last_started': row[1],
+            'current_period': row[2],
+            'statistics': row[3],
+            'materialized': row[4]
+        }
+    memo[user_id] = state
+    return state
+
+def forget_cycle_state(user_id):
+    """Drop the memoized cycle state after writing period data"""
+    g.setdefault('cycle_state', {}).pop(user_id, None)
+    predictions = g.setdefault('cycle_predictions', {})
+    for key in [key for key in predictions if key[0] == user_id]:
+        del predictions[key]
+
+def load_tracker_summary(user_id):
+    """Load today's mood and this week's water and nutrition counts in one query"""
+    memo = g.setdefault('tracker_summary', {})
+    if user_id in memo:
+        return memo[user_id]
+    
+    today = datetime.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    
+    water_week = and_(
+        WaterTracker.user_id == user_id,
+        WaterTracker.date >= week_start,
+        WaterTracker.date <= week_end
+    )
+    nutrition_week = and_(
+        NutritionTracker.user_id == user_id,
+        NutritionTracker.date >= week_start,
+        NutritionTracker.date <= week_end
+    )
+    days_with_water = select(func.count(WaterTracker.id)).where(
+        water_week, WaterTracker.drank_water == True
+    ).scalar_subquery()
+    total_water = select(func.coalesce(func.sum(WaterTracker.water_amount), 0.0)).where(
+        water_week
+    ).scalar_subquery()
+    days_with_iron = select(func.count(NutritionTracker.id)).where(
+        nutrition_week, NutritionTracker.ate_iron_rich == True
+    ).scalar_subquery()
+    days_healthy = select(func.count(NutritionTracker.id)).where(
+        nutrition_week, NutritionTracker.ate_healthy == True
+    ).scalar_subquery()
+    
+    # Anchor on a one-row select so the counts come back even without a mood entry
+    anchor = select(literal(1).label('one')).subquery()
+    row = db.session.query(
+        MoodTracker, days_with_water, total_water, days_with_iron, days_healthy
+    ).select_from(anchor).outerjoin(
+        MoodTracker, and_(MoodTracker.user_id == user_id, MoodTracker.date == today)
+    ).first()
+    
+    summary = {
+        'today_mood': row[0],
+        'days_with_water': row[1],
+        'total_water': row[2],
+        'days_with_iron': row[3],
+        'days_healthy': row[4]
+    }
+    memo[user_id] = summary
+    return summary
+
+def _aggregates_from_row(stats):
+    return CycleAggregates(
+        cycles=RunningStats(stats.cycle_count, stats.cycle_mean, stats.cycle_m2),
+        durations=RunningStats(stats.duration_count, stats.duration_mean, stats.duration_m2),
+        delays=json.loads(stats.delay_counts) if stats.delay_counts else None,
+        last_start=stats.last_actual_start
+    )
+
+def _store_aggregates(stats, aggregates):
+    stats.cycle_count = aggregates.cycles.count
+    stats.cycle_mean = aggregates.cycles.mean
+    stats.cycle_m2 = aggregates.cycles.m2
+    stats.duration_count = aggregates.durations.count
+    stats.duration_mean = aggregates.durations.mean
+    stats.duration_m2 = aggregates.durations.m2
+    stats.delay_counts = aggregates.delays_json()
+    stats.last_actual_start = aggregates.last_start
+    stats.updated_at = datetime.utcnow()
+
+def rebuild_cycle_statistics(user_id):
+    """Recompute a user's cycle aggregates from their full period history"""
+    logs = db.session.query(
+        PeriodLog.actual_start_date, PeriodLog.duration, PeriodLog.delay_days
+    ).filter(PeriodLog.user_id == user_id).all()
+    
+    stats = CycleStatistics.query.filter_by(user_id=user_id).first()
+    if not stats:
+        stats = CycleStatistics(user_id=user_id)
+        db.session.add(stats)
+    _store_aggregates(stats, CycleAggregates.from_logs(logs))
+    return stats
+
+def get_cycle_statistics(user_id):
+    """Get a user's persisted cycle aggregates, building them on first use"""
+    state = g.get('cycle_state', {}).get(user_id)
+    stats = state['statistics'] if state else None
+    if stats is None:
+        stats = CycleStatistics.query.filter_by(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_cycle_statistics(user_id)
+        db.session.commit()
+    return stats
+
+def get_cycle_summary(user_id, default_cycle_length=28):
+    """Get average cycle length, variability, duration and delays for display"""
+    return _aggregates_from_row(get_cycle_statistics(user_id)).summary(default_cycle_length)
+
+def _start_date_neighbours(period_log):
+    """Nearest other start dates before and after a log, and whether one shares its day"""
+    others = and_(PeriodLog.user_id == period_log.user_id, PeriodLog.id != period_log.id)
+    start = period_log.actual_start_date
+    previous = select(func.max(PeriodLog.actual_start_date)).where(
+        others, PeriodLog.actual_start_date < start
+    ).scalar_subquery()
+    following = select(func.min(PeriodLog.actual_start_date)).where(
+        others, PeriodLog.actual_start_date > start
+    ).scalar_subquery()
+    same_day = select(func.count(PeriodLog.id)).where(
+        others, PeriodLog.actual_start_date == start
+    ).scalar_subquery()
+    previous, following, same_day = db.session.query(previous, following, same_day).one()
+    return {'previous': previous, 'following': following, 'duplicate': same_day > 0}
+
+def record_period_log_added(period_log):
+    """Fold a new or just-edited period log into the user's cycle aggregates"""
+    db.session.flush()
+    stats = CycleStatistics.query.filter_by(user_id=period_log.user_id).first()
+    if not stats:
+        # A fresh rebuild already includes this log
+        rebuild_cycle_statistics(period_log.user_id)
+        return
+    
+    aggregates = _aggregates_from_row(stats)
+    neighbours = _start_date_neighbours(period_log) if period_log.actual_start_date else {}
+    aggregates.add_log(period_log.actual_start_date, period_log.duration, period_log.delay_days, **neighbours)
+    _store_aggregates(stats, aggregates)
+
+def record_period_log_removed(period_log):
+    """Take a period log out of the aggregates before it is edited or deleted"""
+    stats = CycleStatistics.query.filter_by(user_id=period_log.user_id).first()
+    if not stats:
+        stats = rebuild_cycle_statistics(period_log.user_id)
+    
+    aggregates = _aggregates_from_row(stats)
+    neighbours = _start_date_neighbours(period_log) if period_log.actual_start_date else {}
+    aggregates.remove_log(period_log.actual_start_date, period_log.duration, period_log.delay_days, **neighbours)
+    _store_aggregates(stats, aggregates)
+
+def get_cycle_prediction(cycle_settings, cycles_ahead=1):
+    """Forecast from the user's whole period history (memoized per request)"""
+    memo = g.setdefault('cycle_predictions', {})
+    key = (cycle_settings.user_id, cycles_ahead)
+    if key in memo:
+        return memo[key]
+    
+    starts = db.session.scalars(
+        select(PeriodLog.actual_start_date).where(
+            PeriodLog.user_id == cycle_settings.user_id,
+            PeriodLog.actual_start_date.isnot(None)
+        )
+    ).all()
+    # Usually current_user, already in the session's identity map
+    user = db.session.get(User, cycle_settings.user_id)
+    memo[key] = cycle_prediction.predict_user(
+        cycle_settings.user_id, cycle_settings.avg_cycle_length, cycle_settings.start_date,
+        user.pcos if user else False, starts, cycles_ahead
+    )
+    return memo[key]
+
+def compute_cycle_state(cycle_settings, prediction, last_start, current_period, today):
+    """Today's cycle status from already loaded data
+
+    Shared by requests and the nightly refresh. `cycle_settings` and
+    `current_period` may be model instances or rows with the same attributes.
+    Returns a dict of CYCLE_STATE_FIELDS.
+    """
+    next_period = prediction['next_periods'][0]['start']
+    ovulation_date = prediction['next_periods'][0]['ovulation']
+    fields = {
+        'computed_on': today,
+        'next_period': next_period,
+        'ovulation_start': ovulation_date - timedelta(days=2),
+        'ovulation_end': ovulation_date + timedelta(days=2)
+    }
+    
+    if current_period and current_period.start_date <= today <= current_period.expected_end_date:
+        fields.update({
+            'status': 'period',
+            'day': (today - current_period.start_date).days + 1,
+            'total_days': cycle_settings.avg_period_length,
+            'delay_days': 0
+        })
+        return fields
+    
+    # Cycle day counts from the last actual period start
+    cycle_start = last_start or cycle_settings.start_date
+    fields.update({
+        'status': 'cycle',
+        'day': (today - cycle_start).days + 1,
+        'total_days': round(prediction['cycle_length']),
+        'delay_days': max(0, (today - next_period).days)
+    })
+    return fields
+
+def get_cycle_state_fields(cycle_settings):
+    """Today's materialized cycle state, or the same fields computed live if it is stale"""
+    today = datetime.now().date()
+    state = load_cycle_state(cycle_settings.user_id)
+    materialized = state['materialized'] if state else None
+    if materialized and materialized.computed_on == today:
+        return {name: getattr(materialized, name) for name in CYCLE_STATE_FIELDS}
+    
+    last_period = state['last_started'] if state else None
+    return compute_cycle_state(
+        cycle_settings,
+        get_cycle_prediction(cycle_settings),
+        last_period.actual_start_date if last_period else None,
+        state['current_period'] if state else None,
+        today
+    )
+
+def expire_current_periods(today, user_ids=None):
+    """Deactivate active periods whose expected end has passed, in one UPDATE"""
+    stmt = update(CurrentPeriod).where(
+        CurrentPeriod.is_active == True,
+        CurrentPeriod.expected_end_date < today
+    )
+    if user_ids is not None:
+        stmt = stmt.where(CurrentPeriod.user_id.in_(user_ids))
+    result = db.session.execute(
+        stmt.values(is_active=False).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def save_cycle_states(fields_by_user):
+    """Write CycleState rows for {user_id: fields} with one bulk UPDATE and one bulk INSERT"""
+    if not fields_by_user:
+        return
+    existing = dict(db.session.execute(
+        select(CycleState.user_id, CycleState.id).where(CycleState.user_id.in_(list(fields_by_user)))
+    ).all())
+    now = datetime.utcnow()
+    updates = []
+    inserts = []
+    for user_id, fields in fields_by_user.items():
+        values = dict(fields, user_id=user_id, updated_at=now)
+        if user_id in existing:
+            updates.append(dict(values, id=existing[user_id]))
+        else:
+            inserts.append(values)
+    if updates:
+        db.session.execute(update(CycleState), updates)
+    if inserts:
+        db.session.execute(insert(CycleState), inserts)
+
+def refresh_cycle_state(user_id):
+    """Recompute and store a user's cycle state after their cycle data changed"""
+    today = datetime.now().date()
+    expire_current_periods(today, [user_id])
+    forget_cycle_state(user_id)
+    state = load_cycle_state(user_id)
+    if state:
+        last_period = state['last_started']
+        fields = compute_cycle_state(
+            state['settings'],
+            get_cycle_prediction(state['settings']),
+            last_period.actual_start_date if last_period else None,
+            state['current_period'],
+            today
+        )
+        save_cycle_states({user_id: fields})
+    db.session.commit()
+    forget_cycle_state(user_id)
+    current_app.extensions['cycle_cache'].invalidate(user_id)
+
 def calculate_next_period(cycle_settings):
     """Calculate next expected period date"""
     if not cycle_settings:
         return None
     
-    # Find the last period log
-    last_period = PeriodLog.query.filter_by(
-        user_id=cycle_settings.user_id
-    ).order_by(PeriodLog.expected_date.desc()).first()
-    
-    if last_period and last_period.actual_start_date:
-        # Calculate from last actual period
-        next_date = last_period.actual_start_date + timedelta(days=cycle_settings.avg_cycle_length)
-    else:
-        # Calculate from cycle start date
-        next_date = cycle_settings.start_date + timedelta(days=cycle_settings.avg_cycle_length)
-    
-    return next_date
+    # From the latest actual start (or the setup date) plus the predicted cycle length
+    return get_cycle_state_fields(cycle_settings)['next_period']
 
 def calculate_ovulation_window(cycle_settings):
     """Calculate ovulation window (14 days before expected period)"""
-    next_period = calculate_next_period(cycle_settings)
-    if not next_period:
+    if not cycle_settings:
         return None, None
     
-    ovulation_date = next_period - timedelta(days=14)
-    ovulation_start = ovulation_date - timedelta(days=2)
-    ovulation_end = ovulation_date + timedelta(days=2)
-    
-    return ovulation_start, ovulation_end
+    fields = get_cycle_state_fields(cycle_settings)
+    return fields['ovulation_start'], fields['ovulation_end']
 
 def get_cycle_status(cycle_settings):
     """Get today's cycle status"""
@@ -200,239 +575,73 @@ def get_cycle_status(cycle_settings):
 
 def get_health_tip():
     """Get a random health tip"""
-    tips = [
-        "🌸 Stay hydrated! Drinking water can help reduce bloating during your period.",
-        "💪 Gentle exercise like yoga can help with cramps and mood swings.",
-        "😌 Practice self-care with a warm bath or heating pad for comfort.",
-        "🫶 Remember, it's okay to take it easy and listen to your body.",
-        "🌿 Herbal teas like chamomile can help soothe period symptoms.",
-        "💤 Getting enough sleep is crucial for hormonal balance.",
-        "🥗 Eating iron-rich foods can help with energy levels during your period.",
-        "🧘‍♀️ Deep breathing exercises can help manage stress and anxiety."
-    ]
-    import random
-    return random.choice(tips)
+    return health_content.random_tip()
 
 def get_motivational_quote(mood=None):
     """Get a random motivational quote, optionally based on mood"""
-    quotes = {
-        'happy': [
-            "Your joy is contagious! Keep shining! ✨",
-            "You're radiating positive energy today! 🌟",
-            "Your happiness makes the world brighter! 🌸"
-        ],
-        'sad': [
-            "It's okay to not be okay. Tomorrow is a new day 💕",
-            "You're stronger than you know. This too shall pass 🌅",
-            "Sending you virtual hugs and warm thoughts 🤗"
-        ],
-        'tired': [
-            "Rest is not a sign of weakness, it's self-care 💤",
-            "Take it easy today, you deserve it 😌",
-            "Your body is asking for rest - listen to it 🫶"
-        ],
-        'irritated': [
-            "Breathe deeply. You've got this under control 🧘‍♀️",
-            "It's okay to feel frustrated. Take a moment for yourself 💆‍♀️",
-            "Remember, this feeling is temporary. You're doing great! 💪"
-        ],
-        'default': [
-            "You are stronger than you think! 💪",
-            "Every cycle is a fresh start 🌸",
-            "Your body is amazing and doing exactly what it should 🫶",
-            "You've got this! Take care of yourself today 😌",
-            "Remember to be kind to yourself - you're doing great! ✨",
-            "Your strength inspires others 💖",
-            "Today is a new day full of possibilities 🌅",
-            "You are capable of amazing things! 🌟"
-        ]
-    }
-    
-    import random
-    if mood and mood in quotes:
-        return random.choice(quotes[mood])
-    return random.choice(quotes['default'])
+    return health_content.random_quote(mood)
 
 def get_health_tips_by_mood(mood):
     """Get health tips based on mood"""
-    tips = {
-        'sad': [
-            "🌸 Try gentle yoga or meditation to lift your spirits",
-            "💕 Call a friend or family member for support",
-            "🎵 Listen to your favorite uplifting music",
-            "🌿 Take a walk in nature to clear your mind",
-            "🫖 Sip on chamomile tea for natural calming effects"
-        ],
-        'tired': [
-            "💤 Prioritize sleep - aim for 7-9 hours tonight",
-            "🥗 Eat iron-rich foods like spinach and lentils",
-            "🚶‍♀️ Take short walks to boost energy naturally",
-            "💧 Stay hydrated - dehydration can cause fatigue",
-            "🧘‍♀️ Try gentle stretching to improve circulation"
-        ],
-        'irritated': [
-            "🧘‍♀️ Practice deep breathing exercises",
-            "🌿 Use lavender essential oil for calming effects",
-            "📱 Take a break from social media",
-            "🎨 Try a creative activity to channel emotions",
-            "🏃‍♀️ Light exercise can help release tension"
-        ],
-        'happy': [
-            "🌟 Channel this positive energy into self-care",
-            "💪 This is a great time for light exercise",
-            "🥗 Maintain healthy eating habits",
-            "💧 Keep up with hydration",
-            "😌 Practice gratitude journaling"
-        ]
-    }
-    return tips.get(mood, tips['happy'])
+    return health_content.tips_for_mood(mood)
 
 def get_health_tips_by_symptoms(symptoms):
     """Get health tips based on symptoms"""
-    tips = {
-        'cramps': [
-            "🔥 Use a heating pad or warm compress",
-            "🧘‍♀️ Try gentle yoga poses like child's pose",
-            "💊 Consider over-the-counter pain relief",
-            "🌿 Drink ginger tea for natural relief",
-            "💆‍♀️ Gentle abdominal massage can help"
-        ],
-        'bloating': [
-            "💧 Stay hydrated but avoid carbonated drinks",
-            "🥗 Eat smaller, more frequent meals",
-            "🧂 Reduce salt intake temporarily",
-            "🌿 Try peppermint tea for relief",
-            "🚶‍♀️ Light walking can help with digestion"
-        ],
-        'fatigue': [
-            "💤 Listen to your body and rest when needed",
-            "🥗 Eat iron-rich foods like spinach",
-            "💧 Stay well hydrated",
-            "🌅 Get some natural sunlight",
-            "🧘‍♀️ Try gentle stretching exercises"
-        ],
-        'mood_swings': [
-            "🧘‍♀️ Practice mindfulness and meditation",
-            "📝 Journal your feelings",
-            "🌿 Try calming herbal teas",
-            "💆‍♀️ Take warm baths with Epsom salts",
-            "🎵 Listen to calming music"
-        ]
-    }
-    return tips.get(symptoms, tips['cramps'])
+    return health_content.tips_for_symptom(symptoms)
 
 def get_lifestyle_disease_tips(condition):
     """Get tips for lifestyle diseases"""
-    tips = {
-        'pcos': [
-            "🥗 Focus on low-glycemic index foods",
-            "💪 Regular exercise helps with insulin resistance",
-            "🌿 Consider inositol supplements (consult doctor)",
-            "💤 Prioritize sleep for hormonal balance",
-            "🧘‍♀️ Stress management is crucial",
-            "🥑 Include healthy fats like avocado",
-            "🚫 Avoid processed foods and added sugars"
-        ],
-        'pcod': [
-            "🥗 Eat a balanced diet with whole foods",
-            "💪 Regular physical activity is important",
-            "🌿 Consider natural supplements like cinnamon",
-            "💤 Maintain regular sleep schedule",
-            "🧘‍♀️ Practice stress-reduction techniques",
-            "🥑 Include omega-3 rich foods",
-            "🚫 Limit refined carbohydrates"
-        ],
-        'thyroid': [
-            "🥗 Ensure adequate iodine intake",
-            "💪 Regular exercise supports thyroid function",
-            "🌿 Consider selenium-rich foods like Brazil nuts",
-            "💤 Prioritize quality sleep",
-            "🧘‍♀️ Manage stress levels",
-            "🥑 Include healthy fats for hormone production",
-            "🚫 Avoid excessive soy and cruciferous vegetables"
-        ]
-    }
-    return tips.get(condition, tips['pcos'])
+    return health_content.tips_for_condition(condition)
 
 def get_cycle_progress_info(cycle_settings):
     """Get detailed cycle progress information including period status"""
     if not cycle_settings:
         return None
     
-    today = datetime.now().date()
-    next_period = calculate_next_period(cycle_settings)
-    
-    if not next_period:
-        return None
-    
-    # Check if user is currently in an active period
-    current_period = CurrentPeriod.query.filter_by(
-        user_id=cycle_settings.user_id,
-        is_active=True
-    ).first()
+    fields = get_cycle_state_fields(cycle_settings)
     
-    if current_period and current_period.start_date <= today <= current_period.expected_end_date:
-        days_since_period_start = (today - current_period.start_date).days + 1
+    if fields['status'] == 'period':
         return {
             'status': 'period',
-            'day': days_since_period_start,
-            'total_days': cycle_settings.avg_period_length,
-            'message': f"Day {days_since_period_start} of Period",
+            'day': fields['day'],
+            'total_days': fields['total_days'],
+            'message': f"Day {fields['day']} of Period",
             'show_question': False
         }
     
-    # Auto-reset: If period has ended, deactivate current period
-    if current_period and today > current_period.expected_end_date:
-        current_period.is_active = False
-        db.session.commit()
-    
-    # Calculate cycle day from last period start
-    last_period = PeriodLog.query.filter_by(
-        user_id=cycle_settings.user_id
-    ).order_by(PeriodLog.actual_start_date.desc()).first()
-    
-    if last_period and last_period.actual_start_date:
-        cycle_start = last_period.actual_start_date
-    else:
-        cycle_start = cycle_settings.start_date
-    
-    cycle_day = (today - cycle_start).days + 1
-    
-    # Check if we should show the question box
-    days_until_period = (next_period - today).days
-    show_question = days_until_period <= 0
+    # Ask whether the period has started once the expected date is reached
+    today = datetime.now().date()
+    show_question = today >= fields['next_period']
+    delay_days = fields['delay_days']
     
-    if show_question:
-        delay_days = abs(days_until_period)
-        if delay_days == 0:
-            message = f"Day {cycle_day} of Cycle"
-        else:
-            message = f"{delay_days} Day{'s' if delay_days > 1 else ''} Delayed"
+    if show_question and delay_days > 0:
+        message = f"{delay_days} Day{'s' if delay_days > 1 else ''} Delayed"
     else:
-        message = f"Day {cycle_day} of Cycle"
+        message = f"Day {fields['day']} of Cycle"
     
     return {
         'status': 'cycle',
-        'day': cycle_day,
-        'total_days': cycle_settings.avg_cycle_length,
+        'day': fields['day'],
+        'total_days': fields['total_days'],
         'message': message,
         'show_question': show_question,
-        'delay_days': max(0, -days_until_period)
+        'delay_days': delay_days
     }
 
+def get_cached_cycle_progress(user_id):
+    """Today's cycle progress for a user, from the cycle cache when possible"""
+    today = datetime.now().date().isoformat()
+    progress = current_app.extensions['cycle_cache'].get(user_id, today)
+    if progress is None:
+        state = load_cycle_state(user_id)
+        progress = get_cycle_progress_info(state['settings'] if state else None)
+        if progress is not None:
+            current_app.extensions['cycle_cache'].set(user_id, today, progress)
+    return progress
+
 def get_supportive_message(delay_days):
     """Get supportive messages for delayed periods"""
-    messages = [
-        "It's okay, sometimes periods can be delayed due to stress, diet, or lifestyle changes.",
-        "Don't worry! Period delays are completely normal and can happen for various reasons.",
-        "Your body is unique and may not always follow a perfect schedule. That's normal!",
-        "Stress, travel, or changes in routine can affect your cycle. Be patient with yourself.",
-        "Remember, every woman's cycle is different. Your body knows what it's doing!",
-        "Take this time to practice self-care and listen to what your body needs.",
-        "Delays can be caused by hormonal fluctuations, which are completely natural.",
-        "Your period will come when your body is ready. Trust the process! 💕"
-    ]
-    
+    messages = health_content.supportive_messages
     if delay_days <= 3:
         return messages[0]
     elif delay_days <= 7:
@@ -441,114 +650,20 @@ def get_supportive_message(delay_days):
         return messages[2]
 
 def get_lifestyle_disease_advice(user):
-    """Get personalized advice based on user's health conditions"""
-    advice = {}
-    
-    if user.pcos:
-        advice['pcos'] = {
-            'diet': [
-                "Include low-glycemic index foods like quinoa, sweet potatoes",
-                "Add omega-3 rich foods like salmon, walnuts, flaxseeds",
-                "Avoid refined carbs and sugary foods",
-                "Include protein with every meal"
-            ],
-            'exercise': [
-                "30 minutes of moderate exercise daily",
-                "Strength training 2-3 times per week",
-                "Yoga for stress management",
-                "Walking or swimming for cardio"
-            ],
-            'self_care': [
-                "Practice stress management techniques",
-                "Get 7-8 hours of quality sleep",
-                "Monitor blood sugar levels",
-                "Regular check-ups with your doctor"
-            ]
-        }
-    
-    if user.thyroid:
-        advice['thyroid'] = {
-            'diet': [
-                "Include iodine-rich foods like seaweed, fish",
-                "Add selenium-rich foods like Brazil nuts",
-                "Avoid goitrogenic foods in excess",
-                "Include zinc-rich foods like pumpkin seeds"
-            ],
-            'exercise': [
-                "Gentle exercises like walking, yoga",
-                "Avoid over-exertion",
-                "Regular but moderate activity",
-                "Listen to your body's energy levels"
-            ],
-            'self_care': [
-                "Take medications as prescribed",
-                "Regular thyroid function tests",
-                "Manage stress levels",
-                "Adequate rest and sleep"
-            ]
-        }
-    
-    if user.anemia:
-        advice['anemia'] = {
-            'diet': [
-                "Iron-rich foods: spinach, lentils, red meat",
-                "Vitamin C with iron for better absorption",
-                "Avoid tea/coffee with meals",
-                "Include B12 rich foods like eggs, dairy"
-            ],
-            'exercise': [
-                "Start with gentle exercises",
-                "Gradually increase intensity",
-                "Listen to your body",
-                "Rest when needed"
-            ],
-            'self_care': [
-                "Regular iron supplements if prescribed",
-                "Monitor energy levels",
-                "Adequate sleep and rest",
-                "Regular blood tests"
-            ]
-        }
-    
-    if user.diabetes:
-        advice['diabetes'] = {
-            'diet': [
-                "Monitor carbohydrate intake",
-                "Include fiber-rich foods",
-                "Regular meal timing",
-                "Portion control"
-            ],
-            'exercise': [
-                "Regular physical activity",
-                "Blood sugar monitoring",
-                "Consult doctor before new exercises",
-                "Stay hydrated during exercise"
-            ],
-            'self_care': [
-                "Regular blood sugar monitoring",
-                "Foot care and inspection",
-                "Regular medical check-ups",
-                "Stress management"
-            ]
-        }
-    
-    return advice
+    """Get personalized advice based on user's health conditions (read-only)"""
+    return health_content.advice_bundle(user)[0]
+
+def get_lifestyle_advice_preview(user):
+    """Short advice items for the dashboard card, one per condition"""
+    return health_content.advice_bundle(user)[1]
 
 def get_water_tracking_stats(user_id):
     """Get water tracking statistics for the current week"""
-    today = datetime.now().date()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-    
-    water_entries = WaterTracker.query.filter(
-        WaterTracker.user_id == user_id,
-        WaterTracker.date >= week_start,
-        WaterTracker.date <= week_end
-    ).all()
+    summary = load_tracker_summary(user_id)
     
     total_days = 7
-    days_with_water = len([entry for entry in water_entries if entry.drank_water])
-    total_water = sum([entry.water_amount for entry in water_entries])
+    days_with_water = summary['days_with_water']
+    total_water = summary['total_water']
     
     return {
         'total_days': total_days,
@@ -560,19 +675,11 @@ def get_water_tracking_stats(user_id):
 
 def get_nutrition_tracking_stats(user_id):
     """Get nutrition tracking statistics for the current week"""
-    today = datetime.now().date()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-    
-    nutrition_entries = NutritionTracker.query.filter(
-        NutritionTracker.user_id == user_id,
-        NutritionTracker.date >= week_start,
-        NutritionTracker.date <= week_end
-    ).all()
+    summary = load_tracker_summary(user_id)
     
     total_days = 7
-    days_with_iron = len([entry for entry in nutrition_entries if entry.ate_iron_rich])
-    days_healthy = len([entry for entry in nutrition_entries if entry.ate_healthy])
+    days_with_iron = summary['days_with_iron']
+    days_healthy = summary['days_healthy']
     
     return {
         'total_days': total_days,
@@ -594,23 +701,427 @@ def get_self_care_activities(user_id, days=7):
     
     return activities
 
-# Make helper functions available to templates
-@app.context_processor
-def utility_processor():
+# One-row-per-day trackers: sync event type -> (model, columns a client may set, defaults)
+DAILY_TRACKERS = {
+    'mood': (MoodTracker, {'mood': None, 'symptoms': ''}),
+    'water': (WaterTracker, {'drank_water': False, 'water_amount': 2.0}),
+    'nutrition': (NutritionTracker, {'ate_iron_rich': False, 'ate_healthy': False, 'notes': ''})
+}
+SYNC_MAX_EVENTS = 500
+
+def dialect_insert(model):
+    """INSERT with on_conflict_do_update/do_nothing for the database in use"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    else:
+        raise RuntimeError(f"Upserts are not implemented for {dialect}")
+    return upsert_insert(model)
+
+def upsert_daily_entries(model, rows):
+    """Insert or update (user_id, date) tracker rows in one statement; returns the dates written
+
+    Relies on the unique (user_id, date) index, so concurrent writers for the
+    same day update one row instead of creating duplicates. A stored row is
+    only replaced by a row whose client_updated_at is not older, so a replayed
+    offline event cannot overwrite a newer entry; those dates are left out of
+    the result. Every row must have the same keys, including
+    client_updated_at, and a distinct (user_id, date).
+    """
+    table = model.__table__
+    stmt = dialect_insert(model).values(rows)
+    updates = {key: stmt.excluded[key] for key in rows[0] if key not in ('user_id', 'date', 'created_at')}
+    not_older = or_(
+        table.c.client_updated_at.is_(None),
+        stmt.excluded.client_updated_at >= table.c.client_updated_at
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'date'], set_=updates, where=not_older
+    ).returning(table.c.date)
+    return set(db.session.scalars(stmt).all())
+
+def upsert_daily_entry(model, user_id, day, values):
+    """Write one user's tracker row for a day with a single upsert statement"""
+    upsert_daily_entries(model, [dict(values, user_id=user_id, date=day, client_updated_at=datetime.utcnow())])
+    bump_data_version(user_id)
+
+def bump_data_version(user_id):
+    """Bump User.data_version for writes that bypass the ORM flush (bulk and upsert statements)"""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(
+            data_version=User.data_version + 1,
+            data_updated_at=datetime.utcnow()
+        )
+    )
+
+def parse_sync_timestamp(value):
+    """Client ISO 8601 timestamp -> naive UTC datetime (None if missing)"""
+    if not value:
+        return None
+    stamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if stamp.tzinfo:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return stamp
+
+def parse_sync_event(event_data):
+    """Validate one /sync event; returns (type, date, timestamp, values, client id)
+
+    Raises ValueError with a message for the per-item result.
+    """
+    if not isinstance(event_data, dict):
+        raise ValueError('event must be an object')
+    event_type = event_data.get('type')
+    if event_type not in DAILY_TRACKERS and event_type != 'self_care':
+        raise ValueError(f"unknown type {event_type!r}")
+    day = datetime.strptime(str(event_data.get('date', '')), '%Y-%m-%d').date()
+    if day > datetime.now().date() + timedelta(days=1):
+        raise ValueError('date is in the future')
+    timestamp = parse_sync_timestamp(event_data.get('timestamp'))
+    payload = event_data.get('data') or {}
+    client_id = event_data.get('id')
+    if client_id is not None and (not isinstance(client_id, str) or not 0 < len(client_id) <= 64):
+        raise ValueError('id must be a string of at most 64 characters')
+    
+    if event_type == 'self_care':
+        if not payload.get('activity_type'):
+            raise ValueError('activity_type is required')
+        values = {
+            'activity_type': str(payload['activity_type'])[:50],
+            'duration': int(payload.get('duration') or 0),
+            'notes': str(payload.get('notes') or '')
+        }
+    else:
+        defaults = DAILY_TRACKERS[event_type][1]
+        values = {}
+        for key, default in defaults.items():
+            value = payload.get(key, default)
+            if isinstance(default, bool):
+                value = bool(value)
+            elif isinstance(default, float):
+                value = float(value)
+            elif value is not None:
+                value = str(value)
+            values[key] = value
+        if event_type == 'mood' and not values['mood']:
+            raise ValueError('mood is required')
+    return event_type, day, timestamp, values, client_id
+
+def apply_sync_events(user_id, events):
+    """Upsert a batch of tracker events in one transaction; returns per-item results
+
+    Events for the same tracker and day are applied in client timestamp
+    order, so only the latest one is written. Earlier ones, and events older
+    than what is already stored for that day, are reported as superseded. An
+    event without a timestamp counts as sent now, and timestamps in the
+    future are clamped to now. Self-care events with an id are inserted once;
+    replays, including repeats within the batch, report duplicate.
+    """
+    results = [None] * len(events)
+    latest = {}  # (type, date) -> (timestamp, index, values)
+    self_care = []
+    self_care_ids = set()
+    now = datetime.utcnow()
+    for index, event_data in enumerate(events):
+        try:
+            event_type, day, timestamp, values, client_id = parse_sync_event(event_data)
+        except (ValueError, TypeError) as e:
+            results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+            continue
+        timestamp = min(timestamp or now, now)
+        values['created_at'] = timestamp
+        if event_type == 'self_care':
+            if client_id is not None and client_id in self_care_ids:
+                results[index] = {'index': index, 'status': 'duplicate'}
+                continue
+            self_care_ids.add(client_id)
+            self_care.append((index, day, values, client_id))
+            continue
+        key = (event_type, day)
+        if key in latest and latest[key][0] > timestamp:
+            results[index] = {'index': index, 'status': 'superseded'}
+            continue
+        if key in latest:
+            results[latest[key][1]] = {'index': latest[key][1], 'status': 'superseded'}
+        latest[key] = (timestamp, index, values)
+    
+    for event_type, (model, _) in DAILY_TRACKERS.items():
+        rows = []
+        indexes = {}  # date -> event index
+        for (row_type, day), (timestamp, index, values) in latest.items():
+            if row_type == event_type:
+                rows.append(dict(values, user_id=user_id, date=day, client_updated_at=timestamp))
+                indexes[day] = index
+        if rows:
+            written = upsert_daily_entries(model, rows)
+            for day, index in indexes.items():
+                status = 'upserted' if day in written else 'superseded'
+                results[index] = {'index': index, 'status': status}
+    
+    if self_care:
+        rows = [dict(values, user_id=user_id, date=day, client_event_id=client_id)
+                for _, day, values, client_id in self_care]
+        stmt = dialect_insert(SelfCareActivity).values(rows).on_conflict_do_nothing(
+            index_elements=['user_id', 'client_event_id']
+        ).returning(SelfCareActivity.client_event_id)
+        inserted = set(db.session.scalars(stmt).all())
+        for index, _, _, client_id in self_care:
+            status = 'inserted' if client_id is None or client_id in inserted else 'duplicate'
+            results[index] = {'index': index, 'status': status}
+    
+    if any(result['status'] in ('upserted', 'inserted') for result in results):
+        bump_data_version(user_id)
+    return results
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+def parse_history_cursor(cursor):
+    """Turn a 'YYYY-MM-DD_id' cursor into a (date, id) tuple"""
+    if not cursor:
+        return None
+    try:
+        day, row_id = cursor.split('_')
+        return datetime.strptime(day, '%Y-%m-%d').date(), int(row_id)
+    except ValueError:
+        abort(400)
+
+def get_keyset_page(query, date_column, id_column, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """Get one page of rows, newest first, keyed on (date, id)
+
+    Each page starts strictly after the last row of the previous one, so the
+    database seeks straight to it through the (user_id, date) index instead
+    of counting past an OFFSET. Returns the rows and the cursor for the next
+    page (None on the last page).
+    """
+    if cursor:
+        day, row_id = cursor
+        query = query.filter(or_(
+            date_column < day,
+            and_(date_column == day, id_column < row_id)
+        ))
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{getattr(last, date_column.key).isoformat()}_{last.id}"
+    return rows, next_cursor
+
+def get_period_log_page(user_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """Get a page of period logs, newest expected date first"""
+    query = PeriodLog.query.filter_by(user_id=user_id)
+    return get_keyset_page(query, PeriodLog.expected_date, PeriodLog.id, cursor, limit)
+
+def get_mood_page(user_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """Get a page of mood entries, newest first"""
+    query = MoodTracker.query.filter_by(user_id=user_id)
+    return get_keyset_page(query, MoodTracker.date, MoodTracker.id, cursor, limit)
+
+def get_history_counts(user_id):
+    """Count a user's period logs and mood entries in one query"""
+    period_logs = select(func.count(PeriodLog.id)).where(PeriodLog.user_id == user_id).scalar_subquery()
+    mood_trackers = select(func.count(MoodTracker.id)).where(MoodTracker.user_id == user_id).scalar_subquery()
+    row = db.session.query(period_logs, mood_trackers).one()
+    return {'period_logs': row[0], 'mood_trackers': row[1]}
+
+def period_log_to_dict(log):
     return {
-        'get_health_tips_by_mood': get_health_tips_by_mood,
-        'get_health_tips_by_symptoms': get_health_tips_by_symptoms,
-        'get_lifestyle_disease_tips': get_lifestyle_disease_tips
+        'id': log.id,
+        'expected_date': log.expected_date.isoformat(),
+        'actual_start_date': log.actual_start_date.isoformat() if log.actual_start_date else None,
+        'delay_days': log.delay_days,
+        'duration': log.duration,
+        'notes': log.notes
     }
 
+def mood_to_dict(mood):
+    return {
+        'id': mood.id,
+        'date': mood.date.isoformat(),
+        'mood': mood.mood,
+        'symptoms': mood.symptoms,
+        'created_at': mood.created_at.isoformat() if mood.created_at else None
+    }
+
+def get_code_version(app):
+    """Stamp of app.py, the templates and the asset build, so ETags change when a deploy changes the pages"""
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    paths = [__file__] + [os.path.join(template_dir, name) for name in os.listdir(template_dir)]
+    manifest = os.path.join(app.config['STATIC_ASSET_DIR'], assets.MANIFEST)
+    if os.path.exists(manifest):
+        paths.append(manifest)
+    return str(int(max(os.path.getmtime(path) for path in paths)))
+
+def read_from_replica(view):
+    """Run a view's reads on the read replica, when one is configured
+
+    Goes outside login_required so the user lookup is read from the replica
+    too. A user who has just written stays on the primary for a few seconds
+    (db_config.REPLICA_STICKY_SECONDS), so they always see their own change.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        db_config.use_replica_for_request()
+        return view(*args, **kwargs)
+    return wrapper
+
+def ops_only(view):
+    """Answer 404 unless the request carries the OPS_TOKEN bearer token
+
+    The peer address is not checked: behind a reverse proxy every request
+    comes from localhost.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config['OPS_TOKEN']
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if not token or scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip(), token):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+def conditional_on_data_version(daily=False):
+    """Answer 304 Not Modified while the user's data is unchanged since the client's copy
+
+    The ETag is built from current_user.data_version, which login_required has
+    already loaded, so a 304 runs no queries beyond the login lookup. Pass
+    daily=True for views whose output also depends on today's date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are rendered into the page
+            if '_flashes' in session:
+                return view(*args, **kwargs)
+            
+            today = datetime.now().date()
+            code_version = current_app.extensions['code_version']
+            parts = [code_version, current_user.id, current_user.data_version, request.full_path]
+            last_modified = (current_user.data_updated_at or current_user.created_at).replace(tzinfo=timezone.utc)
+            # A deploy changes the page (and the asset URLs in it) even when the data has not
+            last_modified = max(last_modified, datetime.fromtimestamp(int(code_version), timezone.utc))
+            if daily:
+                parts.append(today.isoformat())
+                midnight = datetime(today.year, today.month, today.day).astimezone(timezone.utc)
+                last_modified = max(last_modified, midnight)
+            etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified.replace(microsecond=0) <= since
+            
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+def render_static_page(template, **context):
+    """Render a page whose content is the same for every user from its pre-rendered blocks
+
+    Only the layout around the blocks (navigation with the user's name, flash
+    messages) is rendered per request, through static_page.html. `context`
+    must not change between requests. Browsers may keep the page for
+    STATIC_PAGE_MAX_AGE. Vary: Cookie makes them ask again after a logout or
+    another login, and the ETag turns that request into a 304.
+    """
+    # Pending flash messages are rendered into the page
+    if '_flashes' in session:
+        return render_template(template, **context)
+    
+    parts = [current_app.extensions['code_version'], current_user.get_id(), getattr(current_user, 'name', None), template]
+    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        page_context = dict(context)
+        current_app.update_template_context(page_context)
+        blocks = static_pages.blocks(current_app.jinja_env, template, page_context)
+        response = current_app.make_response(render_template('static_page.html', page=blocks))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['STATIC_PAGE_MAX_AGE']
+    response.vary.add('Cookie')
+    return response
+
+def history_page_response(rows, next_cursor, endpoint, template, context_name, to_dict):
+    """Render a history page as JSON (?format=json) or as HTML rows for infinite scroll"""
+    next_url = url_for(endpoint, cursor=next_cursor, limit=request.args.get('limit')) if next_cursor else None
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'items': [to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'next_url': next_url
+        })
+    
+    response = current_app.make_response(render_template(template, **{context_name: rows}))
+    if next_url:
+        response.headers['X-Next-Page'] = next_url
+    return response
+
+def asset_url(name):
+    """URL of a built asset by its logical name, or None before `flask build-assets` has run"""
+    filename = current_app.extensions['asset_manifest'].get(name)
+    return url_for('main.static_asset', filename=filename) if filename else None
+
+# Make helper functions available to templates
+TEMPLATE_HELPERS = {
+    'get_health_tips_by_mood': get_health_tips_by_mood,
+    'get_health_tips_by_symptoms': get_health_tips_by_symptoms,
+    'get_lifestyle_disease_tips': get_lifestyle_disease_tips,
+    'asset_url': asset_url,
+    'tailwind_theme': TAILWIND_THEME
+}
+
+@bp.app_context_processor
+def utility_processor():
+    return TEMPLATE_HELPERS
+
 # Routes
-@app.route('/')
+@bp.route('/static/dist/<path:filename>')
+def static_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it
+
+    Files of the previous build are served too (assets.build keeps them), so
+    pages rendered before a deploy still load their stylesheet.
+    """
+    path = os.path.join(current_app.config['STATIC_ASSET_DIR'], filename)
+    if not assets.is_fingerprinted(filename) or not os.path.isfile(path):
+        abort(404)
+    served_path, encoding = assets.encoded_variant(path, request.accept_encodings)
+    response = send_file(
+        served_path,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=current_app.config['STATIC_ASSET_MAX_AGE'],
+        conditional=True
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         name = request.form['name']
@@ -647,11 +1158,11 @@ def register():
         log_to_google_sheets('SIGNUP', user.id, email, name, request.remote_addr)
         
         flash('Registration successful! Please log in.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form['email']
@@ -662,24 +1173,26 @@ def login():
             login_user(user)
             # Log to Google Sheets
             log_to_google_sheets('LOGIN', user.id, email, user.name, request.remote_addr)
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         else:
             flash('Invalid email or password!', 'error')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     # Log to Google Sheets before logout
     log_to_google_sheets('LOGOUT', current_user.id, current_user.email, current_user.name, request.remote_addr)
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
+@read_from_replica
 @login_required
 def dashboard():
-    cycle_settings = CycleSettings.query.filter_by(user_id=current_user.id).first()
+    state = load_cycle_state(current_user.id)
+    cycle_settings = state['settings'] if state else None
     next_period = calculate_next_period(cycle_settings) if cycle_settings else None
     ovulation_start, ovulation_end = calculate_ovulation_window(cycle_settings) if cycle_settings else (None, None)
     cycle_status = get_cycle_status(cycle_settings)
@@ -690,17 +1203,14 @@ def dashboard():
     
     # Get today's mood entry
     today = datetime.now().date()
-    today_mood = MoodTracker.query.filter_by(
-        user_id=current_user.id, 
-        date=today
-    ).first()
+    today_mood = load_tracker_summary(current_user.id)['today_mood']
     
     # Get water and nutrition tracking stats
     water_stats = get_water_tracking_stats(current_user.id)
     nutrition_stats = get_nutrition_tracking_stats(current_user.id)
     
     # Get lifestyle advice
-    lifestyle_advice = get_lifestyle_disease_advice(current_user)
+    lifestyle_advice = get_lifestyle_advice_preview(current_user)
     
     # Get mood-based quote
     quote = get_motivational_quote(today_mood.mood if today_mood else None)
@@ -720,7 +1230,7 @@ def dashboard():
                          nutrition_stats=nutrition_stats,
                          lifestyle_advice=lifestyle_advice)
 
-@app.route('/setup_cycle', methods=['GET', 'POST'])
+@bp.route('/setup_cycle', methods=['GET', 'POST'])
 @login_required
 def setup_cycle():
     if request.method == 'POST':
@@ -744,19 +1254,21 @@ def setup_cycle():
             db.session.add(cycle_settings)
         
         db.session.commit()
+        refresh_cycle_state(current_user.id)
         flash('Cycle settings updated successfully!', 'success')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     
     cycle_settings = CycleSettings.query.filter_by(user_id=current_user.id).first()
     return render_template('setup_cycle.html', cycle_settings=cycle_settings)
 
-@app.route('/period_reminder', methods=['GET', 'POST'])
+@bp.route('/period_reminder', methods=['GET', 'POST'])
 @login_required
 def period_reminder():
-    cycle_settings = CycleSettings.query.filter_by(user_id=current_user.id).first()
+    state = load_cycle_state(current_user.id)
+    cycle_settings = state['settings'] if state else None
     if not cycle_settings:
         flash('Please set up your cycle first!', 'error')
-        return redirect(url_for('setup_cycle'))
+        return redirect(url_for('.setup_cycle'))
     
     next_period = calculate_next_period(cycle_settings)
     today = datetime.now().date()
@@ -773,10 +1285,12 @@ def period_reminder():
                 delay_days=0
             )
             db.session.add(period_log)
+            record_period_log_added(period_log)
             db.session.commit()
+            refresh_cycle_state(current_user.id)
             
             flash(f'Period logged! {get_motivational_quote()}', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         else:
             # Calculate delay
             delay_days = (today - next_period).days
@@ -784,19 +1298,20 @@ def period_reminder():
                 flash(f'Noted! You\'re {delay_days} day(s) delayed. Don\'t worry, this is normal! 💕', 'info')
             else:
                 flash('Noted! We\'ll ask again tomorrow. Take care! 💕', 'info')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
     
     # Check if we should show reminder
     if next_period and (next_period - today).days <= 0:
         return render_template('period_reminder.html', next_period=next_period)
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('.dashboard'))
 
-@app.route('/confirm_period', methods=['POST'])
+@bp.route('/confirm_period', methods=['POST'])
 @login_required
 def confirm_period():
     """Handle smart period confirmation"""
-    cycle_settings = CycleSettings.query.filter_by(user_id=current_user.id).first()
+    state = load_cycle_state(current_user.id)
+    cycle_settings = state['settings'] if state else None
     if not cycle_settings:
         return jsonify({'success': False, 'message': 'Please set up your cycle first!'})
     
@@ -818,15 +1333,13 @@ def confirm_period():
             delay_days=delay_days
         )
         db.session.add(period_log)
+        record_period_log_added(period_log)
         
         # Create or update current period tracking
         expected_end_date = today + timedelta(days=cycle_settings.avg_period_length - 1)
         
         # Deactivate any existing current period
-        existing_current = CurrentPeriod.query.filter_by(
-            user_id=current_user.id,
-            is_active=True
-        ).first()
+        existing_current = state['current_period']
         if existing_current:
             existing_current.is_active = False
         
@@ -839,6 +1352,7 @@ def confirm_period():
         )
         db.session.add(current_period)
         db.session.commit()
+        refresh_cycle_state(current_user.id)
         
         # Log to Google Sheets
         log_to_google_sheets('period_confirmed', current_user.id, current_user.email, current_user.name, request.remote_addr)
@@ -871,12 +1385,13 @@ def confirm_period():
             'message_text': f"{delay_days} Day{'s' if delay_days > 1 else ''} Delayed" if delay_days > 0 else "Day of Cycle"
         })
 
-@app.route('/get_cycle_progress')
+@bp.route('/get_cycle_progress')
+@read_from_replica
 @login_required
+@conditional_on_data_version(daily=True)
 def get_cycle_progress():
     """Get current cycle progress for AJAX updates"""
-    cycle_settings = CycleSettings.query.filter_by(user_id=current_user.id).first()
-    progress_info = get_cycle_progress_info(cycle_settings)
+    progress_info = get_cached_cycle_progress(current_user.id)
     
     if not progress_info:
         return jsonify({'success': False, 'message': 'No cycle data available'})
@@ -886,7 +1401,40 @@ def get_cycle_progress():
         'progress': progress_info
     })
 
-@app.route('/complete_period', methods=['POST'])
+@bp.route('/cache-stats')
+@ops_only
+def cache_stats():
+    """Hit rates and counters of this process's caches and background queues (OPS_TOKEN only)"""
+    return jsonify({
+        'cycle_cache': current_app.extensions['cycle_cache'].stats(),
+        'sheets_client': sheets_registry.stats(),
+        'activity_log': activity_logger.stats()
+    })
+
+@bp.route('/metrics')
+@ops_only
+def metrics():
+    """Request timings of this process in Prometheus text format (OPS_TOKEN only)"""
+    return Response(request_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/predictions')
+@login_required
+def predictions():
+    """Forecast the next ?cycles=N periods (1-12) with confidence intervals"""
+    state = load_cycle_state(current_user.id)
+    cycle_settings = state['settings'] if state else None
+    if not cycle_settings:
+        return jsonify({'success': False, 'message': 'Please set up your cycle first!'})
+    
+    cycles_ahead = min(max(request.args.get('cycles', 3, type=int), 1), 12)
+    prediction = dict(get_cycle_prediction(cycle_settings, cycles_ahead))
+    prediction['next_periods'] = [
+        {name: day.isoformat() for name, day in period.items()}
+        for period in prediction['next_periods']
+    ]
+    return jsonify({'success': True, 'prediction': prediction})
+
+@bp.route('/complete_period', methods=['POST'])
 @login_required
 def complete_period():
     """Complete current period and auto-reset cycle"""
@@ -914,13 +1462,16 @@ def complete_period():
     ).first()
     
     if period_log:
+        record_period_log_removed(period_log)
         period_log.duration = duration
         period_log.notes = notes
+        record_period_log_added(period_log)
         db.session.commit()
     
     # Deactivate current period
     current_period.is_active = False
     db.session.commit()
+    refresh_cycle_state(current_user.id)
     
     # Log to Google Sheets
     log_to_google_sheets('period_completed', current_user.id, current_user.email, current_user.name, request.remote_addr)
@@ -934,7 +1485,7 @@ def complete_period():
         'message_text': 'Day 1 of Cycle'
     })
 
-@app.route('/track_mood', methods=['POST'])
+@bp.route('/track_mood', methods=['POST'])
 @login_required
 def track_mood():
     data = request.get_json()
@@ -942,43 +1493,53 @@ def track_mood():
     mood = data['mood']
     symptoms = data.get('symptoms', '')
     
-    # Check if mood entry already exists for this date
-    existing_mood = MoodTracker.query.filter_by(
-        user_id=current_user.id, 
-        date=date
-    ).first()
-    
-    if existing_mood:
-        existing_mood.mood = mood
-        existing_mood.symptoms = symptoms
-    else:
-        mood_entry = MoodTracker(
-            user_id=current_user.id,
-            date=date,
-            mood=mood,
-            symptoms=symptoms
-        )
-        db.session.add(mood_entry)
-    
+    upsert_daily_entry(MoodTracker, current_user.id, date, {'mood': mood, 'symptoms': symptoms})
     db.session.commit()
     return jsonify({'success': True})
 
-@app.route('/history')
+@bp.route('/history')
+@read_from_replica
 @login_required
+@conditional_on_data_version()
 def history():
-    # Get last 6 months of data
-    six_months_ago = datetime.now().date() - timedelta(days=180)
-    period_logs = PeriodLog.query.filter_by(user_id=current_user.id).filter(
-        PeriodLog.expected_date >= six_months_ago
-    ).order_by(PeriodLog.expected_date.desc()).all()
-    
-    mood_trackers = MoodTracker.query.filter_by(user_id=current_user.id).filter(
-        MoodTracker.date >= six_months_ago
-    ).order_by(MoodTracker.date.desc()).all()
-    
-    return render_template('history.html', period_logs=period_logs, mood_trackers=mood_trackers)
+    # Only the newest page of each list is rendered; older pages load on scroll
+    period_logs, period_cursor = get_period_log_page(current_user.id)
+    mood_trackers, mood_cursor = get_mood_page(current_user.id)
+    history_counts = get_history_counts(current_user.id)
+    cycle_stats = get_cycle_summary(current_user.id)
+    return render_template('history.html',
+                         period_logs=period_logs,
+                         period_cursor=period_cursor,
+                         mood_trackers=mood_trackers,
+                         mood_cursor=mood_cursor,
+                         history_counts=history_counts,
+                         cycle_stats=cycle_stats)
+
+@bp.route('/history/periods')
+@read_from_replica
+@login_required
+@conditional_on_data_version()
+def history_periods():
+    """Older period logs for infinite scroll, or as JSON with ?format=json"""
+    cursor = parse_history_cursor(request.args.get('cursor'))
+    limit = min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE)
+    rows, next_cursor = get_period_log_page(current_user.id, cursor, max(1, limit))
+    return history_page_response(rows, next_cursor, '.history_periods',
+                                 'history_period_rows.html', 'period_logs', period_log_to_dict)
 
-@app.route('/add_period_log', methods=['POST'])
+@bp.route('/history/moods')
+@read_from_replica
+@login_required
+@conditional_on_data_version()
+def history_moods():
+    """Older mood entries for infinite scroll, or as JSON with ?format=json"""
+    cursor = parse_history_cursor(request.args.get('cursor'))
+    limit = min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE)
+    rows, next_cursor = get_mood_page(current_user.id, cursor, max(1, limit))
+    return history_page_response(rows, next_cursor, '.history_moods',
+                                 'history_mood_cards.html', 'mood_trackers', mood_to_dict)
+
+@bp.route('/add_period_log', methods=['POST'])
 @login_required
 def add_period_log():
     expected_date = datetime.strptime(request.form['expected_date'], '%Y-%m-%d').date()
@@ -1001,13 +1562,17 @@ def add_period_log():
     )
     
     db.session.add(period_log)
+    record_period_log_added(period_log)
     db.session.commit()
+    refresh_cycle_state(current_user.id)
     
     flash('Period log added successfully!', 'success')
-    return redirect(url_for('history'))
+    return redirect(url_for('.history'))
 
-@app.route('/health-tips')
+@bp.route('/health-tips')
+@read_from_replica
 @login_required
+@conditional_on_data_version(daily=True)
 def health_tips():
     # Get user's current mood for personalized tips
     today = datetime.now().date()
@@ -1023,12 +1588,12 @@ def health_tips():
                          today_mood=today_mood,
                          favorite_tips=favorite_tips)
 
-@app.route('/period-kit')
+@bp.route('/period-kit')
 @login_required
 def period_kit():
-    return render_template('period_kit.html')
+    return render_static_page('period_kit.html')
 
-@app.route('/save_favorite_tip', methods=['POST'])
+@bp.route('/save_favorite_tip', methods=['POST'])
 @login_required
 def save_favorite_tip():
     data = request.get_json()
@@ -1053,7 +1618,7 @@ def save_favorite_tip():
     
     return jsonify({'success': False, 'message': 'Tip already in favorites!'})
 
-@app.route('/remove_favorite_tip', methods=['POST'])
+@bp.route('/remove_favorite_tip', methods=['POST'])
 @login_required
 def remove_favorite_tip():
     data = request.get_json()
@@ -1071,7 +1636,7 @@ def remove_favorite_tip():
     
     return jsonify({'success': False, 'message': 'Tip not found!'})
 
-@app.route('/edit_period_log', methods=['POST'])
+@bp.route('/edit_period_log', methods=['POST'])
 @login_required
 def edit_period_log():
     log_id = request.form['log_id']
@@ -1085,19 +1650,22 @@ def edit_period_log():
     ).first()
     
     if period_log:
+        record_period_log_removed(period_log)
         if actual_start_date:
             period_log.actual_start_date = actual_start_date
             period_log.delay_days = (actual_start_date - period_log.expected_date).days
         period_log.duration = duration
         period_log.notes = notes
+        record_period_log_added(period_log)
         db.session.commit()
+        refresh_cycle_state(current_user.id)
         flash('Period log updated successfully!', 'success')
     else:
         flash('Period log not found!', 'error')
     
-    return redirect(url_for('history'))
+    return redirect(url_for('.history'))
 
-@app.route('/track_water', methods=['POST'])
+@bp.route('/track_water', methods=['POST'])
 @login_required
 def track_water():
     """Track water intake for the day"""
@@ -1106,23 +1674,10 @@ def track_water():
     water_amount = data.get('water_amount', 2.0)  # Default 2L
     date = datetime.strptime(data.get('date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
     
-    # Check if entry exists for today
-    existing_entry = WaterTracker.query.filter_by(
-        user_id=current_user.id,
-        date=date
-    ).first()
-    
-    if existing_entry:
-        existing_entry.drank_water = drank_water
-        existing_entry.water_amount = water_amount
-    else:
-        water_entry = WaterTracker(
-            user_id=current_user.id,
-            date=date,
-            drank_water=drank_water,
-            water_amount=water_amount
-        )
-        db.session.add(water_entry)
+    upsert_daily_entry(WaterTracker, current_user.id, date, {
+        'drank_water': drank_water,
+        'water_amount': water_amount
+    })
     
     db.session.commit()
     
@@ -1131,7 +1686,7 @@ def track_water():
         'message': 'Water intake logged successfully! 💧'
     })
 
-@app.route('/track_nutrition', methods=['POST'])
+@bp.route('/track_nutrition', methods=['POST'])
 @login_required
 def track_nutrition():
     """Track nutrition for the day"""
@@ -1141,25 +1696,11 @@ def track_nutrition():
     notes = data.get('notes', '')
     date = datetime.strptime(data.get('date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
     
-    # Check if entry exists for today
-    existing_entry = NutritionTracker.query.filter_by(
-        user_id=current_user.id,
-        date=date
-    ).first()
-    
-    if existing_entry:
-        existing_entry.ate_iron_rich = ate_iron_rich
-        existing_entry.ate_healthy = ate_healthy
-        existing_entry.notes = notes
-    else:
-        nutrition_entry = NutritionTracker(
-            user_id=current_user.id,
-            date=date,
-            ate_iron_rich=ate_iron_rich,
-            ate_healthy=ate_healthy,
-            notes=notes
-        )
-        db.session.add(nutrition_entry)
+    upsert_daily_entry(NutritionTracker, current_user.id, date, {
+        'ate_iron_rich': ate_iron_rich,
+        'ate_healthy': ate_healthy,
+        'notes': notes
+    })
     
     db.session.commit()
     
@@ -1168,7 +1709,7 @@ def track_nutrition():
         'message': 'Nutrition logged successfully! 🥗'
     })
 
-@app.route('/self_care', methods=['GET', 'POST'])
+@bp.route('/self_care', methods=['GET', 'POST'])
 @login_required
 def self_care():
     """Self-care activities page"""
@@ -1199,7 +1740,34 @@ def self_care():
     
     return render_template('self_care.html', activities=activities)
 
-@app.route('/lifestyle_advice')
+@bp.route('/sync', methods=['POST'])
+@login_required
+def sync():
+    """Apply a batch of offline tracker events in one transaction
+
+    Body: {"events": [{"type": "water", "date": "2024-05-01",
+    "timestamp": "2024-05-01T08:30:00Z", "id": "optional-client-id",
+    "data": {"drank_water": true, "water_amount": 2.0}}, ...]}
+    Types are mood, water, nutrition and self_care.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({'success': False, 'message': 'events must be a list'}), 400
+    if len(events) > SYNC_MAX_EVENTS:
+        return jsonify({'success': False, 'message': f'At most {SYNC_MAX_EVENTS} events per request'}), 413
+    
+    try:
+        results = apply_sync_events(current_user.id, events)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Sync failed: {e}")
+        return jsonify({'success': False, 'message': 'Sync failed, nothing was saved'}), 500
+    
+    return jsonify({'success': True, 'results': results})
+
+@bp.route('/lifestyle_advice')
 @login_required
 def lifestyle_advice():
     """Personalized lifestyle advice based on health conditions"""
@@ -1207,154 +1775,594 @@ def lifestyle_advice():
     
     return render_template('lifestyle_advice.html', advice=advice)
 
-@app.route('/educational_blog')
+# Blog posts (you can add sample data or create a blog management system)
+EDUCATIONAL_BLOG_POSTS = [
+    {
+        'title': 'Common Period Myths Debunked',
+        'content': 'Let\'s talk about some common misconceptions about periods...',
+        'category': 'myths',
+        'image_url': '/static/images/blog/myths.jpg'
+    },
+    {
+        'title': 'Famous Women Who Broke Period Taboos',
+        'content': 'Throughout history, many women have fought against period stigma...',
+        'category': 'stories',
+        'image_url': '/static/images/blog/stories.jpg'
+    },
+    {
+        'title': 'Understanding Your Menstrual Cycle',
+        'content': 'Your menstrual cycle is more than just your period...',
+        'category': 'awareness',
+        'image_url': '/static/images/blog/awareness.jpg'
+    }
+]
+
+@bp.route('/educational_blog')
 @login_required
 def educational_blog():
     """Educational blog about menstrual health"""
-    # Get blog posts (you can add sample data or create a blog management system)
-    blog_posts = [
-        {
-            'title': 'Common Period Myths Debunked',
-            'content': 'Let\'s talk about some common misconceptions about periods...',
-            'category': 'myths',
-            'image_url': '/static/images/blog/myths.jpg'
-        },
-        {
-            'title': 'Famous Women Who Broke Period Taboos',
-            'content': 'Throughout history, many women have fought against period stigma...',
-            'category': 'stories',
-            'image_url': '/static/images/blog/stories.jpg'
-        },
-        {
-            'title': 'Understanding Your Menstrual Cycle',
-            'content': 'Your menstrual cycle is more than just your period...',
-            'category': 'awareness',
-            'image_url': '/static/images/blog/awareness.jpg'
-        }
-    ]
-    
-    return render_template('educational_blog.html', blog_posts=blog_posts)
+    return render_static_page('educational_blog.html', blog_posts=EDUCATIONAL_BLOG_POSTS)
 
-@app.route('/blog')
+@bp.route('/blog')
 @login_required
 def blog():
-    return render_template('blog.html')
+    return render_static_page('blog.html')
 
-@app.route('/blog/menstrual-cycle')
+@bp.route('/blog/menstrual-cycle')
 @login_required
 def menstrual_cycle():
-    return render_template('menstrual_cycle.html')
+    return render_static_page('menstrual_cycle.html')
 
-@app.route('/blog/period-taboos')
+@bp.route('/blog/period-taboos')
 @login_required
 def period_taboos():
-    return render_template('period_taboos.html')
+    return render_static_page('period_taboos.html')
 
-@app.route('/blog/period-myths')
+@bp.route('/blog/period-myths')
 @login_required
 def period_myths():
-    return render_template('period_myths.html')
+    return render_static_page('period_myths.html')
 
-@app.route('/export_data')
-@login_required
-def export_data():
-    """Export user data to PDF"""
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    from io import BytesIO
-    
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.pink
-    )
-    story.append(Paragraph(f"Period Tracker Report for {current_user.name}", title_style))
-    story.append(Spacer(1, 20))
-    
-    # User Info
-    story.append(Paragraph("User Information", styles['Heading2']))
+def build_export_report(user):
+    """Collect the plain data that goes into a user's PDF report"""
     user_info = [
-        ['Name', current_user.name],
-        ['Email', current_user.email],
-        ['Age', str(current_user.age) if current_user.age else 'Not specified'],
+        ['Name', user.name],
+        ['Email', user.email],
+        ['Age', str(user.age) if user.age else 'Not specified'],
         ['Health Conditions', ', '.join([
-            'PCOS' if current_user.pcos else '',
-            'Thyroid' if current_user.thyroid else '',
-            'Anemia' if current_user.anemia else '',
-            'Diabetes' if current_user.diabetes else ''
+            'PCOS' if user.pcos else '',
+            'Thyroid' if user.thyroid else '',
+            'Anemia' if user.anemia else '',
+            'Diabetes' if user.diabetes else ''
         ]).strip(', ') or 'None']
     ]
     
-    user_table = Table(user_info)
-    user_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.pink),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(user_table)
-    story.append(Spacer(1, 20))
-    
-    # Period History
-    story.append(Paragraph("Period History (Last 6 Months)", styles['Heading2']))
-    period_logs = PeriodLog.query.filter_by(user_id=current_user.id).order_by(PeriodLog.expected_date.desc()).limit(6).all()
-    
-    if period_logs:
-        period_data = [['Expected Date', 'Actual Date', 'Delay', 'Duration', 'Notes']]
-        for log in period_logs:
-            period_data.append([
-                log.expected_date.strftime('%Y-%m-%d'),
-                log.actual_start_date.strftime('%Y-%m-%d') if log.actual_start_date else 'Not logged',
-                str(log.delay_days) if log.delay_days else '0',
-                str(log.duration) if log.duration else 'Not specified',
-                log.notes or 'No notes'
-            ])
-        
-        period_table = Table(period_data)
-        period_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lavender),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(period_table)
+    period_logs = PeriodLog.query.filter_by(user_id=user.id).order_by(PeriodLog.expected_date.desc()).limit(6).all()
+    period_rows = []
+    for log in period_logs:
+        period_rows.append([
+            log.expected_date.strftime('%Y-%m-%d'),
+            log.actual_start_date.strftime('%Y-%m-%d') if log.actual_start_date else 'Not logged',
+            str(log.delay_days) if log.delay_days else '0',
+            str(log.duration) if log.duration else 'Not specified',
+            log.notes or 'No notes'
+        ])
+    
+    summary = get_cycle_summary(user.id)
+    delays = summary['delay_distribution']
+    stats_rows = [
+        ['Cycles Tracked', str(summary['cycle_count'])],
+        ['Average Cycle Length', f"{summary['avg_cycle_length']} days"],
+        ['Cycle Length Variation', f"± {summary['cycle_length_stddev']} days"],
+        ['Average Period Duration', f"{summary['avg_duration']} days" if summary['avg_duration'] else 'Not specified'],
+        ['Early / On Time', f"{delays['early']} / {delays['on_time']}"],
+        ['Late 1-3 / 4-7 / 7+ Days', f"{delays['late_1_3_days']} / {delays['late_4_7_days']} / {delays['late_over_week']}"]
+    ]
+    
+    return {
+        'name': user.name,
+        'user_info': user_info,
+        'period_rows': period_rows,
+        'stats_rows': stats_rows
+    }
+
+def get_export_version(user):
+    """Stamp that changes whenever anything shown in the user's report changes"""
+    stats = get_cycle_statistics(user.id)
+    log_count, last_log_id = db.session.query(
+        func.count(PeriodLog.id), func.max(PeriodLog.id)
+    ).filter(PeriodLog.user_id == user.id).one()
+    parts = [
+        user.name, user.email, user.age, user.pcos, user.thyroid, user.anemia, user.diabetes,
+        log_count, last_log_id, stats.updated_at
+    ]
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+def start_export_job(user):
+    """Queue a PDF export for the user's current data (no-op if already cached)"""
+    version = get_export_version(user)
+    job_id = export_jobs.job_id(user.id, version)
+    if export_jobs.status(job_id) == 'done':
+        return job_id
+    return export_jobs.submit(user.id, version, build_export_report(user))
+
+def check_export_job_owner(job_id):
+    """404 unless job_id is well formed and belongs to the current user"""
+    if not EXPORT_JOB_ID.match(job_id) or job_id.split('-')[0] != str(current_user.id):
+        abort(404)
+
+def export_job_info(job_id):
+    status = export_jobs.status(job_id)
+    info = {
+        'job_id': job_id,
+        'status': status,
+        'status_url': url_for('.export_job_status', job_id=job_id)
+    }
+    if status == 'done':
+        info['download_url'] = url_for('.download_export', job_id=job_id)
+    elif status == 'failed':
+        info['error'] = export_jobs.error(job_id)
+    return info
+
+def send_export_file(job_id):
+    response = send_file(
+        export_jobs.cached_path(job_id),
+        as_attachment=True,
+        download_name=f'period_tracker_report_{current_user.name}_{datetime.now().strftime("%Y%m%d")}.pdf',
+        mimetype='application/pdf',
+        conditional=True
+    )
+    response.cache_control.private = True
+    return response
+
+@bp.route('/export_data')
+@login_required
+def export_data():
+    """Export user data to PDF: served from the cache, or rendered in the background
+
+    Answers 202 with the job's status_url while the report is being rendered;
+    poll it and download from download_url once the job is done.
+    """
+    job_id = start_export_job(current_user)
+    if export_jobs.status(job_id) == 'done':
+        return send_export_file(job_id)
+    return jsonify(export_job_info(job_id)), 202
+
+@bp.route('/export_data/jobs', methods=['POST'])
+@login_required
+def create_export_job():
+    """Start a PDF export job and return its ID and polling URL"""
+    job_id = start_export_job(current_user)
+    return jsonify(export_job_info(job_id)), 202
+
+@bp.route('/export_data/jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    """Poll an export job"""
+    check_export_job_owner(job_id)
+    if export_jobs.status(job_id) is None:
+        abort(404)
+    return jsonify(export_job_info(job_id))
+
+@bp.route('/export_data/jobs/<job_id>/download')
+@login_required
+def download_export(job_id):
+    """Download a finished export"""
+    check_export_job_owner(job_id)
+    status = export_jobs.status(job_id)
+    if status is None:
+        abort(404)
+    if status != 'done':
+        return jsonify(export_job_info(job_id)), 409
+    return send_export_file(job_id)
+
+# Every table holding a user's own history, as (name, model, columns never exported)
+BULK_EXPORT_TABLES = [
+    ('period_log', PeriodLog, ()),
+    ('mood_tracker', MoodTracker, ()),
+    ('water_tracker', WaterTracker, ()),
+    ('nutrition_tracker', NutritionTracker, ()),
+    ('self_care_activity', SelfCareActivity, ()),
+    ('favorite_tip', FavoriteTip, ())
+]
+
+def get_bulk_export_tables():
+    """Tables selected by ?table=a,b (default: all), as (name, table, exclude)"""
+    names = [name for name in request.args.get('table', '').split(',') if name]
+    known = {name: (name, model.__table__, exclude) for name, model, exclude in BULK_EXPORT_TABLES}
+    if not names:
+        return list(known.values())
+    if any(name not in known for name in names):
+        abort(400, description=f"Unknown table; choose from {', '.join(known)}")
+    return [known[name] for name in names]
+
+@bp.route('/export_data/full.<fmt>')
+@login_required
+def export_full_history(fmt):
+    """Stream every row of the user's history as csv (one table), zip (of CSVs) or ndjson"""
+    tables = get_bulk_export_tables()
+    user_id = current_user.id
+    own_rows = lambda table: table.c.user_id == user_id
+    filename = f'period_tracker_{user_id}_{datetime.now().strftime("%Y%m%d")}'
+    
+    if fmt == 'csv':
+        if len(tables) != 1:
+            abort(400, description='CSV export needs exactly one ?table=; use full.zip for all tables')
+        name, table, exclude = tables[0]
+        body = data_export.stream_csv(db.session, table, own_rows(table), exclude)
+        mimetype = 'text/csv'
+        filename = f'{filename}_{name}.csv'
+    elif fmt == 'zip':
+        body = data_export.stream_csv_zip(db.session, tables, own_rows)
+        mimetype = 'application/zip'
+        filename = f'{filename}.zip'
+    elif fmt == 'ndjson':
+        body = data_export.stream_ndjson(db.session, tables, own_rows)
+        mimetype = 'application/x-ndjson'
+        filename = f'{filename}.ndjson'
+    else:
+        abort(404)
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
+# Database maintenance commands
+@bp.cli.command('migrate-db')
+def migrate_db_command():
+    """Upgrade the database schema in place"""
+    applied = migrations.upgrade(db.engine, db.metadata)
+    if applied:
+        print(f"Database upgraded to version {migrations.HEAD_VERSION}")
     else:
-        story.append(Paragraph("No period data available", styles['Normal']))
+        print(f"Database already at version {migrations.current_version(db.engine)}")
+
+@bp.cli.command('compile-templates')
+def compile_templates_command():
+    """Compile every template into the bytecode cache, so new workers skip parsing"""
+    started = time.perf_counter()
+    count = compile_templates(current_app)
+    print(f"Compiled {count} templates into {current_app.config['TEMPLATE_CACHE_DIR']} "
+          f"in {time.perf_counter() - started:.2f}s")
+
+@bp.cli.command('build-assets')
+@click.option('--tailwind', default=lambda: current_app.config['TAILWIND_CLI'], show_default='TAILWIND_CLI or npx',
+              help='Tailwind v3 CLI command')
+def build_assets_command(tailwind):
+    """Build the Tailwind CSS bundle and vendor the fonts and icons into static/dist"""
+    started = time.perf_counter()
+    try:
+        built = assets.build(current_app.root_path, current_app.config['STATIC_ASSET_DIR'], tailwind)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    width = max(len(filename) for _, filename, _ in built)
+    print(f"{'file':{width}} {'bytes':>9} {'gzip':>9} {'brotli':>9}")
+    for name, filename, sizes in built:
+        print(f"{filename:{width}} {sizes['']:9d} {sizes.get('.gz', '-'):>9} {sizes.get('.br', '-'):>9}")
+    print(f"Built {len(built)} assets into {current_app.config['STATIC_ASSET_DIR']} in {time.perf_counter() - started:.2f}s; "
+          f"restart the server to serve them")
+
+@bp.cli.command('db-settings')
+def db_settings_command():
+    """Show the engine profile, pool and SQLite pragmas in effect"""
+    print(f"Profile: {current_app.config['DB_PROFILE']}")
+    print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+    print(f"Pool: {db.engine.pool.status()}")
+    if db_config.REPLICA_BIND in db.engines:
+        replica = db.engines[db_config.REPLICA_BIND]
+        print(f"Replica: {replica.url.render_as_string(hide_password=True)}")
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            for name, value in db_config.sqlite_settings(conn).items():
+                print(f"PRAGMA {name} = {value}")
+
+@bp.cli.command('copy-data')
+@click.argument('target_url')
+@click.option('--chunk-rows', default=5000, show_default=True, help='Rows read and inserted per batch')
+def copy_data_command(target_url, chunk_rows):
+    """Copy every table into another database, e.g. from SQLite to PostgreSQL"""
+    if migrations.current_version(db.engine) != migrations.HEAD_VERSION:
+        raise click.ClickException('Source database is not up to date; run flask migrate-db first')
+    target_url = db_config.database_url(target_url)
+    target = create_engine(target_url, **db_config.engine_options(target_url, current_app.config['DB_PROFILE']))
+    try:
+        copied = migrations.copy_data(db.engine, target, db.metadata, chunk_rows)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    finally:
+        target.dispose()
+    for table, rows in copied:
+        print(f"{table}: {rows} rows")
+    print(f"Copied {sum(rows for _, rows in copied)} rows to {target.url.render_as_string(hide_password=True)}")
+
+@bp.cli.command('generate-data')
+@click.option('--users', default=1000, show_default=True, help='Synthetic users to add')
+@click.option('--years', default=3.0, show_default=True, help='Years of history per user')
+@click.option('--seed', default=1, show_default=True, help='Same seed and end date give the same data')
+@click.option('--end-date', default=None, help='Last day of history (YYYY-MM-DD, default today)')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Generator processes')
+@click.option('--password', default='synthetic', show_default=True, help='Password of every generated user')
+@click.option('--skip-derived', is_flag=True, help='Do not rebuild cycle statistics and states afterwards')
+@click.pass_context
+def generate_data_command(ctx, users, years, seed, end_date, workers, password, skip_derived):
+    """Add synthetic users with multi-year cycle and tracker histories (for benchmarks)"""
+    import synthetic_data
+    migrations.upgrade(db.engine, db.metadata)
+    end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+    first_user_id = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    url = db.engine.url.render_as_string(hide_password=False)
+    started = time.time()
+    
+    def progress(done, counts):
+        elapsed = time.time() - started
+        print(f"{done}/{users} users, {sum(counts.values())} rows, {sum(counts.values()) / elapsed:.0f} rows/s")
+    
+    counts = synthetic_data.generate(
+        url, users, first_user_id, seed, years, end, generate_password_hash(password),
+        workers=workers, profile=current_app.config['DB_PROFILE'], progress=progress
+    )
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows")
+    print(f"Added users {first_user_id}-{first_user_id + users - 1} in {time.time() - started:.1f}s")
+    
+    if not skip_derived:
+        ctx.invoke(rebuild_cycle_stats_command)
+        ctx.invoke(refresh_cycle_states_command)
+
+@bp.cli.command('rebuild-cycle-stats')
+def rebuild_cycle_stats_command():
+    """Recompute every user's cycle aggregates from their period history"""
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+    for index, user_id in enumerate(user_ids, 1):
+        rebuild_cycle_statistics(user_id)
+        if index % 500 == 0:
+            db.session.commit()
+    db.session.commit()
+    print(f"Rebuilt cycle statistics for {len(user_ids)} users")
+
+@bp.cli.command('explain-queries')
+@click.option('--user-id', default=1, help='User whose dashboard and history queries are explained')
+def explain_queries_command(user_id):
+    """Check that dashboard and history queries use indexes"""
+    statements = []
     
-    story.append(Spacer(1, 20))
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
     
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        state = load_cycle_state(user_id)
+        if state:
+            get_cycle_prediction(state['settings'])
+        load_tracker_summary(user_id)
+        get_self_care_activities(user_id)
+        get_period_log_page(user_id)
+        get_mood_page(user_id)
+        # Later pages seek from a cursor; explain those too
+        get_period_log_page(user_id, (datetime.now().date(), 0))
+        get_mood_page(user_id, (datetime.now().date(), 0))
+        get_history_counts(user_id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    
+    plans, scans = migrations.explain_query_plans(db.engine, statements, set(db.metadata.tables))
+    for sql, detail in plans:
+        print(' '.join(sql.split()))
+        for line in detail:
+            print(f"    {line}")
+        print()
+    
+    if scans:
+        for sql, line in scans:
+            print(f"Full table scan: {line}")
+        raise SystemExit(1)
+    print("All dashboard and history queries use indexes")
+
+# Most SQL statements each page may run for one user; more usually means an N+1 query.
+# These are the counts the pages run today, so any extra query fails the check.
+QUERY_BUDGETS = {
+    '/dashboard': 3,
+    '/history': 5,
+    '/history/periods': 2,
+    '/history/moods': 2,
+    '/health-tips': 3,
+    '/get_cycle_progress': 2,
+}
+
+def query_counts(app, user_id):
+    """{path: (SQL statements run, HTTP status)} of each QUERY_BUDGETS page, requested as a user"""
+    client = app.test_client()
+    with client.session_transaction() as browser_session:
+        browser_session['_user_id'] = str(user_id)
+        browser_session['_fresh'] = True
     
-    from flask import send_file
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f'period_tracker_report_{current_user.name}_{datetime.now().strftime("%Y%m%d")}.pdf',
-        mimetype='application/pdf'
+    with app.app_context():
+        engines = list(db.engines.values())
+    results = {}
+    counts = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counts[-1] += 1
+    
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for path in QUERY_BUDGETS:
+            counts.append(0)
+            # A fresh app context gives the request its own g and session, as in production
+            with app.app_context():
+                response = client.get(path)
+            results[path] = (counts[-1], response.status_code)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+@bp.cli.command('check-query-budget')
+@click.option('--years', default=3.0, show_default=True, help='Years of history of the synthetic user')
+@click.option('--seed', default=1, show_default=True, help='Seed of the synthetic user')
+def check_query_budget_command(years, seed):
+    """Request the main pages as a synthetic user and fail if any runs more SQL than its budget
+
+    The user is generated into a scratch SQLite database, so the result does
+    not depend on the configured database or what is in it.
+    """
+    import synthetic_data
+    workdir = tempfile.mkdtemp(prefix='tracker-query-budget-')
+    url = 'sqlite:///' + os.path.join(workdir, 'budget.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'SQLALCHEMY_BINDS': {}, 'CYCLE_CACHE_FILE': None})
+    try:
+        with app.app_context():
+            migrations.upgrade(db.engine, db.metadata)
+            synthetic_data.write_users(
+                url, app.config['DB_PROFILE'], [1], seed, years, datetime.now().date(), generate_password_hash('-')
+            )
+            rebuild_cycle_statistics(1)
+            refresh_cycle_state(1)
+        results = query_counts(app, 1)
+    finally:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    failed = []
+    for path, (queries, status_code) in results.items():
+        budget = QUERY_BUDGETS[path]
+        status = 'ok' if queries <= budget else 'OVER BUDGET'
+        if status_code != 200:
+            status = 'FAILED'
+        print(f"{path}: {queries} queries (budget {budget}, HTTP {status_code}) {status}")
+        if status != 'ok':
+            failed.append(path)
+    
+    if failed:
+        raise SystemExit(1)
+
+@bp.cli.command('predict-cycles')
+@click.option('--cycles', default=3, show_default=True, help='Cycles to forecast per user')
+@click.option('--output', type=click.Path(), help='Write one JSON prediction per user to this file')
+def predict_cycles_command(cycles, output):
+    """Score every user's cycle history in one pass (for nightly jobs)"""
+    started = datetime.now()
+    profiles = db.session.execute(
+        select(CycleSettings.user_id, CycleSettings.avg_cycle_length, CycleSettings.start_date, User.pcos)
+        .join(User, User.id == CycleSettings.user_id)
+        .order_by(CycleSettings.user_id)
+    ).all()
+    starts = db.session.execute(
+        select(PeriodLog.user_id, PeriodLog.actual_start_date)
+        .where(PeriodLog.actual_start_date.isnot(None))
+    ).all()
+    scores = cycle_prediction.score_users(
+        [tuple(row) for row in profiles], [row[0] for row in starts], [row[1] for row in starts]
     )
+    forecasts = cycle_prediction.forecast(scores, cycles)
+    
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            for i, row in enumerate(profiles):
+                prediction = cycle_prediction.prediction_for(scores, forecasts, i)
+                prediction['user_id'] = row[0]
+                f.write(json.dumps(prediction, default=str) + '\n')
+    
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"Scored {len(profiles)} users from {len(starts)} period starts in {elapsed:.2f}s")
+    print(f"Irregular cycles: {int(scores['irregular'].sum())}")
+
+@bp.cli.command('refresh-cycle-states')
+@click.option('--chunk-size', default=500, show_default=True, help='Users per chunk (one transaction each)')
+def refresh_cycle_states_command(chunk_size):
+    """Expire finished periods and rewrite every user's materialized cycle state (run nightly)"""
+    today = datetime.now().date()
+    last_user_id = 0
+    chunk = 0
+    total_users = 0
+    total_expired = 0
+    started = time.perf_counter()
+    
+    while True:
+        chunk_started = time.perf_counter()
+        profiles = db.session.execute(
+            select(
+                CycleSettings.user_id, CycleSettings.avg_cycle_length, CycleSettings.avg_period_length,
+                CycleSettings.start_date, User.pcos
+            ).join(User, User.id == CycleSettings.user_id)
+            .where(CycleSettings.user_id > last_user_id)
+            .order_by(CycleSettings.user_id)
+            .limit(chunk_size)
+        ).all()
+        if not profiles:
+            break
+        user_ids = [row.user_id for row in profiles]
+        last_user_id = user_ids[-1]
+        
+        expired = expire_current_periods(today, user_ids)
+        starts = db.session.execute(
+            select(PeriodLog.user_id, PeriodLog.actual_start_date).where(
+                PeriodLog.user_id.in_(user_ids),
+                PeriodLog.actual_start_date.isnot(None)
+            )
+        ).all()
+        active_periods = {row.user_id: row for row in db.session.execute(
+            select(CurrentPeriod.user_id, CurrentPeriod.start_date, CurrentPeriod.expected_end_date).where(
+                CurrentPeriod.user_id.in_(user_ids),
+                CurrentPeriod.is_active == True
+            )
+        )}
+        last_starts = {}
+        for user_id, start in starts:
+            if user_id not in last_starts or start > last_starts[user_id]:
+                last_starts[user_id] = start
+        
+        scores = cycle_prediction.score_users(
+            [(row.user_id, row.avg_cycle_length, row.start_date, row.pcos) for row in profiles],
+            [row[0] for row in starts], [row[1] for row in starts]
+        )
+        forecasts = cycle_prediction.forecast(scores, 1)
+        states = {}
+        for i, row in enumerate(profiles):
+            prediction = cycle_prediction.prediction_for(scores, forecasts, i)
+            states[row.user_id] = compute_cycle_state(
+                row, prediction, last_starts.get(row.user_id), active_periods.get(row.user_id), today
+            )
+        save_cycle_states(states)
+        db.session.commit()
+        
+        chunk += 1
+        total_users += len(profiles)
+        total_expired += expired
+        elapsed = time.perf_counter() - chunk_started
+        print(f"Chunk {chunk}: {len(profiles)} users, {expired} periods expired in {elapsed:.2f}s "
+              f"({len(profiles) / elapsed:.0f} users/s)")
+    
+    # Only reaches a shared cache file; per-process caches roll over with the date key
+    current_app.extensions['cycle_cache'].clear()
+    elapsed = time.perf_counter() - started
+    print(f"Refreshed {total_users} users ({total_expired} periods expired) in {elapsed:.2f}s")
+
+@bp.cli.command('export-all')
+@click.argument('out_dir')
+@click.option('--format', 'fmt', type=click.Choice(['auto', 'parquet', 'jsonl']), default='auto',
+              help='parquet needs pyarrow; auto falls back to JSON column chunks without it')
+@click.option('--chunk-rows', default=50000, show_default=True, help='Rows per chunk (Parquet row group)')
+def export_all_command(out_dir, fmt, chunk_rows):
+    """Export every user's history to one columnar file per table"""
+    # Password hashes never leave the database
+    tables = [('user', User.__table__, ('password_hash',))]
+    tables += [(name, model.__table__, exclude) for name, model, exclude in BULK_EXPORT_TABLES]
+    try:
+        written = data_export.write_columnar(db.session, tables, out_dir, fmt, chunk_rows)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for name, path, rows in written:
+        print(f"{name}: {rows} rows -> {path}")
+
+app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        migrations.upgrade(db.engine, db.metadata)
     app.run(debug=True) 
\ No newline at end of file
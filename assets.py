@@ -0,0 +1,281 @@
+"""Self-hosted, fingerprinted static assets.
+
+`flask --app app build-assets` builds everything base.html loads into
+static/dist, so pages fetch nothing from a CDN:
+  * a Tailwind CSS bundle, generated ahead of time by the Tailwind CLI from
+    the classes used in the templates, instead of compiled in the browser
+    on every page load
+  * the Google Fonts the theme uses (Quicksand and Dancing Script), latin
+    subsets only
+  * the Font Awesome rules for the icons the templates use, plus the
+    webfonts those need. With fontTools installed, the webfonts are cut down
+    to those glyphs too
+
+All of it goes into one stylesheet, app.<hash>.css. Every file name carries
+a hash of its content, and manifest.json maps logical names to those names,
+so browsers can cache a file for good. Text files get precompressed .gz
+siblings, plus .br siblings when the brotli package is installed. Files from
+the previous build are kept, so pages rendered before a deploy can still
+load theirs.
+
+The build downloads the fonts and icons, so run it in CI or on a deploy
+host. The production network does not need to reach any CDN.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shlex
+import subprocess
+import tarfile
+import tempfile
+from urllib.request import Request, urlopen
+
+SOURCE_DIR = 'assets'  # Tailwind config and input, relative to the app root
+MANIFEST = 'manifest.json'
+TAILWIND_COMMAND = 'npx --yes tailwindcss@3.4.1'  # or the standalone CLI binary
+GOOGLE_FONTS_URL = (
+    'https://fonts.googleapis.com/css2?family=Quicksand:wght@300..700'
+    '&family=Dancing+Script:wght@400..700&display=swap'
+)
+FONT_SUBSETS = ('latin', 'latin-ext')
+FONT_AWESOME_URL = 'https://registry.npmjs.org/@fortawesome/fontawesome-free/-/fontawesome-free-6.4.0.tgz'
+# Google Fonts only serves woff2 to browsers it recognises
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+DOWNLOAD_TIMEOUT = 60  # seconds
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preferred first
+
+# Font Awesome style -> the classes that select it and its webfont
+FA_STYLES = {
+    'solid': ({'fas', 'fa-solid'}, 'fa-solid-900.woff2'),
+    'regular': ({'far', 'fa-regular'}, 'fa-regular-400.woff2'),
+    'brands': ({'fab', 'fa-brands'}, 'fa-brands-400.woff2'),
+}
+FA_ICON_SELECTOR = re.compile(r'^\.fa-([a-z0-9-]+)::?(?:before|after)$')
+FA_CLASS = re.compile(r'\bfa-[a-z0-9-]+|\bfa[srb]?\b(?!-)')
+
+# Names written by fingerprint(); anything else in the dist directory is not served
+FINGERPRINTED_NAME = re.compile(r'^[\w-]+\.[0-9a-f]{12}\.[a-z0-9]+$')
+
+mimetypes.add_type('font/woff2', '.woff2')
+
+
+def load_manifest(dist_dir):
+    """{logical name: fingerprinted file name} of the last build, or {} if there is none"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_fingerprinted(filename):
+    """True for a file name made by fingerprint(), with no directory part"""
+    return FINGERPRINTED_NAME.match(filename) is not None
+
+
+def encoded_variant(path, accept_encodings):
+    """(path, content encoding) of the best precompressed copy of a file the client accepts"""
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def download(url):
+    try:
+        with urlopen(Request(url, headers={'User-Agent': USER_AGENT}), timeout=DOWNLOAD_TIMEOUT) as response:
+            return response.read()
+    except OSError as e:
+        raise RuntimeError(f"Could not download {url}: {e}")
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _css_blocks(css):
+    """Top-level (prelude, body) pairs of a stylesheet, without comments"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks = []
+    depth = start = prelude_end = 0
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                # Drops statements such as @charset in front of the rule
+                blocks.append((css[start:prelude_end].split(';')[-1].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+    return blocks
+
+
+def _woff2_src(body, name):
+    body = re.sub(r'\s*([:;])\s*', r'\1', body.strip()).rstrip(';')
+    return re.sub(r'src:[^;}]+', f'src:url({name}) format("woff2")', body)
+
+
+def subset_font(data, codepoints):
+    """Keep only the glyphs for `codepoints` in a woff2 font (needs fontTools and brotli)"""
+    try:
+        import brotli  # noqa: F401  (fontTools needs it for woff2)
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        return data
+    font = TTFont(io.BytesIO(data))
+    options = subset.Options()
+    options.flavor = 'woff2'
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.flavor = 'woff2'
+    font.save(output)
+    return output.getvalue()
+
+
+def google_fonts():
+    """(@font-face CSS, {file name: woff2 bytes}) of the theme's fonts"""
+    css = download(GOOGLE_FONTS_URL).decode('utf-8')
+    rules, files = [], {}
+    # Google labels every @font-face with its subset: /* latin */ @font-face {...}
+    for subset, body in re.findall(r'/\*\s*([\w-]+)\s*\*/\s*@font-face\s*\{([^}]*)\}', css):
+        if subset not in FONT_SUBSETS:
+            continue
+        family = re.search(r"font-family:\s*'([^']+)'", body).group(1)
+        style = re.search(r'font-style:\s*(\w+)', body).group(1)
+        weight = re.search(r'font-weight:\s*([\d ]+)', body).group(1).strip().replace(' ', '-')
+        name = f"{family.lower().replace(' ', '-')}-{style}-{weight}-{subset}.woff2"
+        files[name] = download(re.search(r'url\(([^)]+)\)', body).group(1))
+        rules.append('@font-face{' + _woff2_src(body, name) + '}')
+    if not rules:
+        raise RuntimeError(f"No {'/'.join(FONT_SUBSETS)} fonts found at {GOOGLE_FONTS_URL}")
+    return '\n'.join(rules), files
+
+
+def font_awesome(used_classes):
+    """(CSS, {file name: woff2 bytes}) of Font Awesome, cut down to the classes in use"""
+    archive = tarfile.open(fileobj=io.BytesIO(download(FONT_AWESOME_URL)), mode='r:gz')
+    css = archive.extractfile('package/css/all.min.css').read().decode('utf-8')
+    license_comment = re.match(r'\s*(/\*!.*?\*/)', css, re.S)
+
+    icons = {name[len('fa-'):] for name in used_classes if name.startswith('fa-')}
+    webfonts = {font for classes, font in FA_STYLES.values() if classes & used_classes}
+    rules, codepoints = [license_comment.group(1)] if license_comment else [], set()
+    for prelude, body in _css_blocks(css):
+        if prelude == '@font-face':
+            font = re.search(r'webfonts/([\w-]+\.woff2)', body)
+            if font is None or font.group(1) not in webfonts:
+                continue
+            body = _woff2_src(body, font.group(1))
+        elif not prelude.startswith('@'):
+            selectors = [selector.strip() for selector in prelude.split(',')]
+            matches = [FA_ICON_SELECTOR.match(selector) for selector in selectors]
+            if all(matches):
+                # An icon rule: keep it only for the icons the templates use
+                selectors = [s for s, match in zip(selectors, matches) if match.group(1) in icons]
+                if not selectors:
+                    continue
+                codepoints.update(int(value, 16) for value in re.findall(r'content:\s*"\\([0-9a-fA-F]+)"', body))
+                prelude = ','.join(selectors)
+        rules.append(prelude + '{' + body + '}')
+
+    files = {
+        font: subset_font(archive.extractfile(f'package/webfonts/{font}').read(), codepoints)
+        for font in sorted(webfonts)
+    }
+    return '\n'.join(rules), files
+
+
+def tailwind_css(root, command):
+    """Run the Tailwind CLI over the templates; returns the minified CSS"""
+    sources = os.path.join(root, SOURCE_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'tailwind.css')
+        args = shlex.split(command) + [
+            '-c', os.path.join(sources, 'tailwind.config.js'),
+            '-i', os.path.join(sources, 'app.css'),
+            '-o', output, '--minify'
+        ]
+        try:
+            subprocess.run(args, cwd=root, check=True)
+            with open(output, encoding='utf-8') as f:
+                return f.read()
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise RuntimeError(f"Tailwind build failed ({e}). Point --tailwind or TAILWIND_CLI at a Tailwind v3 CLI")
+
+
+def _compressed(data):
+    """{suffix: bytes} of the precompressed copies worth keeping"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: value for suffix, value in variants.items() if len(value) < len(data)}
+
+
+def _write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build(root, dist_dir, tailwind_command=TAILWIND_COMMAND, log=print):
+    """Build the bundle into dist_dir
+
+    Returns (logical name, file name, {suffix: size in bytes}) for every file
+    written, where the suffix is '' for the file itself, '.gz' or '.br'.
+    """
+    template_dir = os.path.join(root, 'templates')
+    used_classes = set()
+    for name in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, name), encoding='utf-8') as f:
+            used_classes.update(FA_CLASS.findall(f.read()))
+
+    log("Downloading fonts and icons...")
+    font_css, files = google_fonts()
+    icon_css, icon_files = font_awesome(used_classes)
+    files.update(icon_files)
+    log("Building Tailwind CSS...")
+    css = '\n'.join([font_css, icon_css, tailwind_css(root, tailwind_command)])
+
+    manifest = {name: fingerprint(name, data) for name, data in files.items()}
+    for name, file_name in manifest.items():
+        css = css.replace(f'url({name})', f'url({file_name})')
+    files['app.css'] = css.encode('utf-8')
+    manifest['app.css'] = fingerprint('app.css', files['app.css'])
+
+    os.makedirs(dist_dir, exist_ok=True)
+    previous = load_manifest(dist_dir)
+    built = []
+    for name, data in sorted(files.items()):
+        path = os.path.join(dist_dir, manifest[name])
+        _write(path, data)
+        sizes = {'': len(data)}
+        if name.endswith(COMPRESSIBLE):
+            for suffix, variant in _compressed(data).items():
+                _write(path + suffix, variant)
+                sizes[suffix] = len(variant)
+        built.append((name, manifest[name], sizes))
+    _write(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    keep = set(manifest.values()) | set(previous.values())
+    for entry in os.listdir(dist_dir):
+        original = re.sub(r'\.(gz|br)$', '', entry)
+        if entry != MANIFEST and original not in keep:
+            os.remove(os.path.join(dist_dir, entry))
+    return built
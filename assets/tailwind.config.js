@@ -0,0 +1,11 @@
+// Tailwind build for `flask --app app build-assets` (see assets.py).
+// The theme is shared with the CDN fallback in templates/base.html.
+module.exports = {
+  content: {
+    relative: true,
+    files: ['../templates/**/*.html']
+  },
+  theme: {
+    extend: require('./tailwind.theme.json')
+  }
+};
@@ -0,0 +1,122 @@
+"""Bytes on the wire and CPU cost of response compression, per route.
+
+    python benchmarks/compression.py --iterations 50
+
+A synthetic database is seeded in a temporary directory and one user's pages
+are rendered once through the app without the middleware. Each response is
+then replayed through CompressionMiddleware with every combination of
+encoding (none, gzip, brotli when installed) and HTML minification. For each
+combination the table shows the body size and the CPU time the middleware
+adds per request (time.process_time, median of --iterations runs).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'benchmark'
+ROUTES = ['/dashboard', '/history', '/health-tips', '/self_care', '/period-kit', '/educational_blog',
+          '/history/moods?format=json', '/get_cycle_progress']
+
+
+def seed(workdir, users):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'compression.db')
+    env['SLOW_REQUEST_LOG'] = os.path.join(workdir, 'slow_requests.jsonl')
+    env.pop('DATABASE_REPLICA_URL', None)
+    env.pop('CYCLE_CACHE_FILE', None)
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'generate-data', '--users', str(users),
+         '--years', '1', '--workers', '1', '--password', PASSWORD],
+        cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    os.environ.update(env)
+
+
+def capture(client, route):
+    """(status, headers, body) of a route, rendered by the app without the middleware"""
+    response = client.get(route)
+    return response.status, response.headers.to_wsgi_list(), response.data
+
+
+def replay(status, headers, body):
+    def wsgi_app(environ, start_response):
+        start_response(status, list(headers))
+        return [body]
+    return wsgi_app
+
+
+def measure(middleware, environ, iterations):
+    """(body bytes, median CPU microseconds) of one response through the middleware"""
+    size = 0
+    timings = []
+    for _ in range(iterations):
+        started = time.process_time()
+        size = len(b''.join(middleware(dict(environ), lambda status, headers, exc_info=None: None)))
+        timings.append(time.process_time() - started)
+    return size, statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50, help='replays per route and variant')
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tracker-compression-')
+    seed(workdir, args.users)
+    import synthetic_data
+    from app import app
+    from compression import CompressionMiddleware
+
+    # Render the pages once without the middleware; each one is replayed below
+    inner = app.wsgi_app.app
+    app.wsgi_app = inner
+    client = app.test_client()
+    client.post('/login', data={'email': synthetic_data.email_for(1, 1), 'password': PASSWORD})
+
+    variants = [('identity', 'identity', False), ('minified', 'identity', True),
+                ('gzip', 'gzip', False), ('gzip+min', 'gzip', True)]
+    if CompressionMiddleware(inner).brotli is not None:
+        variants += [('br', 'br', False), ('br+min', 'br', True)]
+    else:
+        print("brotli is not installed; only gzip is measured\n")
+
+    header = f"{'route':28}" + ''.join(f"{label:>18}" for label, _, _ in variants[1:])
+    print(f"{header}\n{'':28}" + ''.join(f"{'bytes / cpu us':>18}" for _ in variants[1:]))
+    results = {}
+    totals = {label: 0 for label, _, _ in variants}
+    for route in ROUTES:
+        status, headers, body = capture(client, route)
+        row = {}
+        for label, encoding, minify in variants:
+            middleware = CompressionMiddleware(replay(status, headers, body), minify_html=minify)
+            environ = {'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': encoding}
+            size, cpu_us = measure(middleware, environ, args.iterations)
+            row[label] = {'bytes': size, 'cpu_us': cpu_us}
+            totals[label] += size
+        results[route] = dict(row, status=status)
+        print(f"{route:28}" + ''.join(
+            f"{row[label]['bytes']:>9} / {row[label]['cpu_us']:5.0f}" for label, _, _ in variants[1:]
+        ) + f"   (uncompressed {row['identity']['bytes']}, {status})")
+
+    print(f"\n{'total':28}" + ''.join(f"{totals[label]:>18}" for label, _, _ in variants[1:])
+          + f"   (uncompressed {totals['identity']})")
+    best = min(totals, key=totals.get)
+    print(f"{best} sends {100 * (1 - totals[best] / totals['identity']):.0f}% fewer bytes than no compression")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'routes': results, 'totals': totals}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
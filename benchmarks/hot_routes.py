@@ -0,0 +1,255 @@
+"""Latency, throughput and queries per request of the hot routes.
+
+    python benchmarks/hot_routes.py --users 50 --years 2 --requests 200 --concurrency 4
+    python benchmarks/hot_routes.py --target server --output after.json --compare before.json
+
+First, `flask generate-data` seeds a synthetic database (see synthetic_data.py)
+in a temporary directory, with --years years of history per user. Every route
+is then requested --requests times, split across --concurrency threads. Each
+thread logs in as its own user. With --target client, requests go through the
+Flask test client. With --target server, they go over HTTP to a local
+threaded WSGI server. The activity log writes to an
+in-memory stub instead of Google Sheets, and the application database and
+export cache are never touched.
+
+Results are written as JSON. With --compare, each route's p50/p95 is printed
+next to an earlier run's.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'benchmark'
+MOODS = ['happy', 'calm', 'tired', 'irritable', 'sad', 'anxious']
+SYMPTOMS = ['', 'cramps', 'headache', 'bloating', 'cramps, fatigue']
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class ClientSession:
+    """One logged-in user on the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        response.close()
+        return response.status_code
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class ServerSession:
+    """One logged-in user talking HTTP to the local server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        # Do not follow the login redirect, so /login is timed on its own
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), _NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None):
+        data, headers = None, {}
+        if form is not None:
+            data = urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            with self.opener.open(Request(self.base_url + path, data=data, headers=headers, method=method)) as response:
+                response.read()
+                return response.status
+        except HTTPError as e:
+            e.read()
+            return e.code
+
+
+def routes(email, rng):
+    """(name, method, path, form, json) for one request to each benchmarked route"""
+    day = (date.today() - timedelta(days=rng.randint(0, 30))).isoformat()
+    return [
+        ('login', 'POST', '/login', {'email': email, 'password': PASSWORD}, None),
+        ('dashboard', 'GET', '/dashboard', None, None),
+        ('get_cycle_progress', 'GET', '/get_cycle_progress', None, None),
+        ('history', 'GET', '/history', None, None),
+        ('track_mood', 'POST', '/track_mood', None,
+         {'date': day, 'mood': rng.choice(MOODS), 'symptoms': rng.choice(SYMPTOMS)}),
+        ('track_water', 'POST', '/track_water', None,
+         {'date': day, 'drank_water': True, 'water_amount': round(rng.uniform(1, 3), 1)}),
+        ('track_nutrition', 'POST', '/track_nutrition', None,
+         {'date': day, 'ate_iron_rich': True, 'ate_healthy': rng.random() < 0.5, 'notes': ''}),
+        ('export_data', 'GET', '/export_data', None, None),
+    ]
+
+
+def run(tracker, make_session, emails, requests_per_route, concurrency, seed_value):
+    """Request every route in turn from concurrent logged-in users; returns per-route results"""
+    route_names = [name for name, *_ in routes(emails[0], random.Random(0))]
+    per_thread = max(1, requests_per_route // concurrency)
+    sessions = []
+    for i in range(concurrency):
+        session = make_session()
+        status = session.request('POST', '/login', form={'email': emails[i % len(emails)], 'password': PASSWORD})
+        if status not in (200, 302):
+            raise SystemExit(f'Login failed with HTTP {status}')
+        sessions.append(session)
+
+    results = {}
+    for index, name in enumerate(route_names):
+        latencies = [[] for _ in range(concurrency)]
+        statuses = [{} for _ in range(concurrency)]
+        before = tracker.request_metrics.snapshot()
+
+        def worker(n):
+            rng = random.Random(seed_value * 1000 + n)
+            for _ in range(per_thread):
+                _, method, path, form, json_body = routes(emails[n % len(emails)], rng)[index]
+                started = time.perf_counter()
+                status = sessions[n].request(method, path, form=form, json_body=json_body)
+                latencies[n].append(time.perf_counter() - started)
+                statuses[n][status] = statuses[n].get(status, 0) + 1
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        after = tracker.request_metrics.snapshot()
+        requests, queries = 0, 0
+        for key, totals in after.items():
+            if key[0] == f'{tracker.bp.name}.{name}':
+                requests += totals['requests'] - before.get(key, {}).get('requests', 0)
+                queries += totals['sql_queries'] - before.get(key, {}).get('sql_queries', 0)
+
+        merged = sorted(value for values in latencies for value in values)
+        status_counts = {}
+        for counts in statuses:
+            for status, count in counts.items():
+                status_counts[str(status)] = status_counts.get(str(status), 0) + count
+        results[name] = {
+            'requests': len(merged),
+            'p50_ms': round(percentile(merged, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(merged, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(merged, 0.99) * 1000, 2),
+            'mean_ms': round(sum(merged) / len(merged) * 1000, 2),
+            'throughput_rps': round(len(merged) / elapsed, 1),
+            'queries_per_request': round(queries / requests, 2) if requests else None,
+            'statuses': status_counts
+        }
+        print(f"{name:20} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+              f"p99 {results[name]['p99_ms']:8.2f} ms  {results[name]['throughput_rps']:8.1f} req/s  "
+              f"{results[name]['queries_per_request']} queries/req  {status_counts}")
+    return results
+
+
+def compare(results, previous_path):
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)['routes']
+    print(f"\nCompared with {previous_path}:")
+    for name, current in results.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        change = (current['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        print(f"{name:20} p50 {old['p50_ms']:8.2f} -> {current['p50_ms']:8.2f} ms ({change:+.0f}%)  "
+              f"p95 {old['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms  "
+              f"queries {old['queries_per_request']} -> {current['queries_per_request']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--years', type=int, default=2, help='years of daily tracker rows per user')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--target', choices=['client', 'server'], default='client')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results file (default: hot_routes-<time>.json here)')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tracker-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['SLOW_REQUEST_LOG'] = os.path.join(workdir, 'slow_requests.jsonl')
+    # Read when the app is created: writing slow-request entries would skew the timings
+    os.environ['SLOW_REQUEST_MS'] = str(10 ** 9)
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.environ.pop('CYCLE_CACHE_FILE', None)
+
+    import app as tracker
+    import synthetic_data
+    from activity_log import MemorySink
+    from export_jobs import ExportJobRunner
+
+    tracker.activity_logger.sink = MemorySink()
+    tracker.export_jobs = ExportJobRunner(os.path.join(workdir, 'exports'), max_workers=tracker.app.config['EXPORT_WORKERS'])
+
+    started = time.perf_counter()
+    result = tracker.app.test_cli_runner().invoke(args=[
+        'generate-data', '--users', str(args.users), '--years', str(args.years), '--seed', str(args.seed),
+        '--workers', '1', '--password', PASSWORD
+    ])
+    if result.exit_code != 0:
+        raise SystemExit(result.output)
+    emails = [synthetic_data.email_for(args.seed, user_id) for user_id in range(1, args.users + 1)]
+    print(f"Seeded {args.users} users in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    server = None
+    if args.target == 'server':
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, tracker.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        make_session = lambda: ServerSession(base_url)  # noqa: E731
+    else:
+        make_session = lambda: ClientSession(tracker.app)  # noqa: E731
+
+    try:
+        results = run(tracker, make_session, emails, args.requests, args.concurrency, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+        tracker.export_jobs.shutdown()
+
+    output = args.output or f"hot_routes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'db_profile': tracker.app.config['DB_PROFILE'],
+            'routes': results
+        }, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Memory per worker of serve.py with and without preloading the app.
+
+    python benchmarks/prefork_memory.py --workers 4 --requests 200
+
+A synthetic database is seeded in a temporary directory. serve.py is then
+started twice, with --no-preload and with preloading, and the same logged-in
+pages are requested from both. Afterwards the memory of every process is
+read from /proc/<pid>/smaps_rollup. A worker's private memory is what it
+holds alone. The rest of its RSS is pages it shares with the parent and the
+other workers. The drop in private memory per worker is the RSS that
+preloading saves per worker. Linux only.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, build_opener
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serve import process_memory  # noqa: E402
+
+PASSWORD = 'benchmark'
+PAGES = ['/dashboard', '/history', '/health-tips', '/get_cycle_progress', '/self_care', '/blog']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(parent_pid):
+    with open(f'/proc/{parent_pid}/task/{parent_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_until_up(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'serve.py exited with status {process.returncode}')
+        try:
+            with build_opener().open(base_url + '/login', timeout=2) as response:
+                response.read()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('serve.py did not start in time')
+
+
+def measure(env, args, emails, preload):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    command = [sys.executable, os.path.join(ROOT, 'serve.py'), '--port', str(port),
+               '--workers', str(args.workers), '--threads', str(args.threads)]
+    if not preload:
+        command.append('--no-preload')
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_up(base_url, process)
+        # Connections land on whichever worker accepts first, so with enough
+        # requests every worker has rendered every page
+        for i in range(args.requests):
+            opener = build_opener(HTTPCookieProcessor(CookieJar()))
+            login = urlencode({'email': emails[i % len(emails)], 'password': PASSWORD}).encode('utf-8')
+            opener.open(base_url + '/login', data=login).read()
+            for page in PAGES:
+                opener.open(base_url + page).read()
+        workers = [process_memory(pid) for pid in worker_pids(process.pid)]
+        return {'parent': process_memory(process.pid), 'workers': [w for w in workers if w is not None]}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def summarize(label, result):
+    workers = result['workers']
+    count = len(workers)
+    average = {key: sum(w[key] for w in workers) / count for key in ('rss', 'pss', 'private', 'shared')}
+    total_pss = result['parent']['pss'] + sum(w['pss'] for w in workers)
+    print(f"{label:12} {count} workers: rss {average['rss']:6.1f} MB, private {average['private']:6.1f} MB, "
+          f"shared {average['shared']:6.1f} MB per worker; all processes (pss) {total_pss:6.1f} MB")
+    return dict(average, workers=count, total_pss=total_pss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=100, help='logged-in page rounds per run')
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        raise SystemExit('This benchmark reads /proc/<pid>/smaps_rollup (Linux only)')
+
+    workdir = tempfile.mkdtemp(prefix='tracker-prefork-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'prefork.db')
+    env['SLOW_REQUEST_LOG'] = os.path.join(workdir, 'slow_requests.jsonl')
+    env['ACTIVITY_LOG_FILE'] = os.path.join(workdir, 'activity.csv')
+    env.pop('DATABASE_REPLICA_URL', None)
+    env.pop('CYCLE_CACHE_FILE', None)
+
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'generate-data', '--users', str(args.users),
+         '--years', '1', '--workers', '1', '--password', PASSWORD],
+        cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    import synthetic_data
+    emails = [synthetic_data.email_for(1, user_id) for user_id in range(1, args.users + 1)]
+
+    results = {
+        'no_preload': summarize('no preload', measure(env, args, emails, preload=False)),
+        'preload': summarize('preload', measure(env, args, emails, preload=True))
+    }
+    saved = results['no_preload']['private'] - results['preload']['private']
+    print(f"\nPreloading saves {saved:.1f} MB of private memory per worker "
+          f"({saved * args.workers:.1f} MB for {args.workers} workers); "
+          f"total {results['no_preload']['total_pss']:.1f} -> {results['preload']['total_pss']:.1f} MB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(results, saved_private_mb_per_worker=saved), f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
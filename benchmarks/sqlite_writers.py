@@ -0,0 +1,147 @@
+"""Write throughput of the SQLite engine profiles under concurrent writers.
+
+    python benchmarks/sqlite_writers.py --writers 8 --readers 4 --writes 200
+
+Each writer is a separate process, like a gunicorn worker. For every write
+it runs the tracker write path: one upsert into a per-day table plus a
+version bump on the user row, committed as one transaction. Readers
+repeatedly run a dashboard-style aggregate at the same time. The run is
+repeated for each profile in db_config against a fresh database file in a
+temporary directory, and the application database is never touched.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (  # noqa: E402
+    Column, Date, Float, Integer, MetaData, Table, create_engine, func, select, update
+)
+from sqlalchemy.dialects.sqlite import insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+import db_config  # noqa: E402
+
+metadata = MetaData()
+users = Table('user', metadata, Column('id', Integer, primary_key=True), Column('data_version', Integer))
+water = Table(
+    'water_tracker', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('date', Date, nullable=False),
+    Column('water_amount', Float),
+)
+USERS = 200
+
+
+def make_engine(path, profile):
+    uri = f'sqlite:///{path}'
+    engine = create_engine(uri, **db_config.engine_options(uri, profile))
+    db_config.apply_profile(engine, profile)
+    return engine
+
+
+def setup(path, profile):
+    engine = make_engine(path, profile)
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('CREATE UNIQUE INDEX uq_water_user_date ON water_tracker (user_id, date)')
+        conn.execute(users.insert(), [{'id': i, 'data_version': 0} for i in range(1, USERS + 1)])
+    engine.dispose()
+
+
+def writer(path, profile, writes, seed, results):
+    engine = make_engine(path, profile)
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    for _ in range(writes):
+        user_id = rng.randint(1, USERS)
+        day = date.today() - timedelta(days=rng.randint(0, 30))
+        stmt = insert(water).values(user_id=user_id, date=day, water_amount=rng.random() * 3)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'], set_={'water_amount': stmt.excluded.water_amount}
+        )
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt)
+                conn.execute(update(users).where(users.c.id == user_id).values(data_version=users.c.data_version + 1))
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.put(('writer', latencies, errors))
+    engine.dispose()
+
+
+def reader(path, profile, stop, results):
+    engine = make_engine(path, profile)
+    reads = 0
+    errors = 0
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    select(water.c.user_id, func.count(), func.sum(water.c.water_amount))
+                    .where(water.c.date >= date.today() - timedelta(days=7))
+                    .group_by(water.c.user_id)
+                ).all()
+            reads += 1
+        except OperationalError:
+            errors += 1
+    results.put(('reader', reads, errors))
+    engine.dispose()
+
+
+def run(profile, writers, readers, writes):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        setup(path, profile)
+        results = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        reader_procs = [multiprocessing.Process(target=reader, args=(path, profile, stop, results))
+                        for _ in range(readers)]
+        writer_procs = [multiprocessing.Process(target=writer, args=(path, profile, writes, n, results))
+                        for n in range(writers)]
+        for proc in reader_procs:
+            proc.start()
+        started = time.perf_counter()
+        for proc in writer_procs:
+            proc.start()
+        collected = [results.get() for _ in writer_procs]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        collected += [results.get() for _ in reader_procs]
+        for proc in writer_procs + reader_procs:
+            proc.join()
+
+    latencies = sorted(l for kind, values, _ in collected if kind == 'writer' for l in values)
+    write_errors = sum(errors for kind, _, errors in collected if kind == 'writer')
+    reads = sum(values for kind, values, _ in collected if kind == 'reader')
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+    print(f"{profile:>10}: {len(latencies) / elapsed:8.0f} writes/s  "
+          f"p95 {p95:7.1f} ms  locked {write_errors:4d}  reads {reads / elapsed:8.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=200, help='transactions per writer')
+    parser.add_argument('--profile', choices=db_config.PROFILES, action='append',
+                        help='profile to run (repeatable; default: all)')
+    args = parser.parse_args()
+    print(f"{args.writers} writers x {args.writes} transactions, {args.readers} readers")
+    for profile in args.profile or db_config.PROFILES:
+        run(profile, args.writers, args.readers, args.writes)
+
+
+if __name__ == '__main__':
+    main()
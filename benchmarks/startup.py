@@ -0,0 +1,147 @@
+"""Cold-start time and memory of a worker, checked against a budget.
+
+    python benchmarks/startup.py --runs 5 --max-import-ms 800 --max-rss-mb 150
+
+Each run starts a fresh interpreter, the way a new worker process starts. It
+imports app, records the import time and resident memory, then serves one
+request (GET /login) and records memory again. One more run with
+`python -X importtime` lists the slowest imports. It also fails if a module
+that should load lazily (the Google Sheets stack, reportlab, pyarrow) was
+imported at startup. The exit status is 1 when any budget is exceeded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported only when a request or command needs them
+LAZY_MODULES = ['gspread', 'google.oauth2', 'google.auth.transport.requests', 'reportlab', 'pyarrow', 'synthetic_data']
+
+PROBE = r'''
+import json, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+base = rss_mb()
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+after_import = rss_mb()
+status = app.app.test_client().get('/login').status_code
+print(json.dumps({
+    'import_ms': imported * 1000,
+    'interpreter_rss_mb': base,
+    'rss_after_import_mb': after_import,
+    'rss_after_request_mb': rss_mb(),
+    'first_request_status': status,
+    'modules': sorted(sys.modules)
+}))
+'''
+
+
+def probe(env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, limit):
+    """(cumulative ms, module) of the slowest direct and indirect imports of app"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative) / 1000, name.strip(), (len(name) - len(name.lstrip())) // 2))
+
+    # Children are listed before their parent, so app's imports are the
+    # nested entries just above its own line (interpreter startup comes first)
+    end = max(i for i, entry in enumerate(entries) if entry[1] == 'app' and entry[2] == 0)
+    start = end
+    while start > 0 and entries[start - 1][2] > 0:
+        start -= 1
+    # Depth 1 is what app imports directly; show the big second-level ones too
+    rows = [entry for entry in entries[start:end + 1] if entry[2] <= 2]
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=800, help='budget for the median import time')
+    parser.add_argument('--max-rss-mb', type=float, default=150, help='budget for memory after the first request')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tracker-startup-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'startup.db')
+    env['SLOW_REQUEST_LOG'] = os.path.join(workdir, 'slow_requests.jsonl')
+    env.pop('DATABASE_REPLICA_URL', None)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    runs = [probe(env) for _ in range(args.runs)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    rss = max(run['rss_after_request_mb'] for run in runs)
+    eager = sorted({
+        module for run in runs for module in run['modules']
+        for lazy in LAZY_MODULES if module == lazy or module.startswith(lazy + '.')
+    })
+
+    print(f"import app: median {import_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(run['import_ms'] for run in runs):.0f}, max {max(run['import_ms'] for run in runs):.0f})")
+    print(f"memory: interpreter {runs[0]['interpreter_rss_mb']:.1f} MB, after import "
+          f"{runs[0]['rss_after_import_mb']:.1f} MB, after first request {rss:.1f} MB")
+    print("\nSlowest imports (cumulative):")
+    for ms, name, depth in slowest_imports(env, args.top):
+        print(f"{ms:9.1f} ms  {'  ' * depth}{name}")
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.0f} ms is over the {args.max_import_ms:.0f} ms budget")
+    if rss > args.max_rss_mb:
+        failures.append(f"memory {rss:.1f} MB is over the {args.max_rss_mb:.0f} MB budget")
+    if eager:
+        failures.append(f"modules meant to load lazily were imported at startup: {', '.join(eager[:10])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'import_ms': import_ms,
+                'runs': [{key: value for key, value in run.items() if key != 'modules'} for run in runs],
+                'eager_lazy_modules': eager,
+                'failures': failures
+            }, f, indent=2)
+
+    print()
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if not failures:
+        print(f"OK: within budget ({args.max_import_ms:.0f} ms, {args.max_rss_mb:.0f} MB)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Fire parallel writes at one user's tracker row for the same day.
+
+    python benchmarks/stress_daily_upsert.py --threads 16 --writes 50
+
+The run is repeated for each DB profile (see db_config.py) against a fresh
+SQLite file in a temporary directory, so the application database is never
+touched. With --mode legacy, it uses the old query-then-insert pattern for
+comparison. That pattern races: concurrent first writes for a day fail on the
+unique index (or, without the index, create duplicate rows).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+
+import db_config  # noqa: E402
+from models import db, User, WaterTracker  # noqa: E402
+
+
+def write_upsert(user_id, day, amount):
+    # Imported by main() once DATABASE_URL points at the scratch database
+    from app import upsert_daily_entry
+    upsert_daily_entry(WaterTracker, user_id, day, {'drank_water': True, 'water_amount': amount})
+    db.session.commit()
+
+
+def write_legacy(user_id, day, amount):
+    entry = WaterTracker.query.filter_by(user_id=user_id, date=day).first()
+    if entry:
+        entry.water_amount = amount
+    else:
+        db.session.add(WaterTracker(user_id=user_id, date=day, drank_water=True, water_amount=amount))
+    db.session.commit()
+
+
+def run(app, write, threads, writes):
+    """Hammer one user's row for today from `threads` threads; True if exactly one row holds a written value"""
+    import migrations
+
+    day = date.today()
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+        user = User(name='Stress Test', email='stress@example.invalid', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    errors = {'integrity': 0, 'locked': 0}
+    written = set()
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads)
+
+    def worker(thread_no):
+        start_gate.wait()
+        for i in range(writes):
+            amount = thread_no * 1000 + i
+            with app.app_context():
+                try:
+                    write(user_id, day, amount)
+                    with lock:
+                        written.add(amount)
+                except IntegrityError:
+                    db.session.rollback()
+                    with lock:
+                        errors['integrity'] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    with lock:
+                        errors['locked'] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        rows = WaterTracker.query.filter_by(user_id=user_id, date=day).all()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    print(f"  writes={threads * writes} in {elapsed:.2f}s ({len(written) / elapsed:.0f} writes/s)")
+    print(f"  succeeded={len(written)} integrity_errors={errors['integrity']} lock_errors={errors['locked']}")
+    print(f"  rows for the day={len(rows)}")
+    return len(rows) == 1 and rows[0].water_amount in written and not errors['integrity']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=50, help='writes per thread')
+    parser.add_argument('--mode', choices=['upsert', 'legacy'], default='upsert')
+    parser.add_argument('--profiles', nargs='+', choices=db_config.PROFILES, default=list(db_config.PROFILES))
+    args = parser.parse_args()
+    write = write_upsert if args.mode == 'upsert' else write_legacy
+
+    workdir = tempfile.mkdtemp(prefix='tracker-stress-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'stress.db')
+    os.environ['SLOW_REQUEST_LOG'] = os.path.join(workdir, 'slow_requests.jsonl')
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.environ.pop('CYCLE_CACHE_FILE', None)
+
+    from app import create_app
+
+    failed = []
+    try:
+        for profile in args.profiles:
+            print(f"mode={args.mode} profile={profile} threads={args.threads}")
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, f'stress-{profile}.db'),
+                'DB_PROFILE': profile
+            })
+            ok = run(app, write, args.threads, args.writes)
+            print('  OK' if ok else '  FAILED')
+            if not ok:
+                failed.append(profile)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Response compression and HTML minification as WSGI middleware.
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=1024, minify_html=True)
+
+Responses are compressed with brotli when the client accepts it and the
+brotli package is installed, and with gzip otherwise. Only text-like content
+types are compressed, and never responses that are:
+  * already encoded, such as the precompressed files in static/dist
+  * partial (Content-Range), bodiless (204, 304, HEAD) or marked no-transform
+  * smaller than min_size, where the headers cost more than the savings
+
+A response with a Content-Length is compressed in one piece. One without
+(a streamed export) is compressed chunk by chunk, and every chunk is flushed
+to the client as soon as the app yields it, so streaming keeps working.
+
+The optional minifier drops comments, indentation and blank lines from
+rendered HTML. Text inside <pre> and <textarea> is left alone, inline
+<script> blocks only lose their indentation, and <style> blocks their
+indentation and comments.
+
+A response whose body changes gets a weak ETag, since its bytes no longer
+match the app's strong one. Views that check If-None-Match should compare
+with `contains_weak`.
+"""
+import gzip
+import re
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header
+
+COMPRESSIBLE_TYPES = (
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'application/xml', 'image/svg+xml'
+)
+GZIP_LEVEL = 6         # dynamic responses: most of level 9's savings at a fraction of the CPU
+BROTLI_QUALITY = 5     # likewise; quality 11 is for build-time precompression
+MAX_BUFFERED = 1024 * 1024  # bigger bodies are compressed as a stream
+
+_VERBATIM = re.compile(r'(<(pre|textarea)\b.*?</\2\s*>)', re.S | re.I)
+_RAW_TEXT = re.compile(r'(<(script|style)\b.*?</\2\s*>)', re.S | re.I)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_BLANK_LINES = re.compile(r'\n\s*')
+_SPACES = re.compile(r'[ \t]+')
+
+
+def _minify_markup(html):
+    html = _COMMENT.sub('', html)
+    html = _BLANK_LINES.sub('\n', html)
+    return _SPACES.sub(' ', html)
+
+
+def minify_html(html):
+    """Whitespace-minify rendered HTML (str)"""
+    parts = []
+    for i, part in enumerate(_VERBATIM.split(html)):
+        # split() returns [text, block, tag name, text, block, tag name, ...]
+        if i % 3 == 1:
+            parts.append(part)
+        elif i % 3 == 0:
+            for j, piece in enumerate(_RAW_TEXT.split(part)):
+                if j % 3 == 1:
+                    if piece[1:6].lower() == 'style':
+                        piece = _CSS_COMMENT.sub('', piece)
+                    parts.append(_BLANK_LINES.sub('\n', piece))
+                elif j % 3 == 0:
+                    parts.append(_minify_markup(piece))
+    return ''.join(parts).strip() + '\n'
+
+
+def _load_brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, brotli, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress (and optionally minify) the responses of a WSGI app
+
+    The app must call start_response before returning its body, as Flask
+    does, and must not use the write() callable.
+    """
+
+    def __init__(self, app, min_size=1024, minify_html=False, gzip_level=GZIP_LEVEL,
+                 brotli_quality=BROTLI_QUALITY):
+        self.app = app
+        self.min_size = min_size
+        self.minify_html = minify_html
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli = _load_brotli()
+
+    def choose_encoding(self, accept_encoding):
+        """'br', 'gzip' or None for an Accept-Encoding header value"""
+        accepted = parse_accept_header(accept_encoding)
+        br = accepted['br'] if self.brotli is not None else 0
+        gz = accepted['gzip']
+        if br and br >= gz:
+            return 'br'
+        return 'gzip' if gz else None
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return self.brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli, self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def __call__(self, environ, start_response):
+        response = []
+
+        def capture(status, headers, exc_info=None):
+            response[:] = [status, Headers(headers), exc_info]
+            return self._unsupported_write
+
+        # Flask calls start_response before returning the body
+        app_iter = self.app(environ, capture)
+        status, headers, exc_info = response
+
+        mimetype, options = parse_options_header(headers.get('Content-Type'))
+        if not self._transformable(environ, status, headers, mimetype):
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        headers['Vary'] = _add_vary(headers.get('Vary'), 'Accept-Encoding')
+        encoding = self.choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        length = headers.get('Content-Length', type=int)
+
+        if length is None or length > MAX_BUFFERED:
+            if encoding is not None:
+                _set_encoding(headers, encoding)
+                app_iter = self._compress_stream(app_iter, encoding)
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        try:
+            body = original = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        if self.minify_html and mimetype == 'text/html':
+            charset = options.get('charset', 'utf-8')
+            body = minify_html(body.decode(charset)).encode(charset)
+        if encoding is not None and len(body) >= self.min_size:
+            compressed = self.compress(body, encoding)
+            if len(compressed) < len(body):
+                body = compressed
+                _set_encoding(headers, encoding)
+        if body != original:
+            _weaken_etag(headers)
+        headers['Content-Length'] = str(len(body))
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return [body]
+
+    def _transformable(self, environ, status, headers, mimetype):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or status[:3] in ('204', '304') or status[0] == '1':
+            return False
+        if 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+    def _compress_stream(self, app_iter, encoding):
+        stream = self._stream(encoding)
+        try:
+            for chunk in app_iter:
+                data = stream.compress(chunk)
+                if data:
+                    yield data
+            yield stream.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _unsupported_write(data):
+        raise RuntimeError("CompressionMiddleware does not support the WSGI write() callable")
+
+
+def _add_vary(vary, header):
+    values = [value.strip() for value in (vary or '').split(',') if value.strip()]
+    if header.lower() not in (value.lower() for value in values):
+        values.append(header)
+    return ', '.join(values)
+
+
+def _set_encoding(headers, encoding):
+    headers['Content-Encoding'] = encoding
+    headers.pop('Content-Length', None)
+    _weaken_etag(headers)
+
+
+def _weaken_etag(headers):
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        headers['ETag'] = 'W/' + etag
@@ -0,0 +1,182 @@
+"""Per-user cache of derived cycle state.
+
+Entries are keyed by (user_id, day). A new day therefore starts with fresh
+entries, and the nightly refresh needs no cache coordination. Write paths call
+invalidate(user_id) after changing a user's cycle data.
+
+MemoryCycleCache is an LRU with a TTL, local to one process. With several
+worker processes, a write handled by one worker cannot invalidate the others,
+so each worker may serve a stale entry for up to `ttl` seconds. SQLiteCycleCache
+keeps entries in one local SQLite file that every worker on the machine shares,
+so an invalidation is seen by all of them.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def as_dict(self, size):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'size': size
+        }
+
+
+class MemoryCycleCache:
+    """In-process LRU/TTL cache"""
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, day) -> (expires, value)
+        self._days = {}                # user_id -> days in _entries, so invalidate() skips other users
+        self._counters = _Counters()
+
+    def get(self, user_id, day):
+        key = (user_id, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self._counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters.hits += 1
+            return entry[1]
+
+    def set(self, user_id, day, value):
+        key = (user_id, day)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._days.setdefault(user_id, set()).add(day)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._counters.evictions += 1
+
+    def invalidate(self, user_id):
+        """Drop every cached day for a user"""
+        with self._lock:
+            for day in self._days.pop(user_id, ()):
+                del self._entries[(user_id, day)]
+            self._counters.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._days.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters.as_dict(len(self._entries)), backend='memory')
+
+    def _remove(self, key):
+        # Callers hold the lock
+        del self._entries[key]
+        days = self._days[key[0]]
+        days.discard(key[1])
+        if not days:
+            del self._days[key[0]]
+
+
+class SQLiteCycleCache:
+    """Cache shared by all worker processes on one machine through a SQLite file
+
+    Values must be JSON serializable. Hit and miss counters are per process.
+    """
+
+    PURGE_EVERY = 100  # sets between purges of expired rows
+
+    def __init__(self, path, maxsize=10000, ttl=300):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+        self._sets = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cycle_cache ('
+                'user_id INTEGER NOT NULL, day TEXT NOT NULL, value TEXT NOT NULL, '
+                'expires REAL NOT NULL, PRIMARY KEY (user_id, day))'
+            )
+
+    def _connect(self):
+        # One connection per thread and process; sqlite3 connections are not shareable
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, user_id, day):
+        row = self._connect().execute(
+            'SELECT value FROM cycle_cache WHERE user_id = ? AND day = ? AND expires >= ?',
+            (user_id, day, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self._counters.misses += 1
+                return None
+            self._counters.hits += 1
+        return json.loads(row[0])
+
+    def set(self, user_id, day, value):
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cycle_cache (user_id, day, value, expires) VALUES (?, ?, ?, ?)',
+            (user_id, day, json.dumps(value), time.time() + self.ttl)
+        )
+        with self._lock:
+            self._sets += 1
+            purge = self._sets % self.PURGE_EVERY == 0
+        if purge:
+            self._purge(conn)
+
+    def invalidate(self, user_id):
+        self._connect().execute('DELETE FROM cycle_cache WHERE user_id = ?', (user_id,))
+        with self._lock:
+            self._counters.invalidations += 1
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cycle_cache')
+
+    def stats(self):
+        size = self._connect().execute('SELECT COUNT(*) FROM cycle_cache').fetchone()[0]
+        with self._lock:
+            return dict(self._counters.as_dict(size), backend='sqlite')
+
+    def _purge(self, conn):
+        """Delete expired rows, then the soonest-expiring ones beyond maxsize"""
+        removed = conn.execute('DELETE FROM cycle_cache WHERE expires < ?', (time.time(),)).rowcount
+        removed += conn.execute(
+            'DELETE FROM cycle_cache WHERE rowid IN ('
+            'SELECT rowid FROM cycle_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.maxsize,)
+        ).rowcount
+        with self._lock:
+            self._counters.evictions += removed
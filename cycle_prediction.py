@@ -0,0 +1,161 @@
+"""Cycle prediction from full period history.
+
+All users are scored together in a few NumPy array operations. Each user's
+recent cycle lengths go into one row of a matrix (NaN where a user has fewer
+cycles). Every statistic is then a row-wise reduction over that matrix.
+Predicting for a single user is a batch of one.
+
+A cycle is the gap in days between two consecutive actual start dates. Gaps
+outside MIN_CYCLE_DAYS..MAX_CYCLE_DAYS are treated as missing logs, not as
+real cycles.
+"""
+import numpy as np
+from datetime import date
+
+WINDOW = 6               # most recent cycles used for a prediction
+DECAY = 0.75             # weight of each older cycle relative to the next one
+MIN_CYCLE_DAYS = 15
+MAX_CYCLE_DAYS = 90
+PRIOR_STDDEV = 3.0       # days, assumed until a user has two cycles logged
+PCOS_PRIOR_STDDEV = 7.0
+MIN_STDDEV = 1.0
+CONFIDENCE_Z = 1.645     # 90% interval
+LUTEAL_PHASE_DAYS = 14
+
+# Irregularity thresholds (days)
+IRREGULAR_STDDEV = 7.0
+SHORT_CYCLE = 21
+LONG_CYCLE = 35
+
+
+def _ordinals(dates):
+    return np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+
+
+def score_users(profiles, start_user_ids, start_dates, window=WINDOW, decay=DECAY):
+    """Score every user in one pass
+
+    `profiles` is a list of (user_id, default_cycle_length, anchor_date, pcos).
+    The anchor date is used as the last start for users with no logged periods.
+    `start_user_ids` and `start_dates` are aligned sequences of actual period
+    start dates, in any order. Returns a dict of arrays aligned with `profiles`.
+    """
+    n = len(profiles)
+    users = np.array([p[0] for p in profiles], dtype=np.int64)
+    defaults = np.array([p[1] for p in profiles], dtype=float)
+    anchors = _ordinals([p[2] for p in profiles])
+    pcos = np.array([bool(p[3]) for p in profiles], dtype=bool)
+
+    su = np.asarray(start_user_ids, dtype=np.int64)
+    so = _ordinals(start_dates)
+    if n == 0:
+        su, so = su[:0], so[:0]
+    order = np.lexsort((so, su))
+    su, so = su[order], so[order]
+    if len(su):
+        distinct = np.r_[True, (su[1:] != su[:-1]) | (so[1:] != so[:-1])]
+        su, so = su[distinct], so[distinct]
+
+    # Map each start to its profile row (starts of unknown users are dropped)
+    sorter = np.argsort(users, kind='stable')
+    pos = np.clip(np.searchsorted(users, su, sorter=sorter), 0, max(n - 1, 0))
+    known = users[sorter][pos] == su if n else np.zeros(len(su), dtype=bool)
+    start_rows = sorter[pos][known]
+
+    last_start = anchors.copy()
+    np.maximum.at(last_start, start_rows, so[known])
+
+    # Cycle lengths between consecutive starts of the same user
+    lengths = np.diff(so)
+    same_user = (su[1:] == su[:-1]) & known[1:]
+    valid = same_user & (lengths >= MIN_CYCLE_DAYS) & (lengths <= MAX_CYCLE_DAYS)
+    rows = sorter[pos[1:][valid]]
+    lengths = lengths[valid].astype(float)
+
+    # Position of each cycle counted from the user's most recent one
+    group_start = np.r_[True, rows[1:] != rows[:-1]] if len(rows) else np.zeros(0, dtype=bool)
+    group_end = np.flatnonzero(np.r_[group_start[1:], True]) if len(rows) else np.zeros(0, dtype=np.int64)
+    from_end = group_end[np.cumsum(group_start) - 1] - np.arange(len(rows))
+    recent = from_end < window
+
+    matrix = np.full((n, window), np.nan)
+    matrix[rows[recent], window - 1 - from_end[recent]] = lengths[recent]
+    present = ~np.isnan(matrix)
+    values = np.nan_to_num(matrix)
+
+    weights = np.where(present, decay ** np.arange(window)[::-1], 0.0)
+    wsum = weights.sum(axis=1)
+    count = present.sum(axis=1)
+    has_cycles = count > 0
+    mean = np.divide((weights * values).sum(axis=1), wsum, out=defaults.copy(), where=has_cycles)
+
+    # Unbiased weighted variance (reliability weights)
+    w2sum = (weights ** 2).sum(axis=1)
+    denom = wsum - np.divide(w2sum, wsum, out=np.zeros(n), where=has_cycles)
+    spread = (weights * (values - mean[:, None]) ** 2).sum(axis=1)
+    variance = np.divide(spread, denom, out=np.zeros(n), where=count > 1)
+    prior = np.where(pcos, PCOS_PRIOR_STDDEV, PRIOR_STDDEV)
+    stddev = np.where(count > 1, np.maximum(np.sqrt(variance), MIN_STDDEV), prior)
+
+    variable = (count > 1) & (stddev > IRREGULAR_STDDEV)
+    short = has_cycles & (mean < SHORT_CYCLE)
+    long_ = has_cycles & (mean > LONG_CYCLE)
+
+    return {
+        'user_id': users,
+        'cycle_length': mean,
+        'stddev': stddev,
+        'cycles_used': count,
+        'last_start': last_start,
+        'pcos': pcos,
+        'variable': variable,
+        'short': short,
+        'long': long_,
+        'irregular': variable | short | long_
+    }
+
+
+def forecast(scores, cycles_ahead=3, z=CONFIDENCE_Z):
+    """Forecast the next cycles_ahead start dates for every scored user
+
+    Returns (starts, earliest, latest) as int64 ordinal arrays of shape
+    (users, cycles_ahead). Uncertainty grows with the square root of the
+    number of cycles ahead, as cycle lengths add up.
+    """
+    k = np.arange(1, cycles_ahead + 1)
+    starts = scores['last_start'][:, None] + np.rint(scores['cycle_length'][:, None] * k).astype(np.int64)
+    half_width = np.ceil(z * scores['stddev'][:, None] * np.sqrt(k)).astype(np.int64)
+    return starts, starts - half_width, starts + half_width
+
+
+def prediction_for(scores, forecasts, i):
+    """Plain dict of one user's prediction (row i) for templates and JSON"""
+    starts, earliest, latest = forecasts
+    flags = [name for name in ('variable', 'short', 'long') if scores[name][i]]
+    next_periods = []
+    for start, low, high in zip(starts[i], earliest[i], latest[i]):
+        start_date = date.fromordinal(int(start))
+        next_periods.append({
+            'start': start_date,
+            'earliest': date.fromordinal(int(low)),
+            'latest': date.fromordinal(int(high)),
+            'ovulation': date.fromordinal(int(start) - LUTEAL_PHASE_DAYS)
+        })
+    return {
+        'cycle_length': round(float(scores['cycle_length'][i]), 1),
+        'stddev': round(float(scores['stddev'][i]), 1),
+        'cycles_used': int(scores['cycles_used'][i]),
+        'irregular': bool(scores['irregular'][i]),
+        'irregular_flags': flags,
+        'pcos': bool(scores['pcos'][i]),
+        'next_periods': next_periods
+    }
+
+
+def predict_user(user_id, default_cycle_length, anchor_date, pcos, start_dates, cycles_ahead=3):
+    """Predict for one user from all of their actual period start dates"""
+    scores = score_users(
+        [(user_id, default_cycle_length, anchor_date, pcos)],
+        [user_id] * len(start_dates), start_dates
+    )
+    return prediction_for(scores, forecast(scores, cycles_ahead), 0)
@@ -0,0 +1,138 @@
+"""Running cycle statistics.
+
+Cycle length is the gap between two consecutive actual period start dates.
+When a start date is added or removed, only the gaps next to it change, so
+the aggregates can be updated in O(1) from the neighbouring start dates.
+They do not need to be recomputed from the full history.
+"""
+import json
+import math
+
+DELAY_BUCKETS = ('early', 'on_time', 'late_1_3_days', 'late_4_7_days', 'late_over_week')
+
+
+def delay_bucket(delay_days):
+    """Name the delay distribution bucket for a delay in days"""
+    if delay_days is None or delay_days == 0:
+        return 'on_time'
+    if delay_days < 0:
+        return 'early'
+    if delay_days <= 3:
+        return 'late_1_3_days'
+    if delay_days <= 7:
+        return 'late_4_7_days'
+    return 'late_over_week'
+
+
+class RunningStats:
+    """Count, mean and variance that support both adding and removing values (Welford)"""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count or 0
+        self.mean = mean or 0.0
+        self.m2 = m2 or 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class CycleAggregates:
+    """Per-user cycle length, duration and delay aggregates"""
+
+    def __init__(self, cycles=None, durations=None, delays=None, last_start=None):
+        self.cycles = cycles or RunningStats()
+        self.durations = durations or RunningStats()
+        self.delays = dict.fromkeys(DELAY_BUCKETS, 0)
+        self.delays.update(delays or {})
+        self.last_start = last_start
+
+    @classmethod
+    def from_logs(cls, logs):
+        """Build aggregates from (actual_start_date, duration, delay_days) tuples"""
+        aggregates = cls()
+        starts = sorted({start for start, _, _ in logs if start})
+        for previous, current in zip(starts, starts[1:]):
+            aggregates.cycles.add((current - previous).days)
+        for start, duration, delay_days in logs:
+            if duration:
+                aggregates.durations.add(duration)
+            if start:
+                aggregates.delays[delay_bucket(delay_days)] += 1
+        aggregates.last_start = starts[-1] if starts else None
+        return aggregates
+
+    def add_log(self, start, duration, delay_days, previous=None, following=None, duplicate=False):
+        """Account for a new log
+
+        `previous` and `following` are the nearest other start dates before and
+        after `start`. `duplicate` is True if another log already starts on the
+        same day, in which case the cycle gaps do not change.
+        """
+        if duration:
+            self.durations.add(duration)
+        if not start:
+            return
+        self.delays[delay_bucket(delay_days)] += 1
+        if duplicate:
+            return
+        if previous and following:
+            self.cycles.remove((following - previous).days)
+        if previous:
+            self.cycles.add((start - previous).days)
+        if following:
+            self.cycles.add((following - start).days)
+        if self.last_start is None or start > self.last_start:
+            self.last_start = start
+
+    def remove_log(self, start, duration, delay_days, previous=None, following=None, duplicate=False):
+        """Undo add_log for a log that is being edited or deleted"""
+        if duration:
+            self.durations.remove(duration)
+        if not start:
+            return
+        bucket = delay_bucket(delay_days)
+        self.delays[bucket] = max(0, self.delays[bucket] - 1)
+        if duplicate:
+            return
+        if previous:
+            self.cycles.remove((start - previous).days)
+        if following:
+            self.cycles.remove((following - start).days)
+        if previous and following:
+            self.cycles.add((following - previous).days)
+        if start == self.last_start:
+            self.last_start = previous
+
+    def delays_json(self):
+        return json.dumps(self.delays)
+
+    def summary(self, default_cycle_length=28):
+        """Plain dict for templates, JSON responses and exports"""
+        return {
+            'cycle_count': self.cycles.count,
+            'avg_cycle_length': round(self.cycles.mean, 1) if self.cycles.count else default_cycle_length,
+            'cycle_length_stddev': round(self.cycles.stddev, 1),
+            'avg_duration': round(self.durations.mean, 1) if self.durations.count else None,
+            'delay_distribution': dict(self.delays),
+            'last_actual_start': self.last_start
+        }
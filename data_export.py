@@ -0,0 +1,206 @@
+"""Streaming bulk data exports.
+
+Rows are read with yield_per, so the driver hands them over in fixed-size
+batches (a server-side cursor on databases that support one). Each batch is
+encoded and handed to the caller before the next batch is read. Memory use
+depends on the batch size, not on how much history a user has.
+
+Formats:
+  * CSV: one table per file, or a zip with one CSV per table
+  * NDJSON: one JSON object per row, tagged with its table name
+  * Columnar: one file per table, written in chunks of rows. This is Parquet
+    (one row group per chunk) when pyarrow is installed. Otherwise each line
+    is one chunk stored as JSON column arrays.
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import date, datetime
+
+from sqlalchemy import select, Boolean, Float, Integer
+
+CHUNK_ROWS = 1000
+
+
+def export_value(value):
+    """Convert a column value to something csv/json can write"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_columns(table, exclude=()):
+    return [column for column in table.columns if column.name not in exclude]
+
+
+def iter_row_chunks(session, table, where=None, exclude=(), chunk_rows=CHUNK_ROWS):
+    """Yield lists of up to chunk_rows row tuples in primary key order"""
+    stmt = select(*export_columns(table, exclude)).order_by(*table.primary_key.columns)
+    if where is not None:
+        stmt = stmt.where(where)
+    result = session.execute(stmt.execution_options(yield_per=chunk_rows))
+    for partition in result.partitions():
+        yield [tuple(export_value(value) for value in row) for row in partition]
+
+
+def _write_csv(out, session, table, where, exclude, chunk_rows):
+    """Write one table as CSV to a text stream, returning after each chunk"""
+    writer = csv.writer(out)
+    writer.writerow([column.name for column in export_columns(table, exclude)])
+    yield
+    for chunk in iter_row_chunks(session, table, where, exclude, chunk_rows):
+        writer.writerows(chunk)
+        yield
+
+
+def stream_csv(session, table, where=None, exclude=(), chunk_rows=CHUNK_ROWS):
+    """Yield a single table as CSV text, one chunk of rows at a time"""
+    buffer = io.StringIO()
+    for _ in _write_csv(buffer, session, table, where, exclude, chunk_rows):
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def stream_ndjson(session, tables, where_for=None, chunk_rows=CHUNK_ROWS):
+    """Yield rows of several tables as newline-delimited JSON
+
+    `tables` is a list of (name, table, exclude) tuples. `where_for(table)`
+    returns the filter for a table, or None to export all of its rows.
+    """
+    for name, table, exclude in tables:
+        names = [column.name for column in export_columns(table, exclude)]
+        where = where_for(table) if where_for else None
+        for chunk in iter_row_chunks(session, table, where, exclude, chunk_rows):
+            lines = []
+            for row in chunk:
+                record = {'table': name}
+                record.update(zip(names, row))
+                lines.append(json.dumps(record))
+            yield '\n'.join(lines) + '\n'
+
+
+class _ZipPipe:
+    """Write-only file object for zipfile; the bytes are drained into a response"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_csv_zip(session, tables, where_for=None, chunk_rows=CHUNK_ROWS):
+    """Yield a zip archive with one CSV per table, without building it in memory"""
+    pipe = _ZipPipe()
+    # zipfile falls back to streaming mode because the pipe cannot seek
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, table, exclude in tables:
+            where = where_for(table) if where_for else None
+            with archive.open(f'{name}.csv', 'w', force_zip64=True) as entry:
+                out = io.TextIOWrapper(entry, encoding='utf-8', newline='', write_through=True)
+                for _ in _write_csv(out, session, table, where, exclude, chunk_rows):
+                    data = pipe.drain()
+                    if data:
+                        yield data
+                out.detach()
+            yield pipe.drain()
+    yield pipe.drain()
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    # Text, and dates as ISO 8601 strings like the CSV and NDJSON exports
+    return pa.string()
+
+
+class ParquetChunkWriter:
+    """Write one Parquet row group per chunk (requires pyarrow)"""
+
+    extension = 'parquet'
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([(column.name, _arrow_type(pa, column)) for column in columns])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write_chunk(self, names, rows):
+        arrays = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+        self._writer.write_table(self._pa.Table.from_pydict(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class JSONChunkWriter:
+    """Write each chunk as one JSON line of column arrays (used without pyarrow)"""
+
+    extension = 'columns.jsonl'
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write_chunk(self, names, rows):
+        data = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+        self._file.write(json.dumps({'rows': len(rows), 'columns': data}) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+def columnar_writer_class(fmt='auto'):
+    """Pick the writer for 'parquet', 'jsonl' or 'auto' (Parquet when pyarrow is installed)"""
+    if fmt == 'jsonl':
+        return JSONChunkWriter
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        if fmt == 'parquet':
+            raise RuntimeError('Parquet export needs pyarrow: pip install pyarrow')
+        return JSONChunkWriter
+    return ParquetChunkWriter
+
+
+def write_columnar(session, tables, out_dir, fmt='auto', chunk_rows=50000):
+    """Export every row of each table to out_dir, one columnar file per table
+
+    Returns a list of (table name, path, row count).
+    """
+    writer_class = columnar_writer_class(fmt)
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, table, exclude in tables:
+        columns = export_columns(table, exclude)
+        names = [column.name for column in columns]
+        path = os.path.join(out_dir, f'{name}.{writer_class.extension}')
+        # Write to a temporary name so an interrupted export never looks complete
+        tmp_path = path + '.tmp'
+        writer = writer_class(tmp_path, columns)
+        rows = 0
+        try:
+            for chunk in iter_row_chunks(session, table, exclude=exclude, chunk_rows=chunk_rows):
+                writer.write_chunk(names, chunk)
+                rows += len(chunk)
+        finally:
+            writer.close()
+        os.replace(tmp_path, path)
+        written.append((name, path, rows))
+    return written
@@ -0,0 +1,185 @@
+"""Database engine profiles.
+
+SQLALCHEMY_DATABASE_URI alone gives SQLite's defaults: a rollback journal,
+where a writer blocks every reader, and a full fsync on each commit. With
+several gunicorn workers, that is where "database is locked" comes from. The
+'production' profile switches SQLite to WAL: readers no longer block the
+single writer, commits only append to the log, and a busy writer is waited
+for instead of failing at once. The pragmas are set on every new pool
+connection, because most of them only last for that connection.
+
+Pick a profile with the DB_PROFILE environment variable ('production' by
+default, 'default' for SQLite's stock behaviour).
+
+The database itself comes from DATABASE_URL (SQLite file by default, or
+PostgreSQL). If DATABASE_REPLICA_URL is also set, views marked read-only
+read from that replica through RoutingSession, and all writes go to the
+primary.
+"""
+import os
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Relative SQLite paths are resolved inside the app's instance folder
+DEFAULT_DATABASE_URL = 'sqlite:///period_tracker.db'
+
+REPLICA_BIND = 'replica'
+# After a user writes, their reads stay on the primary this long, so they
+# see their own change even if the replica is lagging
+REPLICA_STICKY_SECONDS = 5
+
+# PRAGMA name -> value, applied in this order on every new SQLite connection
+SQLITE_PRAGMAS = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',          # persistent; readers and the writer stop blocking each other
+        'synchronous': 'NORMAL',        # fsync at checkpoints, not every commit (safe with WAL)
+        'busy_timeout': 5000,           # ms to wait for the write lock before "database is locked"
+        'cache_size': -64000,           # KiB (negative) of page cache per connection
+        'mmap_size': 268435456,         # read pages through a 256 MiB memory map
+        'temp_store': 'MEMORY',
+    }
+}
+
+# SQLAlchemy create_engine() options per backend and profile
+POOL_OPTIONS = {
+    'sqlite': {
+        'default': {},
+        'production': {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_pre_ping': False,     # a local file connection does not go stale
+            'connect_args': {'timeout': 5, 'check_same_thread': False},
+        }
+    },
+    'postgresql': {
+        'default': {},
+        'production': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            'pool_recycle': 1800,       # stay under server and proxy idle timeouts
+            'pool_pre_ping': True,
+        }
+    }
+}
+
+PROFILES = tuple(SQLITE_PRAGMAS)
+
+
+def database_url(url):
+    """Normalize a DATABASE_URL (Heroku-style postgres:// is not accepted by SQLAlchemy)"""
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def instance_database_url(url, instance_path):
+    """Resolve a relative SQLite path against the instance folder, as Flask-SQLAlchemy does"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'sqlite' or parsed.database in (None, '', ':memory:'):
+        return url
+    if os.path.isabs(parsed.database):
+        return url
+    os.makedirs(instance_path, exist_ok=True)
+    return parsed.set(database=os.path.join(instance_path, parsed.database)).render_as_string(hide_password=False)
+
+
+def _backend(uri):
+    return make_url(uri).get_backend_name()
+
+
+def engine_options(uri, profile='production'):
+    """create_engine() keyword options for a database URI under a profile"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB profile {profile!r}; choose from {', '.join(PROFILES)}")
+    options = POOL_OPTIONS.get(_backend(uri), {}).get(profile, {})
+    # In-memory SQLite uses a single-connection pool that takes no size options
+    if _backend(uri) == 'sqlite' and make_url(uri).database in (None, '', ':memory:'):
+        options = {}
+    return {key: (dict(value) if isinstance(value, dict) else value) for key, value in options.items()}
+
+
+def apply_profile(engine, profile='production'):
+    """Run the profile's connect-time pragmas on every new connection of a SQLite engine"""
+    pragmas = SQLITE_PRAGMAS.get(profile, {})
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def dispose_after_fork(engine):
+    """Give every forked worker process its own connection pool
+
+    A pre-fork server creates the engine in the parent. Pooled connections
+    must not be shared between processes, so the child starts with an empty
+    pool. close=False leaves any connection the parent opened to the parent.
+    """
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def sqlite_settings(connection):
+    """Current values of the profile's pragmas on a connection, for checking a deployment"""
+    return {
+        name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        for name in SQLITE_PRAGMAS['production']
+    }
+
+
+def replica_binds(replica_url, profile='production'):
+    """SQLALCHEMY_BINDS entry for a read replica (empty without one)"""
+    if not replica_url:
+        return {}
+    url = database_url(replica_url)
+    return {REPLICA_BIND: dict(engine_options(url, profile), url=url)}
+
+
+def _has_replica():
+    return REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def use_replica_for_request():
+    """Read from the replica for the rest of this request, unless the user has just written"""
+    # Without a replica, leave the session alone (reading it adds Vary: Cookie)
+    if _has_replica():
+        g.db_read_replica = time.time() >= session.get('db_primary_until', 0)
+
+
+def remember_write(response):
+    """after_request hook: keep a user who wrote on the primary for a few seconds
+
+    A no-op without a replica, so writes do not set a session cookie.
+    """
+    if g.get('db_wrote') and _has_replica():
+        session['db_primary_until'] = time.time() + REPLICA_STICKY_SECONDS
+    return response
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads in read-only views to the replica
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, and
+    so does every read after the first write of a request.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif g.get('db_read_replica') and not g.get('db_wrote') and REPLICA_BIND in self._db.engines:
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
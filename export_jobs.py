@@ -0,0 +1,230 @@
+"""Background PDF export jobs.
+
+Rendering a report with reportlab is CPU-bound, so it runs in a small process
+pool instead of on a request thread. Finished reports are cached on disk under
+a name made from the user ID and a data-version stamp. Any worker process can
+serve an unchanged report straight from the cache, even if a different worker
+rendered it. The cache is trimmed by age and total size after every render.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def render_report_pdf(report, path):
+    """Render a report dict (plain data only) to a PDF file at `path`"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+
+    # Write to a temporary name first so a half-written file is never served
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(tmp_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor=colors.pink
+    )
+    story.append(Paragraph(f"Period Tracker Report for {report['name']}", title_style))
+    story.append(Spacer(1, 20))
+
+    # User Info
+    story.append(Paragraph("User Information", styles['Heading2']))
+    user_table = Table(report['user_info'])
+    user_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.pink),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(user_table)
+    story.append(Spacer(1, 20))
+
+    # Period History
+    story.append(Paragraph("Period History (Last 6 Months)", styles['Heading2']))
+    if report['period_rows']:
+        period_data = [['Expected Date', 'Actual Date', 'Delay', 'Duration', 'Notes']] + report['period_rows']
+        period_table = Table(period_data)
+        period_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.lavender),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(period_table)
+    else:
+        story.append(Paragraph("No period data available", styles['Normal']))
+
+    story.append(Spacer(1, 20))
+
+    # Cycle Statistics
+    story.append(Paragraph("Cycle Statistics", styles['Heading2']))
+    stats_table = Table(report['stats_rows'])
+    stats_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lavender),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(stats_table)
+    story.append(Spacer(1, 20))
+
+    # Build PDF
+    try:
+        doc.build(story)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Do not leave a partial file behind in the cache directory
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return path
+
+
+class ExportJobRunner:
+    """Process-pool job runner with an on-disk report cache"""
+
+    def __init__(self, cache_dir=None, max_workers=2, max_cache_bytes=200 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_cache_bytes = max_cache_bytes
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._executor = None
+        self._pid = None
+        self._jobs = {}
+
+    def init_app(self, app):
+        """Take the cache directory, pool size and cache limits from an app's EXPORT_* settings"""
+        self.cache_dir = app.config['EXPORT_CACHE_DIR']
+        self.max_workers = app.config.get('EXPORT_WORKERS', self.max_workers)
+        self.max_cache_bytes = app.config.get('EXPORT_CACHE_MAX_BYTES', self.max_cache_bytes)
+        self.max_age = app.config.get('EXPORT_CACHE_MAX_AGE', self.max_age)
+
+    @staticmethod
+    def job_id(user_id, version):
+        return f"{user_id}-{version}"
+
+    def cached_path(self, job_id):
+        return os.path.join(self.cache_dir, f"{job_id}.pdf")
+
+    def submit(self, user_id, version, report):
+        """Start rendering a report unless it is cached or already in progress"""
+        job_id = self.job_id(user_id, version)
+        path = self.cached_path(job_id)
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if future is not None and not (future.done() and future.exception()):
+                return job_id
+            if os.path.exists(path):
+                return job_id
+            os.makedirs(self.cache_dir, exist_ok=True)
+            future = self._get_executor().submit(render_report_pdf, report, path)
+            future.add_done_callback(lambda _: self.evict())
+            self._jobs[job_id] = future
+        return job_id
+
+    def status(self, job_id):
+        """Return 'queued', 'running', 'done', 'failed' or None for an unknown job"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None:
+            # Possibly rendered by another worker process
+            return 'done' if os.path.exists(self.cached_path(job_id)) else None
+        if not future.done():
+            return 'running' if future.running() else 'queued'
+        if future.exception():
+            return 'failed'
+        return 'done' if os.path.exists(self.cached_path(job_id)) else 'failed'
+
+    def error(self, job_id):
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is not None and future.done() and future.exception():
+            return str(future.exception())
+        return None
+
+    def evict(self):
+        """Delete reports past max_age, then the oldest ones until under max_cache_bytes
+
+        Temporary files older than max_age, left by a render process that was
+        killed, are deleted too.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(('.pdf', '.tmp')):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith('.tmp'):
+                if now - stat.st_mtime > self.max_age:
+                    self._remove_file(path)
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path, name)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path, name))
+
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, path, name in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            self._remove(path, name)
+            total -= size
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove(self, path, name):
+        self._remove_file(path)
+        with self._lock:
+            future = self._jobs.get(name[:-len('.pdf')])
+            if future is not None and future.done():
+                del self._jobs[name[:-len('.pdf')]]
+
+    def _get_executor(self):
+        # Pools cannot be shared across fork(), so each worker process makes its own.
+        # 'spawn' keeps the children free of the parent's threads and DB connections.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            self._pid = os.getpid()
+            self._jobs = {}
+        return self._executor
@@ -8,8 +8,19 @@ CREDENTIALS_FILE = 'period-tracker-467708-e0f65cc96872.json'
 # Your Google Sheet ID (found in the URL of your sheet)
 SHEET_ID = '1IthWHfM13glPnffN3CN5xLvr2w4oefc07psMJfD8wks'
 
+# OAuth scopes requested for the service account
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+
+# Keep-alive connections shared by all threads talking to the Sheets API
+HTTP_POOL_SIZE = 10
+
 # Sheet name where login data will be stored
 LOGIN_SHEET_NAME = 'Sheet1'
 
 # Column headers for the login data sheet
-LOGIN_COLUMNS = ['Timestamp', 'Action', 'User_ID', 'Email', 'Name', 'IP_Address'] 
\ No newline at end of file
+LOGIN_COLUMNS = ['Timestamp', 'Action', 'User_ID', 'Email', 'Name', 'IP_Address'] 
+
+# Activity log batching: rows are queued and written by a background worker
+ACTIVITY_LOG_QUEUE_SIZE = 1000   # rows beyond this are dropped instead of blocking requests
+ACTIVITY_LOG_BATCH_SIZE = 50     # rows per append_rows call
+ACTIVITY_LOG_FLUSH_INTERVAL = 5  # seconds before a partial batch is written
@@ -0,0 +1,86 @@
+"""Tips, quotes and condition advice, loaded once from health_content.json.
+
+The content is frozen after loading: lists become tuples and dicts become
+read-only mappings. Callers and templates therefore share one copy and can
+never change it. Lookups by mood, symptom and condition are plain dict gets.
+The advice bundle for every combination of the four condition flags
+(pcos, thyroid, anemia, diabetes) is built once when the content loads.
+"""
+import json
+import os
+import random
+from itertools import product
+from types import MappingProxyType
+
+CONTENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'health_content.json')
+CONDITIONS = ('pcos', 'thyroid', 'anemia', 'diabetes')
+PREVIEW_SECTION = 'diet'  # advice section shown on the dashboard
+
+
+def freeze(value):
+    """Recursively turn lists into tuples and dicts into read-only mappings"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class HealthContent:
+    """Read-only content with precomputed lookups"""
+
+    def __init__(self, data):
+        data = freeze(data)
+        fallbacks = data['fallbacks']
+        self.health_tips = data['health_tips']
+        self.supportive_messages = data['supportive_messages']
+        self.quotes_by_mood = data['motivational_quotes']
+        self.tips_by_mood = data['tips_by_mood']
+        self.tips_by_symptom = data['tips_by_symptom']
+        self.condition_tips = data['condition_tips']
+        self.default_quotes = self.quotes_by_mood[fallbacks['motivational_quotes']]
+        self.default_mood_tips = self.tips_by_mood[fallbacks['tips_by_mood']]
+        self.default_symptom_tips = self.tips_by_symptom[fallbacks['tips_by_symptom']]
+        self.default_condition_tips = self.condition_tips[fallbacks['condition_tips']]
+        self.condition_titles = data['conditions']
+        self.condition_advice = data['condition_advice']
+
+        # (pcos, thyroid, anemia, diabetes) -> (advice by condition, dashboard preview)
+        self._bundles = {flags: self._build_bundle(flags) for flags in product((False, True), repeat=len(CONDITIONS))}
+
+    @classmethod
+    def load(cls, path=CONTENT_FILE):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _build_bundle(self, flags):
+        conditions = [name for name, flag in zip(CONDITIONS, flags) if flag]
+        advice = MappingProxyType({name: self.condition_advice[name] for name in conditions})
+        preview = tuple(
+            MappingProxyType({
+                'condition': name,
+                'title': f"{self.condition_titles[name]} {PREVIEW_SECTION}",
+                'content': '. '.join(self.condition_advice[name][PREVIEW_SECTION])
+            })
+            for name in conditions
+        )
+        return advice, preview
+
+    def random_tip(self):
+        return random.choice(self.health_tips)
+
+    def random_quote(self, mood=None):
+        return random.choice(self.quotes_by_mood.get(mood, self.default_quotes) if mood else self.default_quotes)
+
+    def tips_for_mood(self, mood):
+        return self.tips_by_mood.get(mood, self.default_mood_tips)
+
+    def tips_for_symptom(self, symptom):
+        return self.tips_by_symptom.get(symptom, self.default_symptom_tips)
+
+    def tips_for_condition(self, condition):
+        return self.condition_tips.get(condition, self.default_condition_tips)
+
+    def advice_bundle(self, user):
+        """(advice by condition, dashboard preview items) for a user's condition flags"""
+        return self._bundles[tuple(bool(getattr(user, name)) for name in CONDITIONS)]
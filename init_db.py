@@ -1,5 +1,22 @@
-from app import app, db
+"""Create or upgrade the database schema.
 
-with app.app_context():
-    db.create_all()
-    print("Database created successfully with new schema!") 
\ No newline at end of file
+Only the models are loaded, not the web app, so this runs without the
+routes, caches and background workers (or their imports).
+"""
+import os
+
+from sqlalchemy import create_engine
+
+import db_config
+import migrations
+from models import db
+
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+url = db_config.instance_database_url(
+    db_config.database_url(os.environ.get('DATABASE_URL', db_config.DEFAULT_DATABASE_URL)), INSTANCE_PATH
+)
+engine = create_engine(url)
+migrations.upgrade(engine, db.metadata)
+engine.dispose()
+print("Database created successfully with new schema!")
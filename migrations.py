@@ -0,0 +1,189 @@
+"""Versioned schema migrations.
+
+db.create_all() only creates missing tables. It never adds indexes or
+constraints to a table that already exists, so an existing
+instance/period_tracker.db would keep its old schema forever. Each migration
+below upgrades a database in place, and the schema_version table records the
+last migration applied.
+
+Run them with `flask --app app migrate-db`.
+"""
+from sqlalchemy import func, inspect, select, text
+
+# Trackers that hold one row per user per day. Duplicate rows could be created
+# by two concurrent requests; the routes always updated the first (lowest id)
+# row, so that is the one kept.
+ONE_ROW_PER_DAY_TABLES = ['mood_tracker', 'water_tracker', 'nutrition_tracker']
+
+
+def _add_per_user_date_indexes(conn):
+    for table in ONE_ROW_PER_DAY_TABLES:
+        conn.execute(text(
+            f'DELETE FROM {table} WHERE id NOT IN '
+            f'(SELECT MIN(id) FROM {table} GROUP BY user_id, date)'
+        ))
+        conn.execute(text(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_user_date ON {table} (user_id, date)'
+        ))
+
+    statements = [
+        'CREATE INDEX IF NOT EXISTS ix_cycle_settings_user ON cycle_settings (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_period_log_user_expected ON period_log (user_id, expected_date)',
+        'CREATE INDEX IF NOT EXISTS ix_period_log_user_start ON period_log (user_id, actual_start_date)',
+        'CREATE INDEX IF NOT EXISTS ix_current_period_user_active ON current_period (user_id, is_active)',
+        'CREATE INDEX IF NOT EXISTS ix_self_care_activity_user_date ON self_care_activity (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS ix_favorite_tip_user ON favorite_tip (user_id)',
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _add_user_data_version(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('user')}
+    if 'data_version' not in columns:
+        conn.execute(text('ALTER TABLE "user" ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0'))
+    if 'data_updated_at' not in columns:
+        conn.execute(text('ALTER TABLE "user" ADD COLUMN data_updated_at TIMESTAMP'))
+
+
+def _add_self_care_client_event_id(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('self_care_activity')}
+    if 'client_event_id' not in columns:
+        conn.execute(text('ALTER TABLE self_care_activity ADD COLUMN client_event_id VARCHAR(64)'))
+    conn.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_self_care_activity_client_event '
+        'ON self_care_activity (user_id, client_event_id)'
+    ))
+
+
+def _add_tracker_client_updated_at(conn):
+    for table in ONE_ROW_PER_DAY_TABLES:
+        columns = {column['name'] for column in inspect(conn).get_columns(table)}
+        if 'client_updated_at' not in columns:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN client_updated_at TIMESTAMP'))
+
+
+# (version, description, upgrade function). Version 1 is the schema as it was
+# before migrations existed. Append new migrations; never edit applied ones.
+MIGRATIONS = [
+    (2, 'Composite per-user date indexes and one-row-per-day constraints', _add_per_user_date_indexes),
+    (3, 'Per-user data version for conditional GETs', _add_user_data_version),
+    (4, 'Client event IDs so synced self-care events are stored once', _add_self_care_client_event_id),
+    (5, 'Time of the last write on daily trackers so older synced events lose', _add_tracker_client_updated_at),
+]
+
+BASELINE_VERSION = 1
+HEAD_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else BASELINE_VERSION
+
+
+def _ensure_version_table(conn):
+    conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'))
+
+
+def _write_version(conn, version):
+    conn.execute(text('DELETE FROM schema_version'))
+    conn.execute(text('INSERT INTO schema_version (version) VALUES (:version)'), {'version': version})
+
+
+def current_version(engine):
+    """Return the applied schema version, or None for a database with no tables"""
+    with engine.connect() as conn:
+        tables = inspect(conn).get_table_names()
+        if 'schema_version' in tables:
+            return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar()
+        if 'user' in tables:
+            return BASELINE_VERSION
+        return None
+
+
+def stamp(engine, version=HEAD_VERSION):
+    """Record a version without running migrations (after create_all())"""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        _write_version(conn, version)
+
+
+def upgrade(engine, metadata):
+    """Bring the database up to HEAD_VERSION and return the versions applied"""
+    version = current_version(engine)
+    if version is None:
+        # Fresh database: the models already describe the latest schema
+        metadata.create_all(engine)
+        stamp(engine)
+        return [HEAD_VERSION]
+
+    applied = []
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            _ensure_version_table(conn)
+            _write_version(conn, target)
+        print(f"Applied migration {target}: {description}")
+        applied.append(target)
+
+    # Tables added to the models since the last migration
+    metadata.create_all(engine)
+    return applied
+
+
+def copy_data(source, target, metadata, chunk_rows=5000):
+    """Copy every model table from source into an empty target database
+
+    The target is brought to HEAD_VERSION first, then tables are copied in
+    foreign key order, chunk_rows at a time, in a single transaction.
+    PostgreSQL id sequences are moved past the copied ids. Returns a list of
+    (table name, rows copied).
+    """
+    upgrade(target, metadata)
+    tables = metadata.sorted_tables
+    with target.connect() as conn:
+        for table in tables:
+            if conn.execute(select(func.count()).select_from(table)).scalar():
+                raise RuntimeError(f'Target table {table.name} already has rows; copy into an empty database')
+
+    copied = []
+    with source.connect() as src, target.begin() as dst:
+        for table in tables:
+            rows = 0
+            stmt = select(table).order_by(*table.primary_key.columns)
+            result = src.execution_options(yield_per=chunk_rows).execute(stmt)
+            for partition in result.partitions():
+                dst.execute(table.insert(), [dict(row._mapping) for row in partition])
+                rows += len(partition)
+            copied.append((table.name, rows))
+
+        if target.dialect.name == 'postgresql':
+            for table in tables:
+                if 'id' in table.c and table.c.id.autoincrement:
+                    dst.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                        f'COALESCE((SELECT MAX(id) FROM "{table.name}"), 0) + 1, false)'
+                    ))
+    return copied
+
+
+def explain_query_plans(engine, statements, table_names):
+    """Run EXPLAIN QUERY PLAN for captured statements and list full table scans
+
+    `statements` is a list of (sql, parameters) tuples as seen by the
+    before_cursor_execute event. Returns (plans, scans) where plans maps each
+    statement to its plan lines and scans lists statements that read a model
+    table without an index.
+    """
+    if engine.dialect.name != 'sqlite':
+        raise RuntimeError('Query plan checks are only implemented for SQLite')
+
+    plans = []
+    scans = []
+    with engine.connect() as conn:
+        for sql, parameters in statements:
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+            detail = [row[-1] for row in rows]
+            plans.append((sql, detail))
+            for line in detail:
+                words = line.split()
+                if len(words) >= 2 and words[0] == 'SCAN' and words[1] in table_names:
+                    scans.append((sql, line))
+    return plans, scans
@@ -0,0 +1,228 @@
+"""Database models and the shared Flask-SQLAlchemy extension.
+
+Kept apart from app.py so schema tools (init_db.py, migrations, data
+generators) can load the models without the routes, caches and background
+workers of the web app. The app binds `db` with db.init_app(app).
+"""
+from datetime import datetime
+from itertools import chain
+
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+import db_config
+
+db = SQLAlchemy(session_options={'class_': db_config.RoutingSession})
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    age = db.Column(db.Integer)
+    pcos = db.Column(db.Boolean, default=False)
+    thyroid = db.Column(db.Boolean, default=False)
+    anemia = db.Column(db.Boolean, default=False)
+    diabetes = db.Column(db.Boolean, default=False)
+    emergency_contact = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped whenever any of the user's data changes; used for ETags
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    data_updated_at = db.Column(db.DateTime)
+    
+    # Relationships
+    cycle_settings = db.relationship('CycleSettings', backref='user', uselist=False)
+    period_logs = db.relationship('PeriodLog', backref='user', lazy=True)
+    mood_trackers = db.relationship('MoodTracker', backref='user', lazy=True)
+    favorite_tips = db.relationship('FavoriteTip', backref='user', lazy=True)
+    current_period = db.relationship('CurrentPeriod', backref='user', uselist=False)
+    water_trackers = db.relationship('WaterTracker', backref='user', lazy=True)
+    nutrition_trackers = db.relationship('NutritionTracker', backref='user', lazy=True)
+
+class CycleSettings(db.Model):
+    __table_args__ = (
+        db.Index('ix_cycle_settings_user', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    avg_cycle_length = db.Column(db.Integer, default=28)
+    avg_period_length = db.Column(db.Integer, default=5)
+    start_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PeriodLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_period_log_user_expected', 'user_id', 'expected_date'),
+        db.Index('ix_period_log_user_start', 'user_id', 'actual_start_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    expected_date = db.Column(db.Date, nullable=False)
+    actual_start_date = db.Column(db.Date)
+    delay_days = db.Column(db.Integer, default=0)
+    duration = db.Column(db.Integer)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MoodTracker(db.Model):
+    __table_args__ = (
+        db.Index('uq_mood_tracker_user_date', 'user_id', 'date', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    mood = db.Column(db.String(50))
+    symptoms = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    client_updated_at = db.Column(db.DateTime)  # (client) time of the last write; older /sync events lose
+
+class FavoriteTip(db.Model):
+    __table_args__ = (
+        db.Index('ix_favorite_tip_user', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tip_text = db.Column(db.Text, nullable=False)
+    tip_category = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CurrentPeriod(db.Model):
+    __table_args__ = (
+        db.Index('ix_current_period_user_active', 'user_id', 'is_active'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    expected_end_date = db.Column(db.Date, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class WaterTracker(db.Model):
+    __table_args__ = (
+        db.Index('uq_water_tracker_user_date', 'user_id', 'date', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    drank_water = db.Column(db.Boolean, default=False)
+    water_amount = db.Column(db.Float, default=0.0)  # in liters
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    client_updated_at = db.Column(db.DateTime)  # (client) time of the last write; older /sync events lose
+
+class NutritionTracker(db.Model):
+    __table_args__ = (
+        db.Index('uq_nutrition_tracker_user_date', 'user_id', 'date', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    ate_iron_rich = db.Column(db.Boolean, default=False)
+    ate_healthy = db.Column(db.Boolean, default=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    client_updated_at = db.Column(db.DateTime)  # (client) time of the last write; older /sync events lose
+
+class SelfCareActivity(db.Model):
+    __table_args__ = (
+        db.Index('ix_self_care_activity_user_date', 'user_id', 'date'),
+        db.Index('uq_self_care_activity_client_event', 'user_id', 'client_event_id', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    activity_type = db.Column(db.String(50))  # exercise, meditation, journaling, etc.
+    duration = db.Column(db.Integer)  # in minutes
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    client_event_id = db.Column(db.String(64))  # set by /sync so replayed events are not duplicated
+
+class CycleStatistics(db.Model):
+    """Running cycle aggregates, updated incrementally on every period log write"""
+    __table_args__ = (
+        db.Index('uq_cycle_statistics_user', 'user_id', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    cycle_count = db.Column(db.Integer, default=0)
+    cycle_mean = db.Column(db.Float, default=0.0)
+    cycle_m2 = db.Column(db.Float, default=0.0)  # sum of squared deviations (Welford)
+    duration_count = db.Column(db.Integer, default=0)
+    duration_mean = db.Column(db.Float, default=0.0)
+    duration_m2 = db.Column(db.Float, default=0.0)
+    delay_counts = db.Column(db.Text)  # JSON object of delay bucket -> count
+    last_actual_start = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CycleState(db.Model):
+    """Materialized cycle status for one day, so requests read one row instead of recomputing
+
+    Rewritten for every user by `flask refresh-cycle-states` (run nightly) and
+    for one user whenever their cycle data changes.
+    """
+    __table_args__ = (
+        db.Index('uq_cycle_state_user', 'user_id', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    computed_on = db.Column(db.Date, nullable=False)  # the day status/day/delay_days describe
+    next_period = db.Column(db.Date, nullable=False)
+    ovulation_start = db.Column(db.Date, nullable=False)
+    ovulation_end = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # period or cycle
+    day = db.Column(db.Integer, nullable=False)
+    total_days = db.Column(db.Integer, nullable=False)
+    delay_days = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Columns of CycleState filled by compute_cycle_state()
+CYCLE_STATE_FIELDS = [
+    'computed_on', 'next_period', 'ovulation_start', 'ovulation_end',
+    'status', 'day', 'total_days', 'delay_days'
+]
+
+class EducationalBlog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50))  # myths, stories, awareness
+    image_url = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Rows owned by one user. Any change to them bumps that user's data_version.
+VERSIONED_MODELS = (
+    CycleSettings, PeriodLog, MoodTracker, FavoriteTip, CurrentPeriod,
+    WaterTracker, NutritionTracker, SelfCareActivity
+)
+USER_VERSION_FIELDS = {'data_version', 'data_updated_at'}
+
+@event.listens_for(db.session, 'before_flush')
+def bump_data_versions(session, flush_context, instances):
+    """Bump User.data_version for every user whose data is about to change"""
+    user_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, VERSIONED_MODELS):
+            if obj in session.new or obj in session.deleted or session.is_modified(obj):
+                user_ids.add(obj.user_id)
+        elif isinstance(obj, User) and obj not in session.new and session.is_modified(obj):
+            changed = {attr.key for attr in db.inspect(obj).attrs if attr.history.has_changes()}
+            if changed - USER_VERSION_FIELDS:
+                user_ids.add(obj.id)
+    
+    now = datetime.utcnow()
+    with session.no_autoflush:
+        for user_id in user_ids:
+            user = session.get(User, user_id)
+            if user:
+                # Incremented in SQL so concurrent writers never reuse a version
+                user.data_version = User.data_version + 1
+                user.data_updated_at = now
@@ -0,0 +1,262 @@
+"""Per-request performance metrics and a slow-request log.
+
+For every request this records:
+  * wall time
+  * number of SQL statements and the time spent in them
+  * template render time
+  * time spent in other named timers, such as the activity log
+
+Totals per endpoint are exposed as Prometheus text. A request slower than the
+threshold is written as one JSON line to the slow-request log, with its SQL
+grouped by statement text. A statement run many times in one request is
+usually an N+1 query.
+
+Measurements stop when the view returns its response, so the time spent
+sending a streamed body is not included.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_SQL_LENGTH = 1000       # characters of a statement kept in the slow log
+MAX_LOGGED_STATEMENTS = 20  # distinct statements per slow-log entry, most expensive first
+
+
+class _Recorder:
+    """Timings of the current request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.statements = {}  # normalized SQL -> [executions, seconds]
+        self.timers = {}      # name -> seconds
+        self._template_started = []
+
+    def add_sql(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        entry = self.statements.setdefault(' '.join(statement.split())[:MAX_SQL_LENGTH], [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+
+class _EndpointTotals:
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.seconds = 0.0
+        self.sql_queries = 0
+        self.sql_max_queries = 0
+        self.sql_seconds = 0.0
+        self.timers = {}
+        self.statuses = {}
+        self.slow = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """Collect request timings in this process and log slow requests"""
+
+    def __init__(self, slow_request_ms=500, slow_log_path=None, prefix='period_tracker'):
+        self.slow_request_ms = slow_request_ms
+        self.slow_log_path = slow_log_path
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._totals = {}  # (endpoint, method) -> _EndpointTotals
+        self._skip_endpoints = {'static'}
+
+    def init_app(self, app, skip_endpoints=()):
+        """Time every request of an app, apart from skip_endpoints
+
+        SLOW_REQUEST_MS and SLOW_REQUEST_LOG in the app's config take
+        precedence over the constructor's arguments.
+        """
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', self.slow_request_ms)
+        self.slow_log_path = app.config.get('SLOW_REQUEST_LOG', self.slow_log_path)
+        self._skip_endpoints.update(skip_endpoints)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+
+    def watch_engine(self, engine):
+        """Count and time the SQL statements an engine runs during requests"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def timer(self, name):
+        """Context manager adding its elapsed time to the current request's `name` timer"""
+        return _Timer(name)
+
+    def _start_request(self):
+        if request.endpoint not in self._skip_endpoints:
+            g.request_metrics = _Recorder()
+
+    def _template_started(self, sender, template, context, **extra):
+        recorder = g.get('request_metrics')
+        if recorder is not None:
+            recorder._template_started.append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        recorder = g.get('request_metrics')
+        if recorder is not None and recorder._template_started:
+            recorder.add_time('template', time.perf_counter() - recorder._template_started.pop())
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get('request_metrics') is not None:
+            conn.info.setdefault('request_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('request_metrics_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        if has_request_context() and g.get('request_metrics') is not None:
+            g.request_metrics.add_sql(statement, seconds)
+
+    def _finish_request(self, response):
+        recorder = g.pop('request_metrics', None)
+        if recorder is None:
+            return response
+        seconds = time.perf_counter() - recorder.started
+        slow = seconds * 1000 >= self.slow_request_ms
+        key = (request.endpoint or 'unknown', request.method)
+
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = _EndpointTotals()
+            totals.requests += 1
+            totals.seconds += seconds
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    totals.buckets[i] += 1
+            totals.sql_queries += recorder.sql_count
+            totals.sql_max_queries = max(totals.sql_max_queries, recorder.sql_count)
+            totals.sql_seconds += recorder.sql_seconds
+            for name, value in recorder.timers.items():
+                totals.timers[name] = totals.timers.get(name, 0.0) + value
+            status = str(response.status_code)
+            totals.statuses[status] = totals.statuses.get(status, 0) + 1
+            if slow:
+                totals.slow += 1
+
+        if slow:
+            self._log_slow_request(recorder, seconds, response.status_code)
+        return response
+
+    def _log_slow_request(self, recorder, seconds, status):
+        statements = sorted(recorder.statements.items(), key=lambda item: item[1][1], reverse=True)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': status,
+            'wall_ms': round(seconds * 1000, 1),
+            'sql_count': recorder.sql_count,
+            'sql_ms': round(recorder.sql_seconds * 1000, 1),
+            'timers_ms': {name: round(value * 1000, 1) for name, value in recorder.timers.items()},
+            'sql': [
+                {'statement': sql, 'count': count, 'ms': round(total * 1000, 1)}
+                for sql, (count, total) in statements[:MAX_LOGGED_STATEMENTS]
+            ]
+        }
+        line = json.dumps(entry)
+        if not self.slow_log_path:
+            print(f"Slow request: {line}")
+            return
+        try:
+            directory = os.path.dirname(self.slow_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            print(f"Slow request log error: {e}")
+
+    def snapshot(self):
+        """Copy of the per-endpoint totals, keyed by (endpoint, method)"""
+        with self._lock:
+            return {
+                key: {
+                    'requests': totals.requests,
+                    'seconds': totals.seconds,
+                    'sql_queries': totals.sql_queries,
+                    'sql_max_queries': totals.sql_max_queries,
+                    'sql_seconds': totals.sql_seconds,
+                    'timers': dict(totals.timers),
+                    'statuses': dict(totals.statuses),
+                    'slow': totals.slow,
+                    'buckets': list(totals.buckets)
+                }
+                for key, totals in self._totals.items()
+            }
+
+    def render_prometheus(self):
+        """All totals in the Prometheus text exposition format"""
+        p = self.prefix
+        snapshot = self.snapshot()
+        timer_names = sorted({name for totals in snapshot.values() for name in totals['timers']})
+        lines = [
+            f'# HELP {p}_request_duration_seconds Wall time of requests, until the response is returned',
+            f'# TYPE {p}_request_duration_seconds histogram'
+        ]
+        for (endpoint, method), totals in sorted(snapshot.items()):
+            labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {totals["requests"]}')
+            lines.append(f'{p}_request_duration_seconds_sum{{{labels}}} {totals["seconds"]:.6f}')
+            lines.append(f'{p}_request_duration_seconds_count{{{labels}}} {totals["requests"]}')
+
+        def counter(name, help_text, value_of, kind='counter'):
+            lines.append(f'# HELP {p}_{name} {help_text}')
+            lines.append(f'# TYPE {p}_{name} {kind}')
+            for (endpoint, method), totals in sorted(snapshot.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                lines.append(f'{p}_{name}{{{labels}}} {value_of(totals)}')
+
+        lines.append(f'# HELP {p}_requests_total Requests by response status')
+        lines.append(f'# TYPE {p}_requests_total counter')
+        for (endpoint, method), totals in sorted(snapshot.items()):
+            for status, count in sorted(totals['statuses'].items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}",status="{status}"'
+                lines.append(f'{p}_requests_total{{{labels}}} {count}')
+
+        counter('request_sql_queries_total', 'SQL statements run by requests', lambda t: t['sql_queries'])
+        counter('request_sql_queries_max', 'Most SQL statements run by a single request',
+                lambda t: t['sql_max_queries'], kind='gauge')
+        counter('request_sql_seconds_total', 'Time spent in SQL statements', lambda t: f"{t['sql_seconds']:.6f}")
+        for name in timer_names:
+            counter(f'request_{name}_seconds_total', f'Time spent in {name}',
+                    lambda t, name=name: f"{t['timers'].get(name, 0.0):.6f}")
+        counter('slow_requests_total', 'Requests written to the slow-request log', lambda t: t['slow'])
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if has_request_context() and g.get('request_metrics') is not None:
+            g.request_metrics.add_time(self.name, time.perf_counter() - self.started)
@@ -0,0 +1,244 @@
+"""Pre-fork WSGI server for the tracker.
+
+    python serve.py --workers 4 --threads 8 --port 8000
+
+The parent process imports the app and builds its shared state once (see
+app.preload_worker_state), then forks the workers. Forked workers share the
+parent's memory pages until they write to them, so the imported modules,
+compiled templates and content tables are held once rather than once per
+worker. The garbage collector is kept off in the parent and its objects are
+frozen before the fork, so collections in the workers do not touch, and
+therefore copy, those pages. Each worker opens its own database connections
+and Sheets session after the fork (db_config.dispose_after_fork).
+
+Every worker accepts connections from the same listening socket and serves up
+to --threads requests at a time. A worker that dies is restarted. SIGTERM or
+Ctrl-C stops the workers after their current requests, and SIGUSR1 prints
+the memory of the parent and each worker. With --no-preload each worker
+imports the app itself, which is useful to compare memory (see
+benchmarks/prefork_memory.py).
+
+Unix only (os.fork). Run `flask --app app migrate-db` before starting.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+RESTART_DELAY = 1.0  # seconds before restarting a worker that died at once
+
+
+def process_memory(pid):
+    """Memory of a process in MB: rss, pss, private and shared (Linux /proc)
+
+    rss counts every page the process maps, including pages shared with the
+    other workers. private is what the process alone holds, so it is the
+    memory that stopping it would free. pss splits shared pages between the
+    processes that share them, so the pss values of all processes add up to
+    their real total.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': private,
+        'shared': fields.get('Rss', 0) - private
+    }
+
+
+def print_memory_report(parent_pid, worker_pids):
+    print(f"{'process':>16} {'rss MB':>8} {'pss MB':>8} {'private MB':>11} {'shared MB':>10}")
+    total_pss = 0.0
+    for label, pid in [('parent', parent_pid)] + [(f'worker {pid}', pid) for pid in worker_pids]:
+        memory = process_memory(pid)
+        if memory is None:
+            print(f"{label:>16} (no /proc/{pid}/smaps_rollup)")
+            continue
+        total_pss += memory['pss']
+        print(f"{label:>16} {memory['rss']:8.1f} {memory['pss']:8.1f} {memory['private']:11.1f} {memory['shared']:10.1f}")
+    print(f"{'total (pss)':>16} {total_pss:8.1f}", flush=True)
+
+
+def _create_server_class():
+    # werkzeug is imported here so `import serve` (for process_memory) stays light
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class RequestHandler(WSGIRequestHandler):
+        # One request per connection: an idle keep-alive connection would hold
+        # one of the worker's threads. Put a proxy in front for keep-alive.
+        protocol_version = 'HTTP/1.0'
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Serve requests on a fixed pool of threads
+
+        A worker whose threads are all busy stops accepting, which leaves new
+        connections in the shared backlog for the other workers.
+        """
+        multithread = True
+        multiprocess = True
+
+        def __init__(self, host, port, app, threads, fd):
+            super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+            # Several workers wait on one socket; the ones that lose the race
+            # for a connection must go back to waiting, not block in accept()
+            self.socket.setblocking(False)
+            self._slots = threading.BoundedSemaphore(threads)
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+        def process_request(self, request, client_address):
+            self._slots.acquire()
+            self._pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self._slots.release()
+
+        def close(self):
+            """Finish the requests in progress, then close the socket"""
+            self._pool.shutdown(wait=True)
+            self.server_close()
+
+    return PooledWSGIServer
+
+
+def run_worker(listener, args, tracker):
+    """Serve requests until SIGTERM or SIGINT (runs in the forked child)"""
+    gc.enable()
+    if tracker is None:
+        import app as tracker
+
+    server = _create_server_class()(args.host, args.port, tracker.app, args.threads, listener.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever to return, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, stop)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.close()
+        tracker.activity_logger.shutdown()
+        tracker.export_jobs.shutdown()
+
+
+def spawn_worker(listener, args, tracker):
+    # Stop signals stay blocked until the child has replaced the parent's handlers
+    signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+    pid = os.fork()
+    if pid:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+        return pid
+
+    code = 0
+    try:
+        run_worker(listener, args, tracker)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--backlog', type=int, default=2048, help='listen queue length')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='import the app in each worker instead of once before forking')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stderr')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.INFO if args.access_log else logging.WARNING)
+
+    family = socket.AF_INET6 if ':' in args.host else socket.AF_INET
+    listener = socket.create_server((args.host, args.port), family=family, backlog=args.backlog)
+    args.port = listener.getsockname()[1]
+
+    tracker = None
+    if args.preload:
+        # Objects made during the import are never collected, so no holes are
+        # left in the pages the workers share (see gc.freeze)
+        gc.disable()
+        started = time.perf_counter()
+        import app as tracker
+        templates = tracker.preload_worker_state(tracker.app)
+        gc.freeze()
+        print(f"Preloaded the app and {templates} templates in {time.perf_counter() - started:.2f}s")
+
+    workers = {}  # pid -> (worker number, start time)
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(signum, frame):
+        print_memory_report(os.getpid(), list(workers))
+
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    for number in range(args.workers):
+        workers[spawn_worker(listener, args, tracker)] = (number, time.monotonic())
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers x {args.threads} threads "
+          f"({'preloaded' if args.preload else 'no preload'}); parent pid {os.getpid()}", flush=True)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        entry = workers.pop(pid, None)
+        if entry is None or stopping:
+            continue
+        number, started = entry
+        print(f"Worker {number} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting",
+              flush=True)
+        if time.monotonic() - started < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            workers[spawn_worker(listener, args, tracker)] = (number, time.monotonic())
+
+    listener.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
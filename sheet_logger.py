@@ -1,11 +1,10 @@
-import gspread
-from google.oauth2.service_account import Credentials
-from google_sheets_config import CREDENTIALS_FILE, SHEET_ID, LOGIN_SHEET_NAME
+from google_sheets_config import SHEET_ID, LOGIN_SHEET_NAME
+from sheets_client import registry
 
 def log_to_sheet(data):
-    scopes = ['https://www.googleapis.com/auth/spreadsheets']
-    credentials = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=scopes)
-    gc = gspread.authorize(credentials)
-    sh = gc.open_by_key(SHEET_ID)
-    worksheet = sh.worksheet(LOGIN_SHEET_NAME)
+    """Append one row to the login sheet; returns False if Google Sheets is not configured"""
+    worksheet = registry.get_worksheet(SHEET_ID, LOGIN_SHEET_NAME)
+    if worksheet is None:
+        return False
     worksheet.append_row(data)
+    return True
@@ -0,0 +1,138 @@
+"""Process-wide Google Sheets client registry.
+
+Authorizing a service account and resolving a worksheet each cost network
+round trips, so the registry does both once per process and hands the same
+objects to every caller. All requests go through one AuthorizedSession, so
+HTTP connections are kept alive, and the OAuth token is refreshed only once it
+has expired.
+
+gspread and the Google auth libraries are imported on first connect. Workers
+that never write to a sheet (or run without a credentials file) do not pay
+for them at startup. A forked worker process starts with an empty registry
+and authorizes on its own.
+"""
+import os
+import threading
+
+from google_sheets_config import CREDENTIALS_FILE, SCOPES, HTTP_POOL_SIZE
+
+
+class SheetsClientRegistry:
+    """Thread-safe cache of the authorized client and worksheet handles"""
+
+    def __init__(self, credentials_file, scopes, pool_size=10):
+        self.credentials_file = credentials_file
+        self.scopes = scopes
+        self.pool_size = pool_size
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._session = None
+        self._client = None
+        self._worksheets = {}
+        self.client_hits = 0
+        self.client_misses = 0
+        self.worksheet_hits = 0
+        self.worksheet_misses = 0
+        self.reauths = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def get_client(self):
+        """Return the shared gspread client, or None if no credentials file exists"""
+        with self._lock:
+            if self._client is None:
+                if not os.path.exists(self.credentials_file):
+                    return None
+                self.client_misses += 1
+                self._connect()
+            else:
+                self.client_hits += 1
+            self._refresh_if_expired()
+            return self._client
+
+    def get_worksheet(self, sheet_id, worksheet_name):
+        """Return a cached worksheet handle, opening the spreadsheet on first use"""
+        key = (sheet_id, worksheet_name)
+        with self._lock:
+            client = self.get_client()
+            if client is None:
+                return None
+            worksheet = self._worksheets.get(key)
+            if worksheet is not None:
+                self.worksheet_hits += 1
+                return worksheet
+            self.worksheet_misses += 1
+            worksheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
+            self._worksheets[key] = worksheet
+            return worksheet
+
+    def invalidate(self, sheet_id=None, worksheet_name=None):
+        """Forget one cached worksheet, or everything when called without arguments"""
+        with self._lock:
+            if sheet_id is None:
+                if self._session is not None:
+                    self._session.close()
+                self._credentials = None
+                self._session = None
+                self._client = None
+                self._worksheets.clear()
+            else:
+                self._worksheets.pop((sheet_id, worksheet_name), None)
+
+    def stats(self):
+        """Cache counters, to confirm logins are not paying for an OAuth handshake"""
+        with self._lock:
+            return {
+                'client_hits': self.client_hits,
+                'client_misses': self.client_misses,
+                'worksheet_hits': self.worksheet_hits,
+                'worksheet_misses': self.worksheet_misses,
+                'reauths': self.reauths,
+                'cached_worksheets': len(self._worksheets)
+            }
+
+    def preload_libraries(self):
+        """Import gspread and google-auth without connecting, if a credentials file exists
+
+        A pre-fork server calls this before forking, so its workers share the
+        imported modules instead of each importing them on first login.
+        """
+        if not os.path.exists(self.credentials_file):
+            return
+        import gspread  # noqa: F401
+        import google.auth.transport.requests  # noqa: F401
+        import google.oauth2.service_account  # noqa: F401
+
+    def _reset_after_fork(self):
+        # The HTTP session's sockets and the lock belong to the parent process
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._session = None
+        self._client = None
+        self._worksheets = {}
+
+    def _connect(self):
+        import gspread
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2.service_account import Credentials
+        from requests.adapters import HTTPAdapter
+
+        credentials = Credentials.from_service_account_file(self.credentials_file, scopes=self.scopes)
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        self._credentials = credentials
+        self._session = session
+        self._client = gspread.Client(auth=credentials, session=session)
+        self._worksheets.clear()
+
+    def _refresh_if_expired(self):
+        # Refresh here, under the lock, so concurrent workers never race to
+        # fetch a new token; AuthorizedSession then reuses it for every call
+        if not self._credentials.valid:
+            from google.auth.transport.requests import Request
+            self._credentials.refresh(Request(self._session))
+            self.reauths += 1
+
+
+registry = SheetsClientRegistry(CREDENTIALS_FILE, SCOPES, pool_size=HTTP_POOL_SIZE)
@@ -0,0 +1,232 @@
+"""Synthetic users with multi-year cycle and tracker histories, for benchmarks.
+
+Each user's rows come from a random generator seeded with (seed, user id).
+The same seed and end date therefore give the same data, however the users
+are split between worker processes. Workers reflect the tables from the
+target database, which must already have the current schema, and insert
+each batch of users with executemany in one transaction.
+
+What the data looks like:
+  * cycle lengths vary around a per-user mean. About 10% of users have
+    PCOS-style cycles that are long and very irregular, with occasional
+    skipped periods
+  * logged start dates drift from the expected date by a few days, and a few
+    periods are never logged
+  * each user logs their daily trackers on a fraction of days, with gaps of
+    a week or more. Moods and symptoms follow the cycle phase
+"""
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, event
+
+import db_config
+
+TABLES = [
+    'user', 'cycle_settings', 'period_log', 'mood_tracker',
+    'water_tracker', 'nutrition_tracker', 'self_care_activity'
+]
+BATCH_USERS = 50      # users generated and committed together
+INSERT_ROWS = 10000   # rows per executemany call
+BUSY_TIMEOUT_MS = 60000
+
+PCOS_RATE = 0.10
+MISSED_LOG_RATE = 0.05
+PERIOD_MOODS = ['tired', 'irritable', 'sad', 'calm']
+LUTEAL_MOODS = ['irritable', 'anxious', 'tired', 'calm', 'sad']
+OTHER_MOODS = ['happy', 'calm', 'energetic', 'happy', 'tired']
+PERIOD_SYMPTOMS = ['cramps', 'cramps, fatigue', 'back pain', 'headache', 'bloating', '']
+LUTEAL_SYMPTOMS = ['bloating', 'breast tenderness', 'acne', 'headache', '', '']
+ACTIVITIES = ['exercise', 'meditation', 'journaling', 'yoga', 'reading', 'walk']
+
+
+def _clip(value, low, high):
+    return max(low, min(high, value))
+
+
+def email_for(seed, user_id):
+    return f'synthetic-{seed}-{user_id}@example.invalid'
+
+
+def generate_user(user_id, seed, years, end_date, password_hash):
+    """All rows for one user, as {table name: [row dicts]}"""
+    rng = random.Random(f'{seed}:{user_id}')
+    first_day = end_date - timedelta(days=int(365 * years))
+    pcos = rng.random() < PCOS_RATE
+    if pcos:
+        mean_length = rng.gauss(36, 4)
+        spread = rng.uniform(6, 12)
+    else:
+        mean_length = _clip(rng.gauss(28.5, 2.0), 22, 36)
+        spread = rng.uniform(1.0, 3.5)
+    period_length = int(_clip(round(rng.gauss(5, 1)), 3, 8))
+    settings_length = int(round(_clip(mean_length, 21, 45)))
+
+    rows = {table: [] for table in TABLES}
+    rows['user'].append({
+        'id': user_id,
+        'name': f'Synthetic User {user_id}',
+        'email': email_for(seed, user_id),
+        'password_hash': password_hash,
+        'age': rng.randint(14, 50),
+        'pcos': pcos,
+        'thyroid': rng.random() < 0.05,
+        'anemia': rng.random() < 0.08,
+        'diabetes': rng.random() < 0.03,
+        'emergency_contact': None,
+        'created_at': datetime.combine(first_day, datetime.min.time()),
+        'data_version': 0,
+    })
+
+    # Actual period starts, then the logs the user would have entered for them
+    start = first_day + timedelta(days=rng.randint(0, settings_length))
+    rows['cycle_settings'].append({
+        'user_id': user_id, 'avg_cycle_length': settings_length, 'avg_period_length': period_length,
+        'start_date': start, 'created_at': datetime.combine(start, datetime.min.time())
+    })
+    starts = []
+    day = start
+    while day <= end_date:
+        starts.append(day)
+        length = rng.gauss(mean_length, spread)
+        if pcos and rng.random() < 0.08:
+            length += rng.uniform(30, 60)  # anovulatory cycle: a period is skipped
+        day += timedelta(days=int(_clip(round(length), 18, 120)))
+
+    for previous, actual in zip([None] + starts[:-1], starts):
+        if previous is None or rng.random() < MISSED_LOG_RATE:
+            continue
+        expected = previous + timedelta(days=settings_length)
+        rows['period_log'].append({
+            'user_id': user_id,
+            'expected_date': expected,
+            'actual_start_date': actual,
+            'delay_days': (actual - expected).days,
+            'duration': int(_clip(round(rng.gauss(period_length, 1)), 2, 10)),
+            'notes': '',
+            'created_at': datetime.combine(actual, datetime.min.time()),
+        })
+
+    # Daily trackers: logged on some days, with occasional gaps of 1-3 weeks
+    log_rate = rng.uniform(0.2, 0.95)
+    start_index = 0
+    gap_until = first_day
+    day = first_day
+    while day <= end_date:
+        if day < gap_until:
+            day += timedelta(days=1)
+            continue
+        if rng.random() < 0.01:
+            gap_until = day + timedelta(days=rng.randint(7, 21))
+            continue
+        while start_index + 1 < len(starts) and starts[start_index + 1] <= day:
+            start_index += 1
+        cycle_day = (day - starts[start_index]).days if starts and starts[start_index] <= day else None
+        created_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(7, 22))
+
+        if rng.random() < log_rate:
+            if cycle_day is not None and cycle_day < period_length:
+                mood, symptoms = rng.choice(PERIOD_MOODS), rng.choice(PERIOD_SYMPTOMS)
+            elif cycle_day is not None and cycle_day >= mean_length - 7:
+                mood, symptoms = rng.choice(LUTEAL_MOODS), rng.choice(LUTEAL_SYMPTOMS)
+            else:
+                mood, symptoms = rng.choice(OTHER_MOODS), ''
+            rows['mood_tracker'].append({
+                'user_id': user_id, 'date': day, 'mood': mood, 'symptoms': symptoms, 'created_at': created_at,
+                'client_updated_at': created_at
+            })
+        if rng.random() < log_rate:
+            amount = round(_clip(rng.gauss(2.0, 0.6), 0.0, 5.0), 1)
+            rows['water_tracker'].append({
+                'user_id': user_id, 'date': day, 'drank_water': amount >= 1.5,
+                'water_amount': amount, 'created_at': created_at, 'client_updated_at': created_at
+            })
+        if rng.random() < log_rate * 0.6:
+            rows['nutrition_tracker'].append({
+                'user_id': user_id, 'date': day, 'ate_iron_rich': rng.random() < 0.4,
+                'ate_healthy': rng.random() < 0.65, 'notes': '', 'created_at': created_at,
+                'client_updated_at': created_at
+            })
+        if rng.random() < log_rate * 0.3:
+            rows['self_care_activity'].append({
+                'user_id': user_id, 'date': day, 'activity_type': rng.choice(ACTIVITIES),
+                'duration': rng.choice([10, 15, 20, 30, 45, 60]), 'notes': '', 'created_at': created_at,
+                'client_event_id': None
+            })
+        day += timedelta(days=1)
+    return rows
+
+
+def _target_engine(url, profile):
+    engine = create_engine(url, **db_config.engine_options(url, profile))
+    db_config.apply_profile(engine, profile)
+    if engine.dialect.name == 'sqlite':
+        # Parallel workers take turns at the write lock, with big transactions
+        @event.listens_for(engine, 'connect')
+        def wait_for_writers(dbapi_connection, connection_record):
+            dbapi_connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return engine
+
+
+def write_users(url, profile, user_ids, seed, years, end_date, password_hash):
+    """Generate and insert a list of users; returns {table name: rows written}"""
+    engine = _target_engine(url, profile)
+    metadata = MetaData()
+    metadata.reflect(engine, only=TABLES)
+    counts = dict.fromkeys(TABLES, 0)
+    try:
+        for i in range(0, len(user_ids), BATCH_USERS):
+            batch = {table: [] for table in TABLES}
+            for user_id in user_ids[i:i + BATCH_USERS]:
+                for table, rows in generate_user(user_id, seed, years, end_date, password_hash).items():
+                    batch[table].extend(rows)
+            with engine.begin() as conn:
+                for table in TABLES:
+                    rows = batch[table]
+                    for j in range(0, len(rows), INSERT_ROWS):
+                        conn.execute(metadata.tables[table].insert(), rows[j:j + INSERT_ROWS])
+                    counts[table] += len(rows)
+    finally:
+        engine.dispose()
+    return counts
+
+
+def generate(url, users, first_user_id, seed, years, end_date, password_hash,
+             workers=1, profile='production', users_per_task=None, progress=None):
+    """Write `users` synthetic users with ids from first_user_id, split over worker processes
+
+    Returns {table name: rows written}. `progress(users_done, counts)` is
+    called as each task finishes.
+    """
+    user_ids = list(range(first_user_id, first_user_id + users))
+    if users_per_task is None:
+        # Several tasks per worker keep every process busy until the end
+        users_per_task = min(1000, max(BATCH_USERS, -(-users // (workers * 4))))
+    tasks = [user_ids[i:i + users_per_task] for i in range(0, len(user_ids), users_per_task)]
+    totals = dict.fromkeys(TABLES, 0)
+    done = 0
+
+    def add(task, counts):
+        nonlocal done
+        done += len(task)
+        for table, count in counts.items():
+            totals[table] += count
+        if progress:
+            progress(done, totals)
+
+    if workers <= 1:
+        for task in tasks:
+            add(task, write_users(url, profile, task, seed, years, end_date, password_hash))
+        return totals
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(write_users, url, profile, task, seed, years, end_date, password_hash): task
+            for task in tasks
+        }
+        for future in as_completed(futures):
+            add(futures[future], future.result())
+    return totals
@@ -0,0 +1,78 @@
+"""Compiled and pre-rendered templates.
+
+Three layers, from cheapest to most effective:
+  * the bytecode of every compiled template is kept on disk
+    (FileSystemBytecodeCache), so a new worker loads templates without
+    parsing them. `flask compile-templates` fills it ahead of a deploy
+  * {% cache 'name' %}...{% endcache %} renders a fragment once per process
+    and reuses the markup afterwards. Only wrap markup that is the same for
+    every user and request, such as links and fixed advice text
+  * StaticPages renders the blocks of a page whose content never changes
+    once. Each request then only renders the layout around them
+    (static_page.html), which is where the user's name appears
+
+Fragments and pages are rendered again whenever the templates are reloaded
+in debug mode.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+def bytecode_cache(directory):
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache 'name' %}...{% endcache %}: render the body once per process"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache={})
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [nodes.Const(parser.name), name])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, template_name, name, caller):
+        if self.environment.auto_reload:
+            return caller()
+        key = (template_name, name)
+        markup = self.environment.fragment_cache.get(key)
+        if markup is None:
+            # Two threads may both render it the first time; either copy is fine
+            markup = self.environment.fragment_cache[key] = caller()
+        return markup
+
+
+class StaticPages:
+    """Blocks of static pages, rendered once per process"""
+
+    def __init__(self):
+        self._blocks = {}  # template name -> {block name: Markup}
+
+    def blocks(self, environment, template_name, context):
+        """{block name: rendered Markup} of a template, rendered on first use
+
+        `context` must be the same on every call for a template: the first
+        rendering is reused for everyone.
+        """
+        blocks = self._blocks.get(template_name)
+        if blocks is not None and not environment.auto_reload:
+            return blocks
+        template = environment.get_template(template_name)
+        template_context = template.new_context(context)
+        blocks = {
+            name: Markup(''.join(render(template_context)))
+            for name, render in template.blocks.items()
+        }
+        self._blocks[template_name] = blocks
+        return blocks